@@ -0,0 +1,28 @@
+"""add indexes on status, next_attempt and time
+
+Revision ID: 5c1e7f3a9b24
+Revises: 8dbee4e92072
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5c1e7f3a9b24"
+down_revision = "8dbee4e92072"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_games_status", "games", ["status"])
+    op.create_index("ix_games_next_attempt", "games", ["next_attempt"])
+    op.create_index("ix_games_time", "games", ["time"])
+
+
+def downgrade():
+    op.drop_index("ix_games_time", table_name="games")
+    op.drop_index("ix_games_next_attempt", table_name="games")
+    op.drop_index("ix_games_status", table_name="games")
@@ -1,10 +1,90 @@
-from typing import List
+from typing import Any, List, Optional
 import argparse
 import sys
 
 
-def get_arguments() -> argparse.Namespace:
-    return parse_args(sys.argv[1:])
+class Config:
+    """
+    The parsed command line arguments, read-only once created
+    """
+
+    __slots__ = (
+        "team",
+        "username",
+        "password",
+        "download_folder",
+        "checkinterval",
+        "retentiondays",
+        "days_back_to_search",
+        "shorten_video",
+        "debug_dumps_enabled",
+        "download_workers",
+        "concurrent_downloads",
+        "concurrent_skip_silence",
+        "concurrent_obfuscate",
+        "concurrent_moves",
+        "skip_silence_mode",
+        "max_processes",
+        "silence_detector",
+        "fused_postprocessing",
+        "retries",
+        "retry_deadline",
+        "db_profile",
+    )
+
+    team: List[str]
+    username: str
+    password: str
+    download_folder: Optional[str]
+    checkinterval: Optional[str]
+    retentiondays: Optional[str]
+    days_back_to_search: Optional[str]
+    shorten_video: bool
+    debug_dumps_enabled: bool
+    download_workers: Optional[str]
+    concurrent_downloads: Optional[str]
+    concurrent_skip_silence: Optional[str]
+    concurrent_obfuscate: Optional[str]
+    concurrent_moves: Optional[str]
+    skip_silence_mode: Optional[str]
+    max_processes: Optional[str]
+    silence_detector: Optional[str]
+    fused_postprocessing: bool
+    retries: Optional[str]
+    retry_deadline: Optional[str]
+    db_profile: Optional[str]
+
+    def __init__(self, arguments: Any) -> None:
+        for name in self.__slots__:
+            object.__setattr__(self, name, getattr(arguments, name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Config is read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Config is read-only")
+
+
+_config: Optional[Config] = None
+
+
+def get_arguments() -> Config:
+    """
+    Returns the config, the command line is only parsed the first time
+    """
+    global _config  # pylint: disable=global-statement
+    if _config is None:
+        _config = Config(parse_args(sys.argv[1:]))
+    return _config
+
+
+def set_config(config: Optional[Config]) -> None:
+    """
+    Replaces the config that get_arguments returns, with None
+    the command line is parsed again the next time it is needed
+    """
+    global _config  # pylint: disable=global-statement
+    _config = config
 
 
 # pylint: disable=line-too-long
@@ -64,6 +144,83 @@ def parse_args(args: List[str]) -> argparse.Namespace:
         help="How many days back to search (default: 3)",
     )
 
+    parser.add_argument(
+        "-w",
+        "--download-workers",
+        dest="download_workers",
+        help="How many video segments to download concurrently (default: 8)",
+    )
+
+    parser.add_argument(
+        "--concurrent-downloads",
+        dest="concurrent_downloads",
+        help="How many games to download at the same time (default: 1)",
+    )
+
+    parser.add_argument(
+        "--concurrent-skip-silence",
+        dest="concurrent_skip_silence",
+        help="How many games to remove commercial breaks from at the same time (default: 1)",
+    )
+
+    parser.add_argument(
+        "--concurrent-obfuscate",
+        dest="concurrent_obfuscate",
+        help="How many games to obfuscate at the same time (default: 1)",
+    )
+
+    parser.add_argument(
+        "--concurrent-moves",
+        dest="concurrent_moves",
+        help="How many games to move to the download folder at the same time (default: 1)",
+    )
+
+    parser.add_argument(
+        "--skip-silence-mode",
+        dest="skip_silence_mode",
+        choices=["cuts", "single-pass"],
+        help="How to remove commercial breaks: cut every part to its own file and merge them (cuts), or read the parts straight from the downloaded video in one ffmpeg run (single-pass) (default: cuts)",
+    )
+
+    parser.add_argument(
+        "--fused-postprocessing",
+        dest="fused_postprocessing",
+        action="store_true",
+        help="Remove commercial breaks and pad the video with black in a single ffmpeg run that writes straight into the download folder, writes the game to disk far fewer times",
+    )
+
+    parser.add_argument(
+        "--silence-detector",
+        dest="silence_detector",
+        choices=["ffmpeg", "numpy"],
+        help="Which silence detector to find commercial breaks with, numpy requires numpy to be installed (default: ffmpeg)",
+    )
+
+    parser.add_argument(
+        "--max-processes",
+        dest="max_processes",
+        help="How many ffmpeg processes may run at the same time (default: number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--retries",
+        dest="retries",
+        help="How many times to try a request to NHL.com before giving up (default: 3)",
+    )
+
+    parser.add_argument(
+        "--retry-deadline",
+        dest="retry_deadline",
+        help="How many seconds to keep retrying a request for, including the waits between tries (default: 120)",
+    )
+
+    parser.add_argument(
+        "--db-profile",
+        dest="db_profile",
+        choices=["wal", "rollback"],
+        help="How the database is journaled, rollback works wherever the download folder is, wal lets the database be read while games are downloading but needs a local file system (default: rollback)",
+    )
+
     parser.add_argument(
         "--short-debug",
         dest="shorten_video",
@@ -1,13 +1,42 @@
+import hashlib
 import json
 import os
+import tempfile
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Optional
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+CACHE_DIRECTORY = "cache"
+
+# the cache directory is trimmed to these limits after every write,
+# least recently used entries go first
+MAX_CACHE_ENTRIES = 500
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# how often every entry is read to remove the ones that have expired
+SWEEP_INTERVAL = timedelta(minutes=10)
+
+# how many cache entries are kept in memory, least recently used go first
+MAX_MEMORY_ENTRIES = 128
+
+# key -> (parameters, expires, content) of the entries read or written
+# lately, so that they do not have to be read from disk on every lookup
+_memory_cache: "OrderedDict[str, Tuple[Dict, datetime, Dict]]" = OrderedDict()
+_memory_cache_lock = Lock()
+
+# writes, evictions and sweeps of the cache directory
+_disk_lock = Lock()
+_last_sweep: Optional[datetime] = None
+
+_stats: Counter = Counter()
+_stats_lock = Lock()
 
 
 def ensure_cache_directory() -> None:
     """Ensure that the 'cache' directory exists."""
-    os.makedirs("cache", exist_ok=True)
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
 
 
 def cache_json(
@@ -15,60 +44,263 @@ def cache_json(
 ) -> None:
     """Cache JSON content with expiration time.
 
+    Every set of parameters gets its own entry, the file is written to a
+    temporary file first and renamed into place so it is never seen half
+    written.
+
     Args:
-        name (str): The name of the cache file.
+        name (str): The name of the cache entry.
         parameters (Dict): Parameters to match for cache to be valid.
         expires_in (int): Expiration time in seconds.
         content (Dict): Content to be cached.
     """
     ensure_cache_directory()
+    key = get_cache_key(name, parameters)
+    expires = datetime.now() + timedelta(seconds=expires_in)
     cache_data = {
         "parameters": parameters,
-        "expires": (
-            datetime.now() + timedelta(seconds=expires_in)
-        ).isoformat(),
+        "expires": expires.isoformat(),
         "content": content,
     }
-    cache_file_path = Path("cache") / f"{name}.json"
-    with open(cache_file_path, "w") as f:
-        json.dump(cache_data, f)
+
+    with _disk_lock:
+        fd, temp_path = tempfile.mkstemp(
+            dir=CACHE_DIRECTORY, prefix=f".{key}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache_data, f)
+            os.replace(temp_path, _get_cache_file_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        _remember(key, parameters, expires, content)
+        _sweep_if_due()
+        _enforce_limits()
 
 
 def load_cache_json(name: str, parameters: Dict) -> Optional[Dict]:
     """Load content from cache if parameters match and it hasn't expired.
 
     Args:
-        name (str): The name of the cache file.
+        name (str): The name of the cache entry.
         parameters (Dict): Parameters to validate against cached data.
 
     Returns:
         Optional[Dict]: The cached content if conditions are met, otherwise None.
+            The content may be shared with other callers, do not modify it.
     """
-    cache_file_path = Path("cache") / f"{name}.json"
-    if not cache_file_path.exists():
-        return None
-
-    with open(cache_file_path, "r") as f:
-        cached = json.load(f)
+    key = get_cache_key(name, parameters)
+    entry = _recall(key)
+    if entry is None:
+        entry = _read_cache_file(_get_cache_file_path(key))
+        if entry is None:
+            _count("misses")
+            return None
+        _remember(key, *entry)
+    else:
+        # eviction from disk goes by the modification time,
+        # an entry read from memory has been used all the same
+        _touch(_get_cache_file_path(key))
 
-    if (
-        cached["parameters"] == parameters
-        and datetime.fromisoformat(cached["expires"]) > datetime.now()
-    ):
-        return cached["content"]
+    cached_parameters, expires, content = entry
+    if cached_parameters == parameters and expires > datetime.now():
+        _count("hits")
+        return content
 
+    _count("misses")
     return None
 
 
 def delete_cache(name: str):
-    """Delete a specific cache file.
+    """Delete every cache entry with a name.
 
     Args:
-        name (str): The name of the cache file to delete.
+        name (str): The name of the cache entries to delete.
     """
-    cache_file_path = Path("cache") / f"{name}.json"
-    if cache_file_path.exists():
-        cache_file_path.unlink()
-        print(f"Cache file '{name}.json' deleted successfully.")
+    with _disk_lock:
+        paths = [i for i in _list_cache_files() if _get_name(i) == name]
+        for path in paths:
+            _forget(path.stem)
+            _unlink(path)
+
+    if paths:
+        print(f"Cache '{name}' deleted successfully.")
     else:
-        print(f"Cache file '{name}.json' does not exist.")
+        print(f"Cache '{name}' does not exist.")
+
+
+def get_cache_key(name: str, parameters: Dict) -> str:
+    """
+    Identifies the entry of *name* for *parameters*, the key
+    is also the name of the file the entry is stored in
+    """
+    digest = hashlib.sha1(
+        json.dumps(parameters, sort_keys=True).encode()
+    ).hexdigest()
+    return f"{name}-{digest[:16]}"
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Returns how many lookups hit or missed and how many
+    entries have been evicted or swept since start
+    """
+    with _stats_lock:
+        return {
+            i: _stats[i] for i in ("hits", "misses", "evictions", "expired")
+        }
+
+
+def reset_cache_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def clear_memory_cache() -> None:
+    """Forget every entry kept in memory, the files on disk are kept."""
+    with _memory_cache_lock:
+        _memory_cache.clear()
+
+
+def _get_cache_file_path(key: str) -> Path:
+    return Path(CACHE_DIRECTORY) / f"{key}.json"
+
+
+def _get_name(path: Path) -> str:
+    return path.stem.rsplit("-", 1)[0]
+
+
+def _list_cache_files() -> List[Path]:
+    return list(Path(CACHE_DIRECTORY).glob("*.json"))
+
+
+def _read_cache_file(
+    path: Path, touch: bool = True
+) -> Optional[Tuple[Dict, datetime, Dict]]:
+    """
+    Returns (parameters, expires, content) stored in *path*, or None
+    if it does not exist, a file that can not be read is removed
+
+    The modification time of the file is what eviction goes by, it is
+    updated unless *touch* is False
+    """
+    try:
+        with open(path, "r") as f:
+            cached = json.load(f)
+        entry = (
+            cached["parameters"],
+            datetime.fromisoformat(cached["expires"]),
+            cached["content"],
+        )
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError):
+        _unlink(path)
+        return None
+
+    if touch:
+        _touch(path)
+    return entry
+
+
+def _sweep_cache() -> None:
+    """
+    Removes every entry that has expired or can not be read,
+    along with temporary files left behind by a crash
+    """
+    global _last_sweep  # pylint: disable=global-statement
+    now = datetime.now()
+    _last_sweep = now
+
+    if not os.path.isdir(CACHE_DIRECTORY):
+        return
+
+    for path in Path(CACHE_DIRECTORY).glob(".*.tmp"):
+        _unlink(path)
+
+    for path in _list_cache_files():
+        entry = _read_cache_file(path, touch=False)
+        if entry is None or entry[1] <= now:
+            _forget(path.stem)
+            _unlink(path)
+            _count("expired")
+
+
+def _sweep_if_due() -> None:
+    if _last_sweep is None or datetime.now() - _last_sweep > SWEEP_INTERVAL:
+        _sweep_cache()
+
+
+def _enforce_limits() -> None:
+    """
+    Evicts the least recently used entries until the cache
+    directory is within MAX_CACHE_ENTRIES and MAX_CACHE_BYTES
+    """
+    files = []
+    for path in _list_cache_files():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(i[1] for i in files)
+    files.sort(key=lambda x: x[0])
+    while files and (
+        len(files) > MAX_CACHE_ENTRIES or total_size > MAX_CACHE_BYTES
+    ):
+        _, size, path = files.pop(0)
+        total_size -= size
+        _forget(path.stem)
+        _unlink(path)
+        _count("evictions")
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def _remember(
+    key: str, parameters: Dict, expires: datetime, content: Dict
+) -> None:
+    with _memory_cache_lock:
+        _memory_cache[key] = (parameters, expires, content)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MAX_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+
+def _recall(key: str) -> Optional[Tuple[Dict, datetime, Dict]]:
+    with _memory_cache_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        # expired entries are dropped so the file is looked at again,
+        # it may have been refreshed since
+        if entry[1] <= datetime.now():
+            del _memory_cache[key]
+            return None
+        _memory_cache.move_to_end(key)
+        return entry
+
+
+def _forget(key: str) -> None:
+    with _memory_cache_lock:
+        _memory_cache.pop(key, None)
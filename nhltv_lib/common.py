@@ -1,6 +1,11 @@
-from typing import Union, List, Any
+from functools import lru_cache
+from queue import Queue
+from threading import Lock, Thread
+from typing import Union, List, Any, Callable, Optional
+import atexit
+import copy
 import os
-import inspect
+import sys
 from shutil import move
 from pathlib import Path
 import json
@@ -22,12 +27,21 @@ def touch(filename: str) -> None:
 def debug_dumps_enabled() -> bool:
     arguments = get_arguments()
 
-    if arguments.debug_dumps_enabled and not os.path.isdir("dumps"):
-        os.mkdir("dumps")
+    if arguments.debug_dumps_enabled:
+        _create_dumps_folder()
 
     return arguments.debug_dumps_enabled
 
 
+@lru_cache(maxsize=None)
+def _create_dumps_folder() -> None:
+    """
+    Only checked once, every log line goes through debug_dumps_enabled
+    """
+    if not os.path.isdir("dumps"):
+        os.mkdir("dumps")
+
+
 def debug_dump_json(content: dict, caller: str = "") -> None:
     filename = f"dumps/{caller}_{datetime.now().isoformat()}.json"
 
@@ -60,21 +74,69 @@ def debug_dump_bytes(content: bytes, caller: str = "") -> None:
 
 
 def dump_json_if_debug_enabled(content: dict) -> None:
-    caller_name = inspect.getouterframes(inspect.currentframe(), 2)[1][3]
-    if debug_dumps_enabled():
-        debug_dump_json(content, caller=caller_name)
+    if not debug_dumps_enabled():
+        return
+    # pylint: disable=protected-access
+    caller_name = sys._getframe(1).f_code.co_name
+    # copied so the caller may change it, and redacting it leaves theirs be
+    _queue_dump(debug_dump_json, copy.deepcopy(content), caller_name)
 
 
 def dump_pickle_if_debug_enabled(content: Any) -> None:
-    caller_name = inspect.getouterframes(inspect.currentframe(), 2)[1][3]
-    if debug_dumps_enabled():
-        debug_dump_pickle(content, caller=caller_name)
+    if not debug_dumps_enabled():
+        return
+    # pylint: disable=protected-access
+    caller_name = sys._getframe(1).f_code.co_name
+    _queue_dump(debug_dump_pickle, copy.deepcopy(content), caller_name)
 
 
 def dump_bytes_if_debug_enabled(content: bytes) -> None:
-    caller_name = inspect.getouterframes(inspect.currentframe(), 2)[1][3]
-    if debug_dumps_enabled():
-        debug_dump_bytes(content, caller=caller_name)
+    if not debug_dumps_enabled():
+        return
+    # pylint: disable=protected-access
+    caller_name = sys._getframe(1).f_code.co_name
+    _queue_dump(debug_dump_bytes, content, caller_name)
+
+
+_dump_queue: Queue = Queue()
+_dump_writer: Optional[Thread] = None
+_dump_writer_lock = Lock()
+
+
+def _queue_dump(
+    write: Callable[..., None], content: Any, caller_name: str
+) -> None:
+    """
+    Dumps are written on a background thread so they never hold up
+    the caller, the writer is started with the first dump
+    """
+    global _dump_writer  # pylint: disable=global-statement
+    with _dump_writer_lock:
+        if _dump_writer is None:
+            _dump_writer = Thread(
+                target=_write_dumps, name="debug-dumps", daemon=True
+            )
+            _dump_writer.start()
+    _dump_queue.put((write, content, caller_name))
+
+
+def _write_dumps() -> None:
+    while True:
+        write, content, caller_name = _dump_queue.get()
+        try:
+            write(content, caller=caller_name)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            tprint(f"Failed to write debug dump for {caller_name}: {e!r}")
+        finally:
+            _dump_queue.task_done()
+
+
+@atexit.register
+def flush_debug_dumps() -> None:
+    """
+    Waits until every queued dump has been written
+    """
+    _dump_queue.join()
 
 
 def move_file_to_download_folder(download: Download) -> None:
@@ -87,8 +149,18 @@ def move_file_to_download_folder(download: Download) -> None:
     Path(download_dir).mkdir(parents=True, exist_ok=True)
 
     tprint(f"Moving final to video to {download_dir}")
-    output_file = f"{download_dir}/{download.game_info}.mkv"
-    move(input_file, output_file)
+    move(input_file, get_download_file_name(download))
+
+
+def get_download_file_name(download: Download) -> str:
+    return f"{get_download_folder()}/{download.game_info}.mkv"
+
+
+def get_partial_download_file_name(download: Download) -> str:
+    """
+    Hidden, and still a .mkv so ffmpeg knows which format to write
+    """
+    return f"{get_download_folder()}/.{download.game_info}.partial.mkv"
 
 
 def write_lines_to_file(lines: List[str], file_: str) -> None:
@@ -1,19 +1,53 @@
 import os
 from pathlib import Path
+from typing import Any, Dict, Optional, Union
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import scoped_session, sessionmaker
 
-import alembic.config  # type: ignore
 from nhltv_lib.models import Base
-from nhltv_lib.settings import get_download_folder
+from nhltv_lib.settings import get_db_profile, get_download_folder
 
-# this session gets overridden by the database setup function at runtime
+# the newest revision in alembic/versions, a database at this
+# revision is up to date and does not need to be migrated
+HEAD_REVISION = "5c1e7f3a9b24"
+
+# the pragmas set on every connection, by --db-profile,
+# rollback is the default as it works on any file system
+SQLITE_PROFILES: Dict[str, Dict[str, Union[str, int]]] = {
+    # readers do not block the writer and a commit does not have to wait
+    # for the whole database to be synced, WAL needs shared memory
+    # between everyone using the database so it does not work on shares
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16 * 1024,
+    },
+    "rollback": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "mmap_size": 0,
+        "cache_size": -16 * 1024,
+    },
+}
+
+# this session gets overridden by the database setup function at runtime,
+# it is scoped so that every pipeline stage thread gets its own session
 empty_session = sessionmaker()
-session = empty_session()
+session = scoped_session(empty_session)
 
 
 def _migrate_db(db_path: str) -> None:
+    # pylint: disable=import-outside-toplevel
+    # alembic takes long to import and is not needed at all
+    # when the database is up to date
+    import alembic.config  # type: ignore
+
     boo = os.getcwd()
     os.chdir(os.path.dirname(__file__))
     alembicArgs = [f"-xdbPath={db_path}", "upgrade", "head"]
@@ -21,6 +55,38 @@ def _migrate_db(db_path: str) -> None:
     os.chdir(boo)
 
 
+def get_db_revision(engine: Engine) -> Optional[str]:
+    """
+    Returns the revision the database has been migrated to,
+    or None if it has not been migrated yet
+    """
+    try:
+        with engine.connect() as connection:
+            return connection.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalar()
+    except OperationalError:
+        return None
+
+
+def create_db_engine(db_path: str, profile: str) -> Engine:
+    """
+    Creates the engine for the database at *db_path*, with the
+    pragmas of *profile* set on every connection it opens
+    """
+    engine = create_engine(db_path)
+    pragmas = SQLITE_PROFILES[profile]
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, _: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
 def setup_db() -> sessionmaker:
     download_dir = get_download_folder()
     Path(download_dir).mkdir(parents=True, exist_ok=True)
@@ -32,13 +98,15 @@ def setup_db() -> sessionmaker:
             os.getcwd(), download_dir, "nhltv_database"
         )
 
-    _migrate_db(db_path)
+    engine = create_db_engine(db_path, get_db_profile())
 
-    engine = create_engine(db_path)
-    Base.metadata.create_all(engine)
+    # starting up is a lot faster when alembic does not have to run
+    if get_db_revision(engine) != HEAD_REVISION:
+        _migrate_db(db_path)
+        Base.metadata.create_all(engine)
     DBSession = sessionmaker(bind=engine)
 
     global session  # pylint: disable=global-statement
-    session = DBSession()
+    session = scoped_session(DBSession)
 
     return DBSession
@@ -1,13 +1,14 @@
 import os
+from functools import partial
 from shutil import rmtree
 from typing import Dict, Optional
-from streamlink import Streamlink
 
 from nhltv_lib import game_tracking
 import nhltv_lib.requests_wrapper as requests
 from nhltv_lib.auth import get_auth_cookie_value_login_if_needed
 from nhltv_lib.common import (
     dump_json_if_debug_enabled,
+    move_file_to_download_folder,
     tprint,
 )
 from nhltv_lib.constants import HEADERS, UA_NHLTV
@@ -15,7 +16,14 @@ from nhltv_lib.exceptions import (
     AuthenticationFailed,
     BlackoutRestriction,
 )
+from nhltv_lib.hls import download_hls_stream
 from nhltv_lib.models import GameStatus
+from nhltv_lib.settings import get_download_workers, get_silence_detector
+from nhltv_lib.skip_silence import (
+    StreamingSilenceDetector,
+    remove_silence_analysis,
+    save_marks,
+)
 from nhltv_lib.stream import get_shorten_video
 from nhltv_lib.types import Download, NHLStream
 from nhltv_lib.urls import get_session_key_url, get_stream_url
@@ -23,42 +31,50 @@ from nhltv_lib.urls import get_session_key_url, get_stream_url
 
 def download_game(stream: NHLStream) -> Download:
     download = _get_download_from_stream(stream)
-    clean_up_download(stream.game_id)
+    if not _can_resume_download(stream.game_id):
+        clean_up_download(stream.game_id)
     _create_download_folder(stream.game_id)
 
     tprint(
         f"Starting download of game {download.game_id} ({download.game_info})"
     )
-    game_tracking.update_game_status(download.game_id, GameStatus.downloading)
-    game_tracking.download_started(download.game_id)
-    game_tracking.set_game_info(download.game_id, download.game_info)
+    game = game_tracking.track(download.game_id)
+    game.update_status(GameStatus.downloading)
+    game.download_started()
+    game.set_game_info(download.game_info)
+    game.flush()
 
-    session = Streamlink()
-    session.set_option(
-        "http-headers", {**HEADERS, **get_extra_headers(download.session_key)}
-    )
-    best_stream = session.streams(download.stream_url)["best"]
+    # download only 15 minutes when --debug-short is enabled
+    max_duration = 15 * 60 if get_shorten_video() else None
 
-    if get_shorten_video():
-        best_stream.duration = (
-            15 * 60
-        )  # download only 15 minutes when --debug-short is enabled
+    # silence can only be detected while downloading if the detector
+    # gets to see the whole video, otherwise skip_silence analyzes the file
+    detector = None
+    if get_silence_detector() == "ffmpeg":
+        detector = StreamingSilenceDetector()
 
-    # Open a file to write the stream data
     raw_file_name = _get_raw_file_name(download.game_id)
-    with open(raw_file_name, "wb") as file_out:
-        fd = best_stream.open()
-        try:
-            while True:
-                data = fd.read(1024)
-                if not data:
-                    break
-                file_out.write(data)
-        finally:
-            fd.close()
+    try:
+        download_hls_stream(
+            download.stream_url,
+            raw_file_name,
+            {**HEADERS, **get_extra_headers(download.session_key)},
+            get_download_workers(),
+            max_duration,
+            _get_journal_file_name(download.game_id),
+            partial(_on_segment_data, download.game_id, detector),
+        )
+    except BaseException:
+        if detector:
+            detector.abort()
+        raise
+
+    marks = detector.close() if detector else None
+    if marks is not None:
+        save_marks(download.game_id, marks)
 
     tprint(f"Stream has been saved to {raw_file_name}", debug_only=True)
-    game_tracking.download_finished(download.game_id)
+    game.download_finished()
 
     return download
 
@@ -143,6 +159,32 @@ def _get_raw_file_name(game_id: int) -> str:
     return f"{game_id}_raw.mkv"
 
 
+def _get_journal_file_name(game_id: int) -> str:
+    return f"{game_id}/download_journal.txt"
+
+
+def _on_segment_data(
+    game_id: int,
+    detector: Optional[StreamingSilenceDetector],
+    data: bytes,
+    offset: int,
+) -> None:
+    # the raw file is downloaded from the start, also when resuming failed
+    if offset == 0:
+        remove_silence_analysis(game_id)
+    if detector:
+        detector.feed(data, offset)
+
+
+def _can_resume_download(game_id: int) -> bool:
+    """
+    A previous attempt left a raw file and a journal of the segments in it
+    """
+    return os.path.isfile(_get_journal_file_name(game_id)) and os.path.isfile(
+        _get_raw_file_name(game_id)
+    )
+
+
 def get_extra_headers(session_key: str) -> Dict[str, str]:
     return {
         "Authorization": session_key,
@@ -163,3 +205,20 @@ def clean_up_download(game_id: int) -> None:
         if file_name.startswith(str(game_id)) and file_name.endswith(".mkv"):
             file_path = os.path.join(file_name)
             os.remove(file_path)
+
+
+def finish_download(download: Download) -> None:
+    """
+    Moves the finished video to the download folder and cleans up after it
+    """
+    game = game_tracking.track(download.game_id)
+    game.update_status(GameStatus.moving)
+    game.flush()
+
+    move_file_to_download_folder(download)
+
+    game.update_status(GameStatus.completed)
+    game.download_finished()
+    game_tracking.release_tracked_game(download.game_id)
+
+    clean_up_download(download.game_id)
@@ -16,6 +16,12 @@ class RequestFailed(Exception):
     """
 
 
+class CircuitOpen(RequestFailed):
+    """
+    Requests to an endpoint are paused after it kept failing
+    """
+
+
 class BlackoutRestriction(Exception):
     """
     This game is blacked out
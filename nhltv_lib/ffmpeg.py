@@ -4,7 +4,7 @@ import subprocess
 from nhltv_lib.process import (
     call_subprocess_and_raise_on_error,
     call_subprocess_and_get_stdout_iterator,
-    call_subprocess,
+    call_subprocess_with_stdin,
 )
 
 
@@ -38,19 +38,31 @@ def get_video_length(input_file: str) -> int:
     return int(proc_out[0].split(b".")[0])
 
 
-def split_video_into_cuts(
+def get_split_video_into_cuts_command(
     input_file: str,
     game_id: int,
     mark: str,
     seg: int,
     end: Optional[float] = None,
-) -> subprocess.Popen:
+) -> str:
     command = f"ffmpeg -y -nostats -i {input_file} -ss {mark} "
     if end:
         command += f"-t {end} "
     command += f"-c:v copy -c:a copy {game_id}/cut{seg}.mp4"
-    p = call_subprocess(command)
-    return p
+    return command
+
+
+def decode_audio_to_pcm(
+    input_file: str, output_file: str, sample_rate: int
+) -> None:
+    """
+    Decodes the first audio stream to mono signed 16 bit little endian PCM
+    """
+    command = (
+        f"ffmpeg -y -nostats -loglevel error -i {input_file} -map 0:a:0 "
+        f"-ac 1 -ar {sample_rate} -f s16le {output_file}"
+    )
+    call_subprocess_and_raise_on_error(command)
 
 
 def show_video_streams(input_file: str) -> List[bytes]:
@@ -62,14 +74,47 @@ def show_video_streams(input_file: str) -> List[bytes]:
     return proc_out
 
 
-def detect_silence(input_file: str) -> Iterator[bytes]:
+def detect_silence(
+    input_file: str, sample_rate: Optional[int] = None
+) -> Iterator[bytes]:
     """
-    Runs silencedetect and returns an iterator over ffmpeg stdout
+    Runs silencedetect on the first audio stream only and returns an
+    iterator over the ffmpeg log, video is never demuxed into the graph
+    and nothing is encoded
+
+    If *sample_rate* is given the audio is downmixed to mono and
+    resampled before it reaches the detector
     """
-    command = (
-        f"ffmpeg -y -nostats -i {input_file} -af silencedetect=n=-50dB:d=10 "
-        f"-c:v copy -c:a libmp3lame -f mp4 /dev/null"
-    )
+    command = _get_detect_silence_command(input_file, sample_rate)
 
     _, pi = call_subprocess_and_get_stdout_iterator(command)
     return pi
+
+
+def start_detecting_silence_in_stdin(
+    sample_rate: Optional[int] = None,
+) -> subprocess.Popen:
+    """
+    Starts silencedetect on video written to the stdin of the returned
+    process, the ffmpeg log can be read from its stdout as it runs
+    """
+    return call_subprocess_with_stdin(
+        _get_detect_silence_command("pipe:0", sample_rate)
+    )
+
+
+def _get_detect_silence_command(
+    input_file: str, sample_rate: Optional[int]
+) -> str:
+    audio_filter = "silencedetect=n=-50dB:d=10"
+    if sample_rate:
+        audio_filter = (
+            f"aformat=channel_layouts=mono:sample_rates={sample_rate},"
+            + audio_filter
+        )
+
+    # silencedetect logs to stderr, which is merged into stdout
+    return (
+        f"ffmpeg -nostats -i {input_file} -map 0:a:0 -af {audio_filter} "
+        f"-f null - 2>&1"
+    )
@@ -0,0 +1,100 @@
+from pathlib import Path
+from typing import List
+import os
+
+from nhltv_lib.common import (
+    get_download_file_name,
+    get_partial_download_file_name,
+    tprint,
+    write_lines_to_file,
+)
+from nhltv_lib.download import clean_up_download
+from nhltv_lib.ffmpeg import concat_video, get_video_length
+from nhltv_lib.obfuscate import create_black_concat_content, get_black_padding
+from nhltv_lib.settings import get_download_folder
+from nhltv_lib.skip_silence import (
+    create_single_pass_concat_list,
+    get_marks,
+    get_non_silent_intervals,
+)
+from nhltv_lib.types import Download
+
+from nhltv_lib import game_tracking
+from nhltv_lib.models import GameStatus
+
+
+def fused_postprocess(download: Download) -> None:
+    """
+    Removes the silence and pads the end of the video with black in a
+    single ffmpeg run, reading straight from the raw file and writing
+    straight into the download folder
+    """
+    game_id = download.game_id
+    game = game_tracking.track(game_id)
+    game.update_status(GameStatus.skip_silence)
+    game.flush()
+
+    # the marks are read twice, once for the length and once for the list
+    marks = list(get_marks(game_id))
+    silent_length = _get_length_without_silence(game_id, marks)
+
+    game.update_status(GameStatus.obfuscating)
+    game.flush()
+
+    clips, desired_length = get_black_padding(silent_length)
+
+    concat_list_file = f"{game_id}/fused_concat_list.txt"
+    write_lines_to_file(
+        create_single_pass_concat_list(game_id, iter(marks))
+        + create_black_concat_content(clips),
+        concat_list_file,
+    )
+
+    Path(get_download_folder()).mkdir(parents=True, exist_ok=True)
+    output_file = get_partial_download_file_name(download)
+
+    tprint("Removing silence and obfuscating end time of video..")
+    try:
+        concat_video(concat_list_file, output_file, f"-t {desired_length}")
+    except Exception:
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        raise
+
+    os.remove(f"{game_id}_raw.mkv")
+
+
+def finish_fused_download(download: Download) -> None:
+    """
+    The video is already in the download folder, so moving it
+    into place is an atomic rename
+    """
+    game = game_tracking.track(download.game_id)
+    game.update_status(GameStatus.moving)
+    game.flush()
+
+    tprint(f"Moving final to video to {get_download_folder()}")
+    os.replace(
+        get_partial_download_file_name(download),
+        get_download_file_name(download),
+    )
+
+    game.update_status(GameStatus.completed)
+    game.download_finished()
+    game_tracking.release_tracked_game(download.game_id)
+
+    clean_up_download(download.game_id)
+
+
+def _get_length_without_silence(game_id: int, marks: List[str]) -> int:
+    """
+    Adds up the parts of the raw file we keep, the raw file is
+    only probed when the last part runs to the end of the video
+    """
+    length: float = 0
+    for start, end in get_non_silent_intervals(iter(marks)):
+        if end is None:
+            length += get_video_length(f"{game_id}_raw.mkv") - float(start)
+        else:
+            length += float(end) - float(start)
+    return int(length)
@@ -1,5 +1,6 @@
-from typing import Tuple, List, Iterable, Dict
-from datetime import datetime, timedelta, UTC
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, List, Iterable, Dict, Set
+from datetime import date, datetime, timedelta, UTC
 from urllib.parse import parse_qs, urlencode, urlparse
 from nhltv_lib.auth import verify_request_200
 from nhltv_lib.cache import cache_json, load_cache_json
@@ -11,7 +12,14 @@ from nhltv_lib.teams import get_team
 from nhltv_lib.common import dump_json_if_debug_enabled, tprint
 from nhltv_lib.types import Game, GameDict
 from nhltv_lib import game_tracking
-from nhltv_lib.models import DbGame
+from nhltv_lib.models import DbGame, GameStatus
+
+# how many days of the schedule are fetched at the same time
+SCHEDULE_WORKERS = 4
+
+# how long a day of the schedule is cached once every game on it has been
+# archived, longer than anyone searches back
+FINAL_SCHEDULE_EXPIRES_IN = 60 * 24 * 3600
 
 
 def get_checkinterval() -> int:
@@ -20,10 +28,9 @@ def get_checkinterval() -> int:
     """
     arguments = get_arguments()
 
-    try:
-        return int(arguments.checkinterval)
-    except TypeError:
+    if arguments.checkinterval is None:
         return 10
+    return int(arguments.checkinterval)
 
 
 def get_games_to_download() -> Tuple[Game, ...]:
@@ -34,9 +41,7 @@ def get_games_to_download() -> Tuple[Game, ...]:
     start_date: str = get_start_date()
     end_date: str = get_end_date()
 
-    all_games: dict = fetch_games(
-        get_schedule_url_between_dates(start_date, end_date)
-    )
+    all_games: dict = fetch_games(start_date, end_date)
 
     dump_json_if_debug_enabled(all_games)
 
@@ -70,10 +75,9 @@ def get_days_back() -> int:
     """
     arguments = get_arguments()
 
-    try:
-        return int(arguments.days_back_to_search)
-    except TypeError:
+    if arguments.days_back_to_search is None:
         return 3
+    return int(arguments.days_back_to_search)
 
 
 def get_end_date() -> str:
@@ -84,25 +88,100 @@ def get_end_date() -> str:
     return current_time.date().isoformat()
 
 
-def fetch_games(url: str) -> dict:
+def fetch_games(start_date: str, end_date: str) -> dict:
     """
-    Fetches all games from the NHL API and accumulates them into a single dictionary.
-    Uses caching to save results for up to 6 hours.
+    Fetches all games between the dates from the NHL API, one window
+    of a day at a time, concurrently, and merges them into a single
+    dictionary
     """
     tprint("Looking up games..")
-    all_games: Dict[str, List[Dict]] = {"data": []}
 
-    # Parse the initial URL to retrieve its query params
-    initial_url_parts = urlparse(url)
-    initial_query_params = parse_qs(initial_url_parts.query)
+    windows = get_schedule_windows(start_date, end_date)
+    with ThreadPoolExecutor(
+        max_workers=min(SCHEDULE_WORKERS, len(windows))
+    ) as executor:
+        window_games = list(
+            executor.map(lambda x: fetch_schedule_window(*x), windows)
+        )
+
+    return {"data": merge_games(window_games)}
+
+
+def fetch_schedule_window(start_date: str, end_date: str) -> List[Dict]:
+    """
+    Days on which every game has been archived will not change again,
+    so they are cached for a long time, any other day is fetched again
+    every time
+    """
+    url = get_schedule_url_between_dates(start_date, end_date)
+    cache_name = f"schedule_{start_date}"
+    cache_parameters = {"url": urlparse(url).query}
+    cached_content = load_cache_json(cache_name, cache_parameters)
+    if cached_content is not None:
+        return cached_content["data"]
+
+    games = fetch_schedule_pages(url)
+
+    if is_schedule_final(end_date, games):
+        cache_json(
+            cache_name,
+            cache_parameters,
+            expires_in=FINAL_SCHEDULE_EXPIRES_IN,
+            content={"data": games},
+        )
+    return games
+
+
+def is_schedule_final(end_date: str, games: List[Dict]) -> bool:
+    """
+    Returns True if the window has ended and the full game
+    of every game in it has been archived
+    """
+    if date.fromisoformat(end_date) > datetime.now().date():
+        return False
+
+    # the games of a day may not have been published yet, an empty
+    # day is looked up again rather than cached for good
+    if not games:
+        return False
+
+    for game in games:
+        full_games = [
+            i
+            for i in game["content"]
+            if i["contentType"]["name"] == "Full Game"
+        ]
+        if not full_games or not all(
+            i["status"]["isDelivered"] for i in full_games
+        ):
+            return False
+    return True
+
+
+def get_schedule_windows(
+    start_date: str, end_date: str
+) -> List[Tuple[str, str]]:
+    """
+    Splits the dates into windows of a day each, in order
+    """
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    windows: List[Tuple[str, str]] = []
+    while start < end:
+        next_day = start + timedelta(days=1)
+        windows.append((start.isoformat(), next_day.isoformat()))
+        start = next_day
+    return windows or [(start_date, end_date)]
 
-    # Check if the games are cached
-    cache_name = "nhl_games"
-    cached_content = load_cache_json(
-        cache_name, {"url": initial_url_parts.query}
-    )
-    if cached_content:
-        return cached_content
+
+def fetch_schedule_pages(url: str) -> List[Dict]:
+    """
+    Fetches the games at url, following the links to every next page
+    """
+    games_data: List[Dict] = []
+
+    # Parse the initial URL to retrieve its query params
+    initial_query_params = parse_qs(urlparse(url).query)
 
     while True:
         tprint(f"@ {url}")
@@ -110,8 +189,8 @@ def fetch_games(url: str) -> dict:
         verify_request_200(response, "Failed to fetch games")
 
         games = response.json()
-        if games_data := games.get("data"):
-            all_games["data"].extend(games_data)
+        if page_data := games.get("data"):
+            games_data.extend(page_data)
 
         if next_url := games.get("links", {}).get("next"):
             next_url_parts = urlparse(next_url)
@@ -120,20 +199,28 @@ def fetch_games(url: str) -> dict:
             next_query_params = parse_qs(next_url_parts.query)
             merged_query_params = {**initial_query_params, **next_query_params}
 
-            next_url = next_url_parts._replace(
+            url = next_url_parts._replace(
                 query=urlencode(merged_query_params, doseq=True)
             ).geturl()
-            url = next_url
         else:
             break
 
-    cache_json(
-        cache_name,
-        {"url": initial_url_parts.query},
-        expires_in=6 * 3600,
-        content=all_games,
-    )
-    return all_games
+    return games_data
+
+
+def merge_games(window_games: List[List[Dict]]) -> List[Dict]:
+    """
+    Merges the games of every window, in order, a game
+    that shows up in two windows is only kept once
+    """
+    merged: List[Dict] = []
+    seen_ids: Set[int] = set()
+    for games in window_games:
+        for game in games:
+            if game["id"] not in seen_ids:
+                seen_ids.add(game["id"])
+                merged.append(game)
+    return merged
 
 
 def filter_games(games: Dict[str, List[GameDict]]) -> Iterable[GameDict]:
@@ -141,10 +228,12 @@ def filter_games(games: Dict[str, List[GameDict]]) -> Iterable[GameDict]:
     Calls all other filter functions and returns what is left
     """
     games_w_team = filter_games_with_team(games)
-    games_started = filter_games_that_have_not_started(games_w_team)
-    not_downloaded = filter_games_already_downloaded(games_started)
+    games_started = tuple(filter_games_that_have_not_started(games_w_team))
+    # the tracking of every game left is loaded at once
+    tracked = game_tracking.get_tracked_games(i["id"] for i in games_started)
+    not_downloaded = filter_games_already_downloaded(games_started, tracked)
     no_duplicates = filter_duplicates(not_downloaded)
-    no_blackout_wait = filter_games_in_waiting(no_duplicates)
+    no_blackout_wait = filter_games_in_waiting(no_duplicates, tracked)
     return no_blackout_wait
 
 
@@ -187,19 +276,14 @@ def check_if_game_involves_team(game: GameDict) -> bool:
 
 
 def filter_games_already_downloaded(
-    games: Iterable[GameDict],
+    games: Iterable[GameDict], tracked: Dict[int, DbGame]
 ) -> Iterable[GameDict]:
     """
     Filter out games that have already been downloaded
     """
-    return filter(check_if_game_is_not_already_downloaded, games)
-
-
-def check_if_game_is_not_already_downloaded(game: GameDict) -> bool:
-    """
-    Returns false if the game has already been downloaded
-    """
-    return game_tracking.game_not_downloaded(game["id"])
+    return filter(
+        lambda x: game_tracking.is_not_downloaded(tracked.get(x["id"])), games
+    )
 
 
 def filter_duplicates(games: Iterable[GameDict]) -> Tuple[GameDict, ...]:
@@ -215,12 +299,17 @@ def filter_duplicates(games: Iterable[GameDict]) -> Tuple[GameDict, ...]:
     return tuple(new_games)
 
 
-def filter_games_in_waiting(games: Iterable[GameDict]) -> Iterable[GameDict]:
+def filter_games_in_waiting(
+    games: Iterable[GameDict], tracked: Dict[int, DbGame]
+) -> Iterable[GameDict]:
     """
     Filter out games that we need to wait on (ex. blackout)
     """
     return filter(
-        lambda x: game_tracking.ready_for_next_attempt(x["id"]), games
+        lambda x: game_tracking.is_ready_for_next_attempt(
+            tracked.get(x["id"])
+        ),
+        games,
     )
 
 
@@ -259,21 +348,20 @@ def add_games_to_tracking(games: Tuple[GameDict, ...]) -> List[DbGame]:
     """
     Creates games in the database from a list of games
     """
-    return list(map(add_game_to_tracking, games))
-
-
-def add_game_to_tracking(gamedict: GameDict) -> DbGame:
+    return game_tracking.start_tracking_games(map(create_db_game, games))
 
-    home_team = gamedict["homeCompetitor"]["name"]
-    away_team = gamedict["awayCompetitor"]["name"]
 
-    game = game_tracking.start_tracking_game(
-        gamedict["id"],
-        datetime.fromisoformat(gamedict["startTime"]),
-        home_team,
-        away_team,
+def create_db_game(gamedict: GameDict) -> DbGame:
+    """
+    Returns the database row for a game that is not tracked yet
+    """
+    return DbGame(  # type: ignore
+        id=gamedict["id"],
+        time=datetime.fromisoformat(gamedict["startTime"]),
+        status=GameStatus.waiting,
+        home_team=gamedict["homeCompetitor"]["name"],
+        away_team=gamedict["awayCompetitor"]["name"],
     )
-    return game
 
 
 def is_home_game(game: GameDict) -> bool:
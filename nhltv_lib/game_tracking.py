@@ -1,4 +1,6 @@
-from typing import Optional
+from threading import Lock, RLock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional
 from datetime import datetime, timedelta
 
 from nhltv_lib.common import tprint
@@ -6,10 +8,61 @@ from nhltv_lib.models import DbGame, GameStatus
 import nhltv_lib.db_session as db
 
 
+# how many ids are looked up per query, stays well below
+# the limit SQLite puts on the number of bound parameters
+BULK_QUERY_SIZE = 500
+
+# a change made this many seconds after the oldest change held back
+# writes them all, so that progress made during a long stage shows
+FLUSH_INTERVAL = 30
+
+_tracked_games: Dict[int, "TrackedGame"] = {}
+_tracked_games_lock = Lock()
+
+
 def _get_game_from_db(game_id: int) -> Optional[DbGame]:
     return db.session.query(DbGame).filter(DbGame.id == game_id).first()
 
 
+def get_tracked_games(game_ids: Iterable[int]) -> Dict[int, DbGame]:
+    """
+    Returns the tracked games among *game_ids* by id,
+    with one query per BULK_QUERY_SIZE ids
+    """
+    # the pipeline threads write through sessions of their own,
+    # rows this session has read before may have changed since
+    db.session.expire_all()
+
+    ids = list(set(game_ids))
+    games: Dict[int, DbGame] = {}
+    for i in range(0, len(ids), BULK_QUERY_SIZE):
+        chunk = ids[i : i + BULK_QUERY_SIZE]
+        for game in db.session.query(DbGame).filter(DbGame.id.in_(chunk)):
+            games[game.id] = game
+    return games
+
+
+def start_tracking_games(games: Iterable[DbGame]) -> List[DbGame]:
+    """
+    Adds those of *games* that are not tracked yet in one insert and one
+    commit, returns the tracked game for each of *games*
+    """
+    games = list(games)
+    tracked = get_tracked_games(i.id for i in games)
+
+    new_games: Dict[int, DbGame] = {}
+    for game in games:
+        if game.id not in tracked and game.id not in new_games:
+            new_games[game.id] = game
+
+    if new_games:
+        db.session.add_all(new_games.values())
+        db.session.commit()
+        tracked.update(new_games)
+
+    return [tracked[i.id] for i in games]
+
+
 # pylint: disable=too-many-arguments
 def start_tracking_game(
     game_id: int,
@@ -34,107 +87,160 @@ def start_tracking_game(
     return game
 
 
-def set_game_info(game_id: int, game_info: str) -> None:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.game_info = game_info
-    db.session.commit()
-
-
-def update_game_status(game_id: int, status: GameStatus) -> None:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.status = status
-    db.session.commit()
-
-
-def update_progress(game_id: int, progress: int, total: int) -> None:
+def get_download_attempts(game_id: int) -> Optional[int]:
     game = _get_game_from_db(game_id)
     if not game:
         tprint(f"Game {game_id} not found in database")
-        return
-    game.current_operation_progress = int((progress / total) * 100)
-    db.session.commit()
+        return None
+    return game.download_attempts
 
 
-def clear_progress(game_id: int) -> None:
-    game = _get_game_from_db(game_id)
+def is_not_downloaded(game: Optional[DbGame]) -> bool:
     if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.current_operation_progress = None
-    db.session.commit()
+        return True
+    return game.status != GameStatus.completed
 
 
-def get_download_attempts(game_id: int) -> Optional[int]:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return None
-    return game.download_attempts
+def is_ready_for_next_attempt(game: Optional[DbGame]) -> bool:
+    if not game or not game.next_attempt:
+        return True
+    return game.next_attempt <= datetime.now()
 
 
-def set_download_attempts(game_id: int, attempts: int) -> None:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.download_attempts = attempts
-    db.session.commit()
+class TrackedGame:
+    """
+    A game that is being worked on, changes to it are held back and
+    written with a single commit by flush(), which every stage calls as
+    it starts on the game and the pipeline calls once a stage is done
+    with it, changes made in between are written by the first change
+    made FLUSH_INTERVAL seconds after the oldest one held back
 
+    Only the values of the row are kept, not the row itself, as the
+    game is handed between the threads of the pipeline stages and
+    every thread has its own database session
+    """
 
-def increment_download_attempts(game_id: int) -> None:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    if game.download_attempts:
-        game.download_attempts += 1
-    else:
-        game.download_attempts = 1
-    db.session.commit()
+    def __init__(self, game_id: int) -> None:
+        self.game_id = game_id
+        self._row: Optional[Dict[str, Any]] = None
+        self._changes: Dict[str, Any] = {}
+        self._held_since: Optional[float] = None
+        self._lock = RLock()
 
+    def update_status(self, status: GameStatus) -> None:
+        self._set(status=status)
 
-def download_started(game_id: int) -> None:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.download_start = datetime.now()
-    db.session.commit()
+    def set_game_info(self, game_info: str) -> None:
+        self._set(game_info=game_info)
 
+    def update_progress(self, progress: int, total: int) -> None:
+        self._set(current_operation_progress=int((progress / total) * 100))
 
-def download_finished(game_id: int) -> None:
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.download_end = datetime.now()
-    db.session.commit()
+    def clear_progress(self) -> None:
+        self._set(current_operation_progress=None)
 
+    def download_started(self) -> None:
+        self._set(download_start=datetime.now())
 
-def game_not_downloaded(game_id: int) -> bool:
-    game = _get_game_from_db(game_id)
-    if not game:
-        return True
-    return game.status != GameStatus.completed
+    def download_finished(self) -> None:
+        self._set(download_end=datetime.now())
 
+    def set_blackout(self) -> None:
+        self._set(
+            status=GameStatus.blackout,
+            next_attempt=datetime.now() + timedelta(hours=4),
+        )
 
-def ready_for_next_attempt(game_id: int) -> bool:
-    game = _get_game_from_db(game_id)
-    if not game or not game.next_attempt:
-        return True
-    return game.next_attempt <= datetime.now()
+    def increment_download_attempts(self) -> None:
+        with self._lock:
+            self._set(
+                download_attempts=(self._get("download_attempts") or 0) + 1
+            )
+
+    def flush(self) -> None:
+        """
+        Writes the changes held back, call it before anything that
+        takes long so that the state of the game is up to date meanwhile
+        """
+        with self._lock:
+            if not self._changes:
+                return
+            changes: Dict[Any, Any] = self._changes
+            updated = (
+                db.session.query(DbGame)
+                .filter(DbGame.id == self.game_id)
+                .update(changes)
+            )
+            db.session.commit()
+            self._changes = {}
+            self._held_since = None
+            if self._row is not None:
+                self._row.update(changes)
+        if not updated:
+            tprint(f"Game {self.game_id} not found in database")
+
+    def _get(self, field: str) -> Any:
+        with self._lock:
+            if field in self._changes:
+                return self._changes[field]
+            if self._row is None:
+                game = _get_game_from_db(self.game_id)
+                self._row = {
+                    i: getattr(game, i) if game else None
+                    for i in DbGame.__table__.columns.keys()
+                }
+            return self._row[field]
+
+    def _set(self, **fields: Any) -> None:
+        with self._lock:
+            self._changes.update(fields)
+            if self._held_since is None:
+                self._held_since = monotonic()
+            elif monotonic() - self._held_since >= FLUSH_INTERVAL:
+                self.flush()
+
+
+def track(game_id: int) -> TrackedGame:
+    """
+    Returns the tracked game for *game_id*, the same one every time
+    until it is released
+    """
+    with _tracked_games_lock:
+        if game_id not in _tracked_games:
+            _tracked_games[game_id] = TrackedGame(game_id)
+        return _tracked_games[game_id]
+
+
+def flush_tracked_game(game_id: int) -> None:
+    with _tracked_games_lock:
+        game = _tracked_games.get(game_id)
+    if game:
+        game.flush()
+
+
+def release_tracked_game(game_id: int) -> None:
+    """
+    Writes what is left of the changes to a game that is done with
+    """
+    with _tracked_games_lock:
+        game = _tracked_games.pop(game_id, None)
+    if game:
+        game.flush()
+
+
+def drop_tracked_game(game_id: int) -> None:
+    """
+    Forgets a game without writing its changes, the next
+    time it is tracked its row is read again
+    """
+    with _tracked_games_lock:
+        _tracked_games.pop(game_id, None)
 
 
 def set_blackout(game_id: int) -> None:
-    update_game_status(game_id, GameStatus.blackout)
-    game = _get_game_from_db(game_id)
-    if not game:
-        tprint(f"Game {game_id} not found in database")
-        return
-    game.next_attempt = datetime.now() + timedelta(hours=4)
+    """
+    Puts off the next attempt at a game that is blacked out,
+    the game is done with until then
+    """
+    track(game_id).set_blackout()
+    release_tracked_game(game_id)
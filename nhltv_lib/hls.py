@@ -0,0 +1,353 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+import requests
+
+from nhltv_lib.common import tprint, verify_request_200
+from nhltv_lib.exceptions import DownloadError
+from nhltv_lib.requests_wrapper import create_session, retry_function
+
+# streamlink and pycryptodome take long to import and are only
+# needed once a game is downloaded, so they are imported when used
+if TYPE_CHECKING:
+    from streamlink.stream.hls.m3u8 import M3U8, HLSSegment
+
+PLAYLIST_TIMEOUT = 15
+SEGMENT_TIMEOUT = 30
+
+# how many segments per worker may be buffered while waiting
+# for an earlier segment to finish, bounds memory use of the reorder buffer
+REORDER_BUFFER_FACTOR = 2
+
+
+def download_hls_stream(  # pylint: disable=too-many-arguments
+    url: str,
+    output_file: str,
+    headers: Dict[str, str],
+    workers: int,
+    max_duration: Optional[float] = None,
+    journal_file: Optional[str] = None,
+    on_segment_data: Optional[Callable[[bytes, int], None]] = None,
+) -> None:
+    """
+    Downloads the HLS stream at *url* into *output_file* using
+    *workers* concurrent segment downloads over a shared connection pool
+
+    If *journal_file* is given every written segment is recorded in it
+    and a later call with the same journal resumes where this one stopped
+
+    *on_segment_data* is called with the data of every segment, in order,
+    and the offset in *output_file* it was written at, an offset of 0
+    means the download started over from the beginning
+    """
+    # one connection per worker, set up the same way as for API requests,
+    # segment requests are retried but not rate limited like the API is,
+    # a download makes hundreds of them a minute
+    session = create_session(headers, workers)
+    try:
+        segments = _limit_segments_to_duration(
+            resolve_media_playlist(session, url).segments, max_duration
+        )
+        header = _get_journal_header(segments)
+        segments, offset = _skip_journaled_segments(
+            segments, header, journal_file, output_file
+        )
+        keys = _fetch_keys(session, segments)
+
+        tprint(
+            f"Downloading {len(segments)} segments with {workers} workers",
+            debug_only=True,
+        )
+        with open(output_file, "r+b" if offset else "wb") as file_out:
+            file_out.truncate(offset)
+            file_out.seek(offset)
+            with _open_journal(journal_file, header, offset) as journal:
+                download_segments(
+                    session,
+                    segments,
+                    keys,
+                    file_out,
+                    workers,
+                    partial(
+                        _on_segment_written, journal, file_out, on_segment_data
+                    ),
+                )
+    finally:
+        session.close()
+
+
+def resolve_media_playlist(session: requests.Session, url: str) -> "M3U8":
+    """
+    Fetches the playlist at *url*, if it is a master playlist the variant
+    with the highest bandwidth is resolved and returned instead
+    """
+    playlist = _fetch_playlist(session, url)
+    if playlist.is_master:
+        variants = [i for i in playlist.playlists if not i.is_iframe]
+        if not variants:
+            raise DownloadError(f"No playable variants found in {url}")
+        best = max(variants, key=lambda x: x.stream_info.bandwidth)
+        playlist = _fetch_playlist(session, best.uri)
+    return playlist
+
+
+def _fetch_playlist(session: requests.Session, url: str) -> "M3U8":
+    # pylint: disable=import-outside-toplevel
+    from streamlink.stream.hls.m3u8 import parse_m3u8
+
+    response = retry_function(session.get, url, timeout=PLAYLIST_TIMEOUT)
+    verify_request_200(response, "Failed to fetch playlist")
+    return parse_m3u8(response.text, url)
+
+
+def _limit_segments_to_duration(
+    segments: List["HLSSegment"], max_duration: Optional[float]
+) -> List["HLSSegment"]:
+    """
+    Returns the segments that fit in *max_duration* seconds
+    """
+    if max_duration is None:
+        return segments
+
+    limited: List["HLSSegment"] = []
+    total: float = 0
+    for segment in segments:
+        if total >= max_duration:
+            break
+        limited.append(segment)
+        total += segment.duration
+    return limited
+
+
+def _fetch_keys(
+    session: requests.Session, segments: List["HLSSegment"]
+) -> Dict[str, bytes]:
+    """
+    Fetches every distinct decryption key referenced by *segments* up front
+    so the workers never have to coordinate on key downloads
+    """
+    keys: Dict[str, bytes] = {}
+    for segment in segments:
+        key = segment.key
+        if key is None or key.method == "NONE":
+            continue
+        if key.method != "AES-128":
+            raise DownloadError(f"Unable to decrypt cipher {key.method}")
+        if not key.uri:
+            raise DownloadError("Missing URI for decryption key")
+        if key.uri not in keys:
+            response = retry_function(
+                session.get, key.uri, timeout=PLAYLIST_TIMEOUT
+            )
+            verify_request_200(response, "Failed to fetch decryption key")
+            keys[key.uri] = response.content
+    return keys
+
+
+def download_segments(  # pylint: disable=too-many-arguments
+    session: requests.Session,
+    segments: List["HLSSegment"],
+    keys: Dict[str, bytes],
+    file_out: BinaryIO,
+    workers: int,
+    on_segment_written: Optional[Callable[["HLSSegment", bytes], None]] = None,
+) -> None:
+    """
+    Fetches *segments* concurrently and writes them to *file_out* in
+    playlist order, segments that finish early wait in a bounded
+    reorder buffer until every segment before them has been written
+    """
+    pending: Deque[Tuple["HLSSegment", Future]] = deque()
+    buffer_size = workers * REORDER_BUFFER_FACTOR
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for segment in segments:
+            pending.append(
+                (
+                    segment,
+                    executor.submit(
+                        retry_function, _fetch_segment, session, segment, keys
+                    ),
+                )
+            )
+            if len(pending) >= buffer_size:
+                _write_next_segment(pending, file_out, on_segment_written)
+        while pending:
+            _write_next_segment(pending, file_out, on_segment_written)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _write_next_segment(
+    pending: Deque[Tuple["HLSSegment", Future]],
+    file_out: BinaryIO,
+    on_segment_written: Optional[Callable[["HLSSegment", bytes], None]],
+) -> None:
+    segment, future = pending.popleft()
+    data: bytes = future.result()
+    file_out.write(data)
+    if on_segment_written is not None:
+        on_segment_written(segment, data)
+
+
+def _get_journal_header(segments: List["HLSSegment"]) -> str:
+    """
+    Identifies the playlist a journal belongs to, so that a journal
+    written for a different stream is never resumed from
+    """
+    if not segments:
+        return "segments\n"
+    return f"segments {segments[0].num}-{segments[-1].num}\n"
+
+
+def _get_resume_point(
+    journal_file: Optional[str], header: str, output_file: str
+) -> Tuple[Optional[int], int]:
+    """
+    Returns the media sequence number of the last segment recorded in
+    the journal and the size of the output file after it was written,
+    or (None, 0) if the download can not be resumed
+    """
+    if journal_file is None or not os.path.isfile(journal_file):
+        return None, 0
+    if not os.path.isfile(output_file):
+        return None, 0
+
+    with open(journal_file, "r") as f:
+        lines = f.readlines()
+
+    if not lines or lines[0] != header:
+        return None, 0
+
+    last_segment: Optional[int] = None
+    offset: int = 0
+    for line in lines[1:]:
+        # a torn write from a crash, everything before it is still valid
+        if not line.endswith("\n"):
+            break
+        num, end = line.split()
+        last_segment, offset = int(num), int(end)
+
+    if os.path.getsize(output_file) < offset:
+        return None, 0
+
+    return last_segment, offset
+
+
+def _skip_journaled_segments(
+    segments: List["HLSSegment"],
+    header: str,
+    journal_file: Optional[str],
+    output_file: str,
+) -> Tuple[List["HLSSegment"], int]:
+    """
+    Leaves out the segments the journal says are already in *output_file*,
+    returns the segments left and the offset to continue writing at
+    """
+    last_segment, offset = _get_resume_point(journal_file, header, output_file)
+    if last_segment is None:
+        return segments, offset
+
+    segments = [i for i in segments if i.num > last_segment]
+    tprint(
+        f"Resuming download after segment {last_segment}, "
+        f"{len(segments)} segments left"
+    )
+    return segments, offset
+
+
+@contextmanager
+def _open_journal(
+    journal_file: Optional[str], header: str, offset: int
+) -> Iterator[TextIO]:
+    """
+    Opens the journal to append to it when resuming from *offset*,
+    otherwise starts it over with *header*
+    """
+    if journal_file is None:
+        with open(os.devnull, "w") as journal:
+            yield journal
+        return
+
+    with open(journal_file, "a" if offset else "w") as journal:
+        if not offset:
+            journal.write(header)
+            journal.flush()
+        yield journal
+
+
+def _record_segment(
+    journal: TextIO, file_out: BinaryIO, segment: "HLSSegment"
+) -> None:
+    """
+    Records that *segment* has been written, the output is synced to disk
+    first so that the journal never points past data that is not in the
+    file, not even after the machine crashes
+    """
+    file_out.flush()
+    os.fsync(file_out.fileno())
+    journal.write(f"{segment.num} {file_out.tell()}\n")
+    journal.flush()
+
+
+def _on_segment_written(
+    journal: TextIO,
+    file_out: BinaryIO,
+    on_segment_data: Optional[Callable[[bytes, int], None]],
+    segment: "HLSSegment",
+    data: bytes,
+) -> None:
+    offset = file_out.tell() - len(data)
+    _record_segment(journal, file_out, segment)
+    if on_segment_data is not None:
+        on_segment_data(data, offset)
+
+
+def _fetch_segment(
+    session: requests.Session, segment: "HLSSegment", keys: Dict[str, bytes]
+) -> bytes:
+    response = session.get(segment.uri, timeout=SEGMENT_TIMEOUT)
+    if response.status_code != 200:
+        raise DownloadError(
+            f"Failed to fetch segment {segment.num}: {response.status_code}"
+        )
+    data: bytes = response.content
+
+    key = segment.key
+    if key is not None and key.uri in keys:
+        data = _decrypt_segment(data, keys[key.uri], key.iv, segment.num)
+
+    return data
+
+
+def _decrypt_segment(
+    data: bytes, key: bytes, iv: Optional[bytes], sequence: int
+) -> bytes:
+    """
+    Decrypts an AES-128 encrypted segment, if the playlist does not specify
+    an IV the media sequence number is used as per the HLS spec
+    """
+    # pylint: disable=import-outside-toplevel
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import unpad
+
+    if iv is None:
+        iv = sequence.to_bytes(16, "big")
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    return unpad(cipher.decrypt(data), AES.block_size, style="pkcs7")
@@ -1,25 +1,25 @@
 from typing import Tuple, List
+import sys
 from time import sleep
 from datetime import datetime
 
+from nhltv_lib.arguments import Config, parse_args, set_config
 from nhltv_lib.housekeeping import do_housekeeping
 from nhltv_lib.models import GameStatus
 from nhltv_lib.process import verify_cmd_exists_in_path
 from nhltv_lib.game import get_games_to_download, get_checkinterval
 from nhltv_lib.stream import get_streams_to_download
-from nhltv_lib.download import clean_up_download, download_game
-from nhltv_lib.skip_silence import skip_silence
+from nhltv_lib.pipeline import run_pipeline
+from nhltv_lib.requests_wrapper import get_circuit_states
 from nhltv_lib.common import tprint
 from nhltv_lib.auth import (
     login_and_save_cookie,
     get_auth_cookie_expires_in_minutes,
 )
-from nhltv_lib.exceptions import AuthenticationFailed, BlackoutRestriction
-from nhltv_lib.obfuscate import obfuscate
 from nhltv_lib.downloaded_games import (
     get_downloaded_games,
 )
-from nhltv_lib.types import Download, NHLStream, Game
+from nhltv_lib.types import NHLStream, Game
 from nhltv_lib import game_tracking
 from nhltv_lib.db_session import setup_db
 
@@ -52,6 +52,8 @@ def main() -> None:
     Sets up the application and starts the main loop
     """
 
+    set_config(Config(parse_args(sys.argv[1:])))
+
     setup_db()
 
     migrate_old_downloaded_games()
@@ -72,6 +74,7 @@ def run_loop() -> None:
 
 def loop() -> None:
     get_and_download_games()
+    log_circuit_states()
     check_interval = get_checkinterval()
     do_housekeeping()
     tprint(
@@ -86,6 +89,21 @@ def loop() -> None:
         login_and_save_cookie()
 
 
+def log_circuit_states() -> None:
+    """
+    Logs the endpoints requests are paused to, and
+    the state of every circuit when debugging
+    """
+    states = get_circuit_states()
+    tprint(
+        "Circuits: " + ", ".join(f"{k} {v}" for k, v in states.items()),
+        debug_only=True,
+    )
+    not_closed = [f"{k} ({v})" for k, v in states.items() if v != "closed"]
+    if not_closed:
+        tprint("Requests are paused to " + ", ".join(not_closed))
+
+
 def get_and_download_games() -> None:
     """
     Gets all games that matches criteria and starts downloading them
@@ -94,30 +112,7 @@ def get_and_download_games() -> None:
 
     streams: List[NHLStream] = get_streams_to_download(games_to_download)
 
-    for i in streams:
-        download(i)
-
-
-# pylint: disable=inconsistent-return-statements
-def download(stream: NHLStream, attempts: int = 0) -> None:
-    """
-    Loop for downloading a single game, retrying if authentication fails
-    """
-    try:
-        dl: Download = download_game(stream)
-        skip_silence(dl)
-        obfuscate(dl)
-        clean_up_download(dl.game_id)
-    except AuthenticationFailed:
-        if attempts < 1:
-            login_and_save_cookie()
-            return download(stream, attempts + 1)
-        game_tracking.update_game_status(
-            stream.game_id, GameStatus.auth_failure
-        )
-        raise
-    except BlackoutRestriction:
-        game_tracking.set_blackout(stream.game_id)
+    run_pipeline(streams)
 
 
 if __name__ == "__main__":
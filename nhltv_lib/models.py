@@ -28,9 +28,9 @@ class DbGame(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     home_team: Mapped[Optional[str]] = mapped_column(String(250))
     away_team: Mapped[Optional[str]] = mapped_column(String(250))
-    time: Mapped[Optional[DateTime]] = mapped_column(DateTime)
+    time: Mapped[Optional[DateTime]] = mapped_column(DateTime, index=True)
     status: Mapped[GameStatus] = mapped_column(
-        SQLAlchemyEnum(GameStatus), nullable=False
+        SQLAlchemyEnum(GameStatus), nullable=False, index=True
     )
     current_operation_progress: Mapped[Optional[int]] = mapped_column(Integer)
     game_info: Mapped[Optional[str]] = mapped_column(String(250))
@@ -39,4 +39,6 @@ class DbGame(Base):
         DateTime
     )
     download_end: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
-    next_attempt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    next_attempt: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime, index=True
+    )
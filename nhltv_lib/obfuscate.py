@@ -1,75 +1,100 @@
-from typing import List
+from functools import lru_cache
+from math import ceil
+from typing import List, Tuple
 import os
 
 
 from nhltv_lib.common import (
-    move_file_to_download_folder,
     write_lines_to_file,
     tprint,
 )
-from nhltv_lib.ffmpeg import cut_video, get_video_length, concat_video
+from nhltv_lib.ffmpeg import get_video_length, concat_video
 from nhltv_lib.types import Download
 
 from nhltv_lib import game_tracking
 from nhltv_lib.models import GameStatus
 
+BLACK_CLIP = os.path.join(os.path.dirname(__file__), "extras/black.mkv")
+
+# the most black the video is padded with, in clips
+MAX_BLACK_CLIPS = 100
+
 
 def obfuscate(download: Download) -> None:
     """
-    Pads the end of the video with 100 minutes of black
+    Pads the end of the video with black up to the closest hour,
+    rounding down, that the video padded with 100 black clips reaches
     """
-    game_tracking.update_game_status(download.game_id, GameStatus.obfuscating)
+    game = game_tracking.track(download.game_id)
+    game.update_status(GameStatus.obfuscating)
+    game.flush()
 
     input_file: str = f"{download.game_id}_silent.mkv"
 
-    obfuscate_concat_content = _create_obfuscation_concat_content(input_file)
+    video_length = get_video_length(input_file)
+    clips, desired_length = get_black_padding(video_length)
+
+    obfuscate_concat_content = _create_obfuscation_concat_content(
+        input_file, clips
+    )
     concat_list_file = f"{download.game_id}/obfuscate_concat_list.txt"
 
     write_lines_to_file(obfuscate_concat_content, concat_list_file)
 
     tprint("Obfuscating end time of video..")
-    output_file: str = f"{download.game_id}_obfuscated.mkv"
-    concat_video(concat_list_file, output_file)
+    output_file: str = f"{download.game_id}_ready.mkv"
+    # the last black clip is trimmed so the video ends on the hour
+    concat_video(concat_list_file, output_file, f"-t {desired_length}")
 
     os.remove(input_file)
 
-    cut_to_closest_hour(download.game_id)
-
-    game_tracking.update_game_status(download.game_id, GameStatus.moving)
 
-    move_file_to_download_folder(download)
-
-    game_tracking.update_game_status(download.game_id, GameStatus.completed)
-    game_tracking.download_finished(download.game_id)
+def get_black_padding(video_length: int) -> Tuple[int, int]:
+    """
+    Returns how many black clips to append to a video of *video_length*
+    seconds and the length in seconds to cut the padded video to
+    """
+    black_length = _get_black_clip_length()
+    desired_length = _get_desired_length_after_obfuscation(
+        video_length + MAX_BLACK_CLIPS * black_length
+    )
+    clips = _get_black_clips_needed(video_length, black_length, desired_length)
+    return clips, desired_length
 
 
-def _create_obfuscation_concat_content(input_file: str) -> List[str]:
-    black = os.path.join(os.path.dirname(__file__), "extras/black.mkv")
-    content: List[str] = []
-    content.append("file\t" + f"../{input_file}" + "\n")
-    for _ in range(100):
-        content.append("file\t" + black + "\n")
-    return content
+@lru_cache(maxsize=None)
+def _get_black_clip_length() -> int:
+    """
+    The black clip never changes, so it only needs to be probed once
+    """
+    return get_video_length(BLACK_CLIP)
 
 
-def cut_to_closest_hour(game_id: int) -> None:
+def _get_black_clips_needed(
+    video_length: int, black_length: int, desired_length: int
+) -> int:
     """
-    Cuts video to the closest hour, rounding down, minimum 1
+    How many black clips it takes to pad *video_length* to at least
+    *desired_length*, the lengths are rounded down so this never
+    comes up short
     """
-    input_file = f"{game_id}_obfuscated.mkv"
-
-    video_length: int = get_video_length(input_file)
+    padding = desired_length - video_length
+    if padding <= 0:
+        return 0
+    return min(MAX_BLACK_CLIPS, ceil(padding / max(1, black_length)))
 
-    desired_len_in_seconds = _get_desired_length_after_obfuscation(
-        video_length
-    )
 
-    tprint("Cutting video to closest hour", debug_only=True)
-    output_file: str = f"{game_id}_ready.mkv"
+def _create_obfuscation_concat_content(
+    input_file: str, clips: int
+) -> List[str]:
+    content: List[str] = []
+    content.append("file\t" + f"../{input_file}" + "\n")
+    content.extend(create_black_concat_content(clips))
+    return content
 
-    cut_video(input_file, output_file, desired_len_in_seconds)
 
-    os.remove(input_file)
+def create_black_concat_content(clips: int) -> List[str]:
+    return ["file\t" + BLACK_CLIP + "\n" for _ in range(clips)]
 
 
 def _get_desired_length_after_obfuscation(length: int) -> int:
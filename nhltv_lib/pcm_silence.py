@@ -0,0 +1,93 @@
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import numpy as np
+
+# signed 16 bit little endian, mono
+SAMPLE_WIDTH = 2
+SAMPLE_FORMAT = "<i2"
+FULL_SCALE = 32768
+
+# the RMS is computed over windows of this length, ffmpeg logs where
+# silence starts and ends to the millisecond so windows of a millisecond
+# put them on the same grid and the marks come out identical
+WINDOW_SECONDS = 0.001
+
+# how much audio is read and analyzed at a time
+BLOCK_SECONDS = 60
+
+
+def detect_silence_in_pcm(
+    pcm: BinaryIO,
+    sample_rate: int,
+    noise_db: float = -50,
+    duration: float = 10,
+) -> Iterator[Tuple[float, float]]:
+    """
+    Yields (start, end) in seconds of every part of the mono s16le *pcm*
+    that stays below *noise_db* for at least *duration* seconds, the same
+    semantics as ffmpeg's silencedetect=n={noise_db}dB:d={duration}
+
+    A silence that lasts until the end of the audio ends at the end of it,
+    as ffmpeg reports it
+    """
+    window = max(1, int(sample_rate * WINDOW_SECONDS))
+    threshold = 10 ** (noise_db / 20) * FULL_SCALE
+    min_samples = duration * sample_rate
+
+    run_start: Optional[int] = None
+    for position, silent in _get_silence_changes(pcm, window, threshold):
+        if silent:
+            if run_start is None:
+                run_start = position
+        elif run_start is not None:
+            if position - run_start >= min_samples:
+                yield run_start / sample_rate, position / sample_rate
+            run_start = None
+
+
+def _get_silence_changes(
+    pcm: BinaryIO, window: int, threshold: float
+) -> Iterator[Tuple[int, bool]]:
+    """
+    Yields (sample, silent) for the window at every sample where silence
+    may start or stop, the last one is (number of samples, False) so that
+    a silence lasting until the end of the audio ends there
+    """
+    block_bytes = window * SAMPLE_WIDTH * int(BLOCK_SECONDS / WINDOW_SECONDS)
+    position = 0
+
+    while True:
+        data = pcm.read(block_bytes)
+        if not data:
+            break
+        samples = np.frombuffer(
+            data[: len(data) - len(data) % SAMPLE_WIDTH], dtype=SAMPLE_FORMAT
+        )
+        silent = _get_silent_windows(samples, window, threshold)
+
+        # only the windows where silence starts or stops need looking at
+        changes = np.flatnonzero(silent[1:] != silent[:-1]) + 1
+        for i in [0, *changes.tolist()]:
+            yield position + i * window, bool(silent[i])
+
+        position += len(samples)
+
+    yield position, False
+
+
+def _get_silent_windows(
+    samples: np.ndarray, window: int, threshold: float
+) -> np.ndarray:
+    """
+    Returns whether the RMS of each window of *samples* is below
+    *threshold*, a trailing partial window is measured on its own
+    """
+    full = len(samples) // window * window
+    windows = samples[:full].reshape(-1, window).astype(np.float32)
+    rms = np.sqrt(np.mean(windows**2, axis=1))
+
+    if full < len(samples):
+        tail = samples[full:].astype(np.float32)
+        rms = np.append(rms, np.sqrt(np.mean(tail**2)))
+
+    return rms < threshold
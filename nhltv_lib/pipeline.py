@@ -0,0 +1,170 @@
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, Callable, List, Optional
+
+from nhltv_lib import game_tracking
+from nhltv_lib.auth import login_and_save_cookie
+from nhltv_lib.common import tprint
+from nhltv_lib.download import download_game, finish_download
+from nhltv_lib.exceptions import AuthenticationFailed, BlackoutRestriction
+from nhltv_lib.fused import finish_fused_download, fused_postprocess
+from nhltv_lib.models import GameStatus
+from nhltv_lib.obfuscate import obfuscate
+from nhltv_lib.settings import get_fused_postprocessing, get_stage_concurrency
+from nhltv_lib.skip_silence import skip_silence
+from nhltv_lib.types import Download, NHLStream, Stage
+import nhltv_lib.db_session as db
+
+# how many finished games may wait in front of each stage,
+# keeps the amount of intermediate video files on disk bounded
+QUEUE_SIZE = 1
+
+_DONE = object()
+
+_login_lock = Lock()
+
+
+def get_stages() -> List[Stage]:
+    """
+    Returns the stages every game passes through, in order
+    """
+    if get_fused_postprocessing():
+        return [
+            Stage("download", download, get_stage_concurrency("downloads")),
+            Stage(
+                "postprocess",
+                _pass_through(fused_postprocess),
+                get_stage_concurrency("skip_silence"),
+            ),
+            Stage(
+                "move",
+                _pass_through(finish_fused_download),
+                get_stage_concurrency("moves"),
+            ),
+        ]
+
+    return [
+        Stage("download", download, get_stage_concurrency("downloads")),
+        Stage(
+            "skip_silence",
+            _pass_through(skip_silence),
+            get_stage_concurrency("skip_silence"),
+        ),
+        Stage(
+            "obfuscate",
+            _pass_through(obfuscate),
+            get_stage_concurrency("obfuscate"),
+        ),
+        Stage(
+            "move",
+            _pass_through(finish_download),
+            get_stage_concurrency("moves"),
+        ),
+    ]
+
+
+def run_pipeline(streams: List[NHLStream]) -> None:
+    """
+    Runs all streams through the stages, with bounded queues between them,
+    so that one game can be downloading while another is post-processed
+
+    Errors in one game do not stop the others, the first error is raised
+    once every game has gone as far through the pipeline as it can
+    """
+    stages = get_stages()
+    queues: List[Queue] = [Queue(maxsize=QUEUE_SIZE) for _ in stages]
+    errors: List[Exception] = []
+
+    workers: List[List[Thread]] = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        threads = [
+            Thread(
+                target=_run_stage_worker,
+                args=(stage, queues[i], outbox, errors),
+                name=f"{stage.name}-{n}",
+                daemon=True,
+            )
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        workers.append(threads)
+
+    for stream in streams:
+        queues[0].put(stream)
+
+    # a stage is only told to stop once every worker
+    # in the stage before it has finished
+    for i, stage in enumerate(stages):
+        for _ in range(stage.workers):
+            queues[i].put(_DONE)
+        for thread in workers[i]:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _run_stage_worker(
+    stage: Stage,
+    inbox: Queue,
+    outbox: Optional[Queue],
+    errors: List[Exception],
+) -> None:
+    try:
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            try:
+                result = stage.function(item)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                tprint(f"Game {item.game_id} failed in {stage.name}: {e!r}")
+                errors.append(e)
+                game_tracking.drop_tracked_game(item.game_id)
+                continue
+            if result is not None and outbox is not None:
+                outbox.put(result)
+    finally:
+        # the session of this thread, and its connection, are done with
+        db.session.remove()
+
+
+def _pass_through(function: Callable[[Download], Any]) -> Callable:
+    """
+    Wraps a stage function that works on a download in place
+    so that the download is handed on to the next stage
+    """
+
+    def stage_function(dl: Download) -> Download:
+        try:
+            function(dl)
+        finally:
+            # what the stage changed is written once it is done with
+            game_tracking.flush_tracked_game(dl.game_id)
+        return dl
+
+    return stage_function
+
+
+def download(stream: NHLStream, attempts: int = 0) -> Optional[Download]:
+    """
+    Downloads a single game, retrying if authentication fails
+    """
+    try:
+        return download_game(stream)
+    except AuthenticationFailed:
+        if attempts < 1:
+            with _login_lock:
+                login_and_save_cookie()
+            return download(stream, attempts + 1)
+        game_tracking.track(stream.game_id).update_status(
+            GameStatus.auth_failure
+        )
+        raise
+    except BlackoutRestriction:
+        game_tracking.set_blackout(stream.game_id)
+        return None
+    finally:
+        game_tracking.flush_tracked_game(stream.game_id)
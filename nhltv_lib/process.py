@@ -1,7 +1,11 @@
-from typing import Tuple, Iterator, List, Callable
+from typing import Tuple, Iterator, List, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
 import subprocess
 from nhltv_lib.exceptions import CommandMissing, ExternalProgramError
 from nhltv_lib.common import tprint
+from nhltv_lib.settings import get_max_processes
+from nhltv_lib.types import SubprocessResult
 
 
 def call_subprocess(command: str) -> subprocess.Popen:
@@ -17,6 +21,20 @@ def call_subprocess(command: str) -> subprocess.Popen:
     )
 
 
+def call_subprocess_with_stdin(command: str) -> subprocess.Popen:
+    """
+    Calls a subprocess that reads its input from a pipe and returns it
+    """
+    return subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        shell=True,
+        text=False,
+    )
+
+
 def call_subprocess_and_get_stdout_iterator(
     command: str, timeout: int = 3600
 ) -> Tuple[subprocess.Popen, Iterator[bytes]]:
@@ -73,6 +91,41 @@ def call_subprocess_and_raise_on_error(
     return stdout.splitlines()
 
 
+def run_subprocess(command: str, timeout: int = 3600) -> SubprocessResult:
+    """
+    Runs *command* to completion, draining stdout and stderr while it runs
+    so it can never block on a full pipe, and returns its result
+    """
+    start = monotonic()
+    process = call_subprocess(command)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        stdout, stderr = process.communicate()
+    return SubprocessResult(
+        command, process.returncode, stdout, stderr, monotonic() - start
+    )
+
+
+def run_subprocesses(
+    commands: List[str],
+    max_processes: Optional[int] = None,
+    timeout: int = 3600,
+) -> List[SubprocessResult]:
+    """
+    Runs *commands* with at most *max_processes* of them running at the
+    same time and returns their results in the same order as *commands*
+    """
+    if max_processes is None:
+        max_processes = get_max_processes()
+
+    with ThreadPoolExecutor(max_workers=max_processes) as executor:
+        return list(
+            executor.map(lambda x: run_subprocess(x, timeout), commands)
+        )
+
+
 def verify_cmd_exists_in_path(cmd: str) -> None:
     """
     Verifies that *cmd* exists by running `which {cmd}` and ensuring rc is 0
@@ -1,25 +1,321 @@
-from typing import Any, Callable
-from time import sleep
+from typing import Any, Callable, Dict, Optional, Tuple
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
 import requests
+from requests.adapters import HTTPAdapter
+from nhltv_lib.constants import HEADERS
+from nhltv_lib.common import tprint
+from nhltv_lib.exceptions import CircuitOpen, DownloadError
+from nhltv_lib.settings import get_retry_policy
+from nhltv_lib.types import RetryPolicy
+from nhltv_lib.urls import NHLTV_BASE_API_URL
 
-max_retries = 3
+# connection problems and timeouts from requests are all OSErrors,
+# anything else is a bug or an answer that will not change on retrying
+RETRYABLE_EXCEPTIONS = (OSError, DownloadError)
 
+# enough connections for every concurrent lookup of streams and schedules
+POOL_SIZE = 16
+DEFAULT_TIMEOUT = 15
 
-# pylint: disable=broad-exception-caught, inconsistent-return-statements
-def retry_function(function: Callable, *args, **kwargs) -> Any:
-    for i in range(max_retries):
+# requests per second and burst size per endpoint family
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "login": (0.5, 2),
+    "events": (5, 10),
+    "player-settings": (5, 10),
+    "check-access": (2, 4),
+    "stream": (2, 4),
+    "other": (5, 10),
+}
+
+# the API paths of each endpoint family, anything not on the API is a stream,
+# the HLS playlists and segments of a download are fetched by nhltv_lib.hls
+# over its own session and go through neither the limit nor the circuit
+ENDPOINT_FAMILIES: Tuple[Tuple[str, str], ...] = (
+    ("/sso/nhl/login", "login"),
+    ("/events", "events"),
+    ("/player-settings", "player-settings"),
+    ("/check-access", "check-access"),
+)
+
+# consecutive failures that open a circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 60
+
+_session: Optional[requests.Session] = None
+_session_lock = Lock()
+
+
+class TokenBucket:  # pylint: disable=too-few-public-methods
+    """
+    Lets through *rate* calls per second on average,
+    and up to *capacity* calls at once after a quiet period
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens: float = capacity
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        """
+        Takes a token, waiting for one to be added if there are none
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate,
+            )
+            self._updated = now
+            # the token is taken right away, callers that come in while
+            # this one waits queue up behind it
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after *failure_threshold* failures in a row, calls are refused
+    while it is open, once *cooldown* seconds have passed one call is let
+    through to find out if the endpoint has recovered
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = Lock()
+
+    def before_call(self) -> None:
+        """
+        Raises CircuitOpen if the call should not be made
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if (
+                self.state == self.OPEN
+                and monotonic() - self._opened_at >= self.cooldown
+            ):
+                self._set_state(self.HALF_OPEN)
+                return
+        raise CircuitOpen(f"Requests to {self.name} are paused")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED
+                and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = monotonic()
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state: str) -> None:
+        tprint(f"Circuit for {self.name} requests is {state}")
+        self.state = state
+
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def reset_endpoint_guards() -> None:
+    """
+    Starts every endpoint family with a full bucket and a closed circuit
+    """
+    for family, (rate, capacity) in RATE_LIMITS.items():
+        _rate_limiters[family] = TokenBucket(rate, capacity)
+        _circuit_breakers[family] = CircuitBreaker(
+            family, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN
+        )
+
+
+reset_endpoint_guards()
+
+
+def get_endpoint_family(url: str) -> str:
+    if not url.startswith(NHLTV_BASE_API_URL):
+        return "stream"
+    for path, family in ENDPOINT_FAMILIES:
+        if path in url:
+            return family
+    return "other"
+
+
+def get_circuit_states() -> Dict[str, str]:
+    """
+    The state of the circuit of every endpoint family
+    """
+    return {name: i.state for name, i in _circuit_breakers.items()}
+
+
+def _guard_endpoint(method: Callable) -> Callable:
+    """
+    Wraps a request method so that every call waits its turn with the
+    rate limiter of its endpoint family and goes through its circuit
+    """
+
+    def call(*args, **kwargs) -> Any:
+        url = str(args[0] if args else kwargs.get("url", ""))
+        family = get_endpoint_family(url)
+        breaker = _circuit_breakers[family]
+
+        breaker.before_call()
+        _rate_limiters[family].acquire()
+        try:
+            response = method(*args, **kwargs)
+        except BaseException:
+            # whatever went wrong, a half-open circuit has to hear how
+            # its call went or it would never let another one through
+            breaker.record_failure()
+            raise
+
+        status_code = getattr(response, "status_code", None)
+        if isinstance(status_code, int) and (
+            status_code == 429 or status_code >= 500
+        ):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    return call
+
+
+def retry_function(
+    function: Callable,
+    *args,
+    retry_policy: Optional[RetryPolicy] = None,
+    **kwargs,
+) -> Any:
+    """
+    Calls *function* until it neither raises a retryable exception nor
+    returns a response with a retryable status code, waiting longer
+    between every try, for as long as the retry policy allows
+
+    The last exception is raised, or the last response returned,
+    once the tries or the deadline run out
+    """
+    policy = retry_policy or get_retry_policy()
+    deadline = monotonic() + policy.deadline
+
+    attempt = 0
+    while True:
+        attempt += 1
         try:
-            req = function(*args, **kwargs)
-            return req
-        except Exception as e:
-            if i == max_retries - 1:
-                raise e
-            sleep(5)
+            result = function(*args, **kwargs)
+        except RETRYABLE_EXCEPTIONS:
+            delay = get_backoff_delay(policy, attempt)
+            if not _may_retry(policy, attempt, deadline, delay):
+                raise
+            sleep(delay)
+            continue
+
+        if getattr(result, "status_code", None) not in policy.retry_statuses:
+            return result
+
+        retry_after = get_retry_after(result)
+        if retry_after is None:
+            delay = get_backoff_delay(policy, attempt)
+        else:
+            delay = retry_after
+        if not _may_retry(policy, attempt, deadline, delay):
+            return result
+        sleep(delay)
+
+
+def get_backoff_delay(policy: RetryPolicy, attempt: int) -> float:
+    """
+    Exponential backoff with full jitter, spreads out the retries
+    of everything that failed at the same time
+    """
+    return uniform(
+        0, min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+    )
+
+
+def get_retry_after(response: Any) -> Optional[float]:
+    """
+    Returns how many seconds the Retry-After header of *response*
+    asks us to wait, if it has one we understand
+    """
+    value = getattr(response, "headers", {}).get("Retry-After")
+    if not isinstance(value, str):
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _may_retry(
+    policy: RetryPolicy, attempt: int, deadline: float, delay: float
+) -> bool:
+    return attempt < policy.attempts and monotonic() + delay < deadline
+
+
+def create_session(
+    headers: Dict[str, str], pool_size: int
+) -> requests.Session:
+    """
+    Creates a requests session that keeps up to *pool_size* connections
+    per host alive, so that requests do not pay for a new handshake
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the session shared by every API request
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = create_session(HEADERS, POOL_SIZE)
+            # the auth cookie is handled by nhltv_lib.cookies, a session that
+            # remembers cookies would send stale ones along with every request
+            _session.cookies.set_policy(
+                DefaultCookiePolicy(allowed_domains=[])
+            )
+        return _session
 
 
 def get(*args, **kwargs) -> Any:
-    return retry_function(requests.get, *args, **kwargs)
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return retry_function(_guard_endpoint(get_session().get), *args, **kwargs)
 
 
 def post(*args, **kwargs) -> Any:
-    return retry_function(requests.post, *args, **kwargs)
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return retry_function(_guard_endpoint(get_session().post), *args, **kwargs)
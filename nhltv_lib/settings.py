@@ -1,6 +1,7 @@
 from typing import Optional
 import os
 from nhltv_lib.arguments import get_arguments
+from nhltv_lib.types import RetryPolicy
 
 
 def get_download_folder() -> str:
@@ -24,3 +25,90 @@ def get_retentiondays() -> Optional[int]:
         retentiondays = None
 
     return retentiondays
+
+
+def get_max_processes() -> int:
+    """
+    How many external processes (ffmpeg) may run at the same time?
+    """
+    args = get_arguments()
+
+    if args.max_processes is None:
+        return os.cpu_count() or 1
+    return max(1, int(args.max_processes))
+
+
+def get_download_workers() -> int:
+    """
+    How many segments should we download concurrently?
+    """
+    args = get_arguments()
+
+    if args.download_workers is None:
+        return 8
+    return max(1, int(args.download_workers))
+
+
+def get_stage_concurrency(stage: str) -> int:
+    """
+    How many games may be in *stage* of the pipeline at the same time?
+    """
+    args = get_arguments()
+
+    try:
+        return max(1, int(getattr(args, f"concurrent_{stage}")))
+    except TypeError:
+        return 1
+
+
+def get_skip_silence_mode() -> str:
+    """
+    How should we remove the silent parts of the video?
+    """
+    args = get_arguments()
+
+    return args.skip_silence_mode or "cuts"
+
+
+def get_silence_detector() -> str:
+    """
+    Which silence detector should we use?
+    """
+    args = get_arguments()
+
+    return args.silence_detector or "ffmpeg"
+
+
+def get_fused_postprocessing() -> bool:
+    """
+    Are we post-processing in a single pass?
+    """
+    args = get_arguments()
+
+    return bool(args.fused_postprocessing)
+
+
+def get_retry_policy() -> RetryPolicy:
+    """
+    How should failed requests be retried?
+    """
+    args = get_arguments()
+
+    return RetryPolicy(
+        attempts=3 if args.retries is None else max(1, int(args.retries)),
+        base_delay=1,
+        max_delay=30,
+        deadline=(
+            120 if args.retry_deadline is None else float(args.retry_deadline)
+        ),
+        retry_statuses=frozenset({429, 500, 502, 503, 504}),
+    )
+
+
+def get_db_profile() -> str:
+    """
+    How should the database be journaled?
+    """
+    args = get_arguments()
+
+    return args.db_profile or "rollback"
@@ -1,30 +1,47 @@
-from typing import List, Optional, Match, Iterator
-import subprocess
+from typing import Callable, Dict, List, Optional, Match, Iterator, Tuple
 import os
 import re
+import subprocess
 from glob import iglob
-from nhltv_lib.common import write_lines_to_file, tprint
+from threading import Thread
+from nhltv_lib.common import (
+    read_lines_from_file,
+    write_lines_to_file,
+    tprint,
+)
 from nhltv_lib.ffmpeg import (
-    split_video_into_cuts,
+    get_split_video_into_cuts_command,
     concat_video,
     show_video_streams,
+    decode_audio_to_pcm,
     detect_silence,
+    start_detecting_silence_in_stdin,
 )
 from nhltv_lib.exceptions import ExternalProgramError
+from nhltv_lib.process import run_subprocesses
 from nhltv_lib.types import Download
 from nhltv_lib import game_tracking
 from nhltv_lib.models import GameStatus
+from nhltv_lib.settings import get_silence_detector, get_skip_silence_mode
+
+# the detector only needs to tell silence from sound,
+# a mono 16 kHz signal is plenty and much cheaper to decode into
+SILENCE_ANALYSIS_SAMPLE_RATE = 16000
 
 
 def skip_silence(download: Download) -> None:
     """
     Analyzes the video for silent parts and removes them
     """
-    game_tracking.update_game_status(download.game_id, GameStatus.skip_silence)
+    game = game_tracking.track(download.game_id)
+    game.update_status(GameStatus.skip_silence)
+    game.flush()
 
-    analyze_output = _start_analyzing_for_silence(download.game_id)
+    marks = get_marks(download.game_id)
 
-    marks = _create_marks_from_analyzed_output(analyze_output)
+    if get_skip_silence_mode() == "single-pass":
+        _remove_silence_in_single_pass(download.game_id, marks)
+        return
 
     seg = _create_segments(download.game_id, marks)
 
@@ -38,10 +55,157 @@ def skip_silence(download: Download) -> None:
     _clean_up_cuts(download.game_id)
 
 
+def get_marks(game_id: int) -> Iterator[str]:
+    """
+    Returns the marks found while the game was downloading, or analyzes
+    the raw file for them if they were not
+    """
+    marks_file = get_marks_file_name(game_id)
+    if os.path.isfile(marks_file):
+        tprint("Using silence marks found during download", debug_only=True)
+        return iter([i.strip() for i in read_lines_from_file(marks_file)])
+
+    return SILENCE_DETECTORS[get_silence_detector()](game_id)
+
+
+def _detect_silence_with_ffmpeg(game_id: int) -> Iterator[str]:
+    analyze_output = _start_analyzing_for_silence(game_id)
+    return _create_marks_from_analyzed_output(analyze_output)
+
+
+def _detect_silence_with_numpy(game_id: int) -> Iterator[str]:
+    """
+    Decodes the audio to PCM once, kept in the work dir so detection can
+    be re-run on it, and finds the silence with NumPy
+    """
+    # pylint: disable=import-outside-toplevel
+    # numpy is an optional dependency, only needed for this detector
+    from nhltv_lib.pcm_silence import detect_silence_in_pcm
+
+    pcm_file = get_pcm_file_name(game_id)
+    if not os.path.isfile(pcm_file):
+        tprint("Decoding audio for silence analysis..")
+        decode_audio_to_pcm(
+            f"{game_id}_raw.mkv", pcm_file, SILENCE_ANALYSIS_SAMPLE_RATE
+        )
+
+    tprint("Analyzing video for silence..")
+    with open(pcm_file, "rb") as f:
+        silences = list(detect_silence_in_pcm(f, SILENCE_ANALYSIS_SAMPLE_RATE))
+    return _create_marks_from_silences(silences)
+
+
+# every detector takes a game id and returns the marks for its raw file
+SILENCE_DETECTORS: Dict[str, Callable[[int], Iterator[str]]] = {
+    "ffmpeg": _detect_silence_with_ffmpeg,
+    "numpy": _detect_silence_with_numpy,
+}
+
+
+def get_marks_file_name(game_id: int) -> str:
+    return f"{game_id}/silence_marks.txt"
+
+
+def get_pcm_file_name(game_id: int) -> str:
+    return f"{game_id}/audio.pcm"
+
+
+def save_marks(game_id: int, marks: List[str]) -> None:
+    write_lines_to_file(
+        [f"{i}\n" for i in marks], get_marks_file_name(game_id)
+    )
+
+
+def remove_silence_analysis(game_id: int) -> None:
+    """
+    Removes the marks and decoded audio of an earlier download,
+    they do not belong to a raw file that is downloaded over again
+    """
+    for filename in (get_marks_file_name(game_id), get_pcm_file_name(game_id)):
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+
+class StreamingSilenceDetector:
+    """
+    Detects silence in video data as it is being downloaded, the marks
+    are collected while ffmpeg reports them and returned from close()
+    """
+
+    def __init__(self) -> None:
+        self.failed = False
+        self._process: Optional[subprocess.Popen] = None
+        self._marks: List[str] = []
+        self._reader = Thread(target=self._read_marks, daemon=True)
+
+    def _read_marks(self) -> None:
+        assert self._process is not None and self._process.stdout is not None
+        lines = iter(self._process.stdout.readline, b"")
+        self._marks.extend(_create_marks_from_analyzed_output(lines))
+
+    def feed(self, data: bytes, offset: int) -> None:
+        """
+        Passes the next chunk of the video, written at *offset* of the raw
+        file, to the detector which has to see the video from the start
+        """
+        if self.failed:
+            return
+        if self._process is None:
+            if offset:
+                # a resumed download, the raw file is analyzed afterwards
+                self.failed = True
+                return
+            self._process = start_detecting_silence_in_stdin(
+                SILENCE_ANALYSIS_SAMPLE_RATE
+            )
+            self._reader.start()
+
+        assert self._process.stdin is not None
+        try:
+            self._process.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            tprint("Silence detection during download stopped early")
+            self.failed = True
+
+    def close(self) -> Optional[List[str]]:
+        """
+        Tells the detector the video has ended and returns the marks,
+        or None if it did not see the whole video
+        """
+        if self._process is None:
+            return None
+        assert self._process.stdin is not None
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            self.failed = True
+        if self._process.wait() != 0:
+            self.failed = True
+        self._reader.join()
+        return None if self.failed else self._marks
+
+    def abort(self) -> None:
+        """
+        Stops the detector without waiting for it to analyze what it has
+        been given, for when the download fails
+        """
+        self.failed = True
+        if self._process is None:
+            return
+        self._process.kill()
+        assert self._process.stdin is not None
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._process.wait()
+        self._reader.join()
+
+
 def _start_analyzing_for_silence(game_id: int) -> Iterator[bytes]:
     filename = f"{game_id}_raw.mkv"
     tprint("Analyzing video for silence..")
-    return detect_silence(filename)
+    return detect_silence(filename, SILENCE_ANALYSIS_SAMPLE_RATE)
 
 
 def _create_marks_from_analyzed_output(
@@ -75,37 +239,77 @@ def _create_marks_from_analyzed_output(
         yield "end"
 
 
-def _create_segments(game_id: int, marks: Iterator[str]) -> int:
-    filename: str = f"{game_id}_raw.mkv"
-    tprint("Creating segments", debug_only=True)
-    seg: int = 0
-    procs: List[subprocess.Popen] = []
+def get_non_silent_intervals(
+    marks: Iterator[str],
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Pairs up the marks into (start, end) of each part we want to keep,
+    end is None for a part that runs to the end of the video
+    """
     for mark in marks:
         if mark == "end":
             break
 
-        next_mark = next(marks)
+        # a mark without a pair runs to the end of the video
+        next_mark = next(marks, "end")
         if next_mark != "end":
-            seg += 1
-            length = float(next_mark) - float(mark)
-            procs.append(
-                split_video_into_cuts(filename, game_id, mark, seg, length)
+            yield mark, next_mark
+        else:
+            yield mark, None
+
+
+def _create_marks_from_silences(
+    silences: List[Tuple[float, float]]
+) -> Iterator[str]:
+    """
+    Creates the same marks as _create_marks_from_analyzed_output
+    from a list of (start, end) of silences
+    """
+    yield "0"
+    for start, end in silences:
+        # formatted the same way as ffmpeg logs timestamps
+        yield f"{start:.6g}"
+        yield f"{end:.6g}"
+
+    # every silence adds two marks, so the count is always odd here
+    yield "end"
+
+
+def _create_segments(game_id: int, marks: Iterator[str]) -> int:
+    filename: str = f"{game_id}_raw.mkv"
+    tprint("Creating segments", debug_only=True)
+    seg: int = 0
+    commands: List[str] = []
+    for start, end in get_non_silent_intervals(marks):
+        seg += 1
+        if end is not None:
+            length = float(end) - float(start)
+            commands.append(
+                get_split_video_into_cuts_command(
+                    filename, game_id, start, seg, length
+                )
             )
         else:
-            seg += 1
-            procs.append(split_video_into_cuts(filename, game_id, mark, seg))
-
-    ret_codes = [p.wait() for p in procs]
-    if not all(i == 0 for i in ret_codes):
-        failed_procs = [p for p in procs if p.returncode != 0]
-        print(
-            [
-                i.stdout.readlines()
-                for i in failed_procs
-                if i.stdout is not None
-            ]
+            commands.append(
+                get_split_video_into_cuts_command(
+                    filename, game_id, start, seg
+                )
+            )
+
+    results = run_subprocesses(commands)
+    tprint(
+        "Segments created in "
+        + ", ".join(f"{i.duration:.1f}s" for i in results),
+        debug_only=True,
+    )
+
+    failed = [i for i in results if i.returncode != 0]
+    if failed:
+        errors = "\n".join(
+            f"{i.command}: {i.stderr.decode(errors='replace').strip()}"
+            for i in failed
         )
-        raise ExternalProgramError("Segment creation failed")
+        raise ExternalProgramError(f"Segment creation failed\n{errors}")
 
     return seg
 
@@ -137,3 +341,29 @@ def _merge_cuts_to_silent_video(game_id: int) -> None:
 def _clean_up_cuts(game_id: int) -> None:
     for path in iglob(os.path.join(str(game_id), "cut*.mp4")):
         os.remove(path)
+
+
+def _remove_silence_in_single_pass(game_id: int, marks: Iterator[str]) -> None:
+    """
+    Writes the silent video straight from the raw file with a single
+    ffmpeg run, seeking to each part we keep via the concat demuxer
+    instead of cutting every part out to its own file first
+    """
+    concat_list = create_single_pass_concat_list(game_id, marks)
+    write_lines_to_file(concat_list, f"{game_id}/concat_list.txt")
+
+    _merge_cuts_to_silent_video(game_id)
+
+    _remove_raw_file(game_id)
+
+
+def create_single_pass_concat_list(
+    game_id: int, marks: Iterator[str]
+) -> List[str]:
+    content: List[str] = []
+    for start, end in get_non_silent_intervals(marks):
+        content.append("file\t" + f"../{game_id}_raw.mkv" + "\n")
+        content.append(f"inpoint {start}\n")
+        if end is not None:
+            content.append(f"outpoint {end}\n")
+    return content
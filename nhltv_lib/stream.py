@@ -1,6 +1,7 @@
-from typing import List, Iterable, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 from nhltv_lib.cache import cache_json, load_cache_json
-from nhltv_lib.requests_wrapper import requests
+import nhltv_lib.requests_wrapper as requests
 from nhltv_lib.common import (
     dump_json_if_debug_enabled,
     tprint,
@@ -11,26 +12,41 @@ from nhltv_lib.constants import HEADERS
 from nhltv_lib.types import NHLStream, Game
 from nhltv_lib.urls import get_player_settings_url
 
+# how many stream settings are fetched at the same time
+STREAM_SETTINGS_WORKERS = 8
 
-def get_streams_to_download(games: Tuple[Game, ...]) -> List[NHLStream]:
-    games_ready_to_download: Iterable[Game] = filter(
-        is_ready_to_download, games
-    )
-    stream_objects: Iterable[NHLStream] = create_stream_objects(
-        games_ready_to_download
-    )
-
-    return list(stream_objects)
 
+def get_streams_to_download(games: Tuple[Game, ...]) -> List[NHLStream]:
+    """
+    Picks the best stream of every game and fetches the settings of all
+    of them concurrently, games whose stream is not archived yet are
+    left out until a later check
+    """
+    candidates: List[Tuple[Game, dict]] = [
+        (game, get_best_stream(game)) for game in games
+    ]
+    candidates = [(game, stream) for game, stream in candidates if stream]
+    if not candidates:
+        return []
+
+    with ThreadPoolExecutor(
+        max_workers=min(STREAM_SETTINGS_WORKERS, len(candidates))
+    ) as executor:
+        all_settings = list(
+            executor.map(get_stream_settings, [i[1] for i in candidates])
+        )
 
-def create_stream_objects(games: Iterable[Game]) -> Iterable[NHLStream]:
-    return map(create_stream_object, games)
-
+    streams: List[NHLStream] = []
+    for (game, stream), settings in zip(candidates, all_settings):
+        if not settings["isDelivered"]:
+            tprint(
+                f"Stream was found for game {game.game_id} that is "
+                f"not archived yet, waiting.."
+            )
+            continue
+        streams.append(NHLStream(game.game_id, stream, settings))
 
-def create_stream_object(game: Game) -> NHLStream:
-    best_stream = get_best_stream(game)
-    best_stream_settings = get_stream_settings(best_stream)
-    return NHLStream(game.game_id, best_stream, best_stream_settings)
+    return streams
 
 
 def get_stream_settings(stream: dict) -> dict:
@@ -71,6 +87,10 @@ def get_stream_settings(stream: dict) -> dict:
 
 
 def get_best_stream(game: Game) -> dict:
+    """
+    Returns the stream of the game we would rather download,
+    or {} if the game has no streams
+    """
     best_stream: dict = {}
     best_score: int = -1
 
@@ -85,22 +105,9 @@ def get_best_stream(game: Game) -> dict:
             best_score = score
             best_stream = stream
 
-    # if our preferred stream cannot be downloaded, set the best stream to {}
-    # and say this game is not yet ready to be downloaded
-    if not get_stream_settings(best_stream)["isDelivered"]:
-        tprint(
-            f"Stream was found for game {game.game_id} that is "
-            f"not archived yet, waiting.."
-        )
-        best_stream = {}
-
     return best_stream
 
 
-def is_ready_to_download(game: Game) -> bool:
-    return get_best_stream(game) != {}
-
-
 def stream_matches_home_away(game: Game, stream_type: str) -> bool:
     """
     Checks if team.home=stream.home or team.away=stream.away
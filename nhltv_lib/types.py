@@ -12,3 +12,15 @@ Download = namedtuple(
 )
 
 NHLTVUser = namedtuple("NHLTVUser", ["username", "password"])
+
+Stage = namedtuple("Stage", ["name", "function", "workers"])
+
+RetryPolicy = namedtuple(
+    "RetryPolicy",
+    ["attempts", "base_delay", "max_delay", "deadline", "retry_statuses"],
+)
+
+SubprocessResult = namedtuple(
+    "SubprocessResult",
+    ["command", "returncode", "stdout", "stderr", "duration"],
+)
@@ -20,5 +20,7 @@ setup(
         "alembic==1.13.1",
         "SQLAlchemy==2.0.29",
         "streamlink==6.7.3",
+        "pycryptodome==3.20.0",
     ],
+    extras_require={"numpy": ["numpy==1.26.4"]},
 )
@@ -0,0 +1,97 @@
+"""
+Times the NumPy silence detector against ffmpeg's silencedetect on the
+same synthetic audio and checks that they find the same silences
+
+    python -m tests.benchmark_silence [minutes of audio]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from nhltv_lib.pcm_silence import detect_silence_in_pcm
+from nhltv_lib.skip_silence import (
+    SILENCE_ANALYSIS_SAMPLE_RATE,
+    _create_marks_from_analyzed_output,
+    _create_marks_from_silences,
+)
+
+SAMPLE_RATE = SILENCE_ANALYSIS_SAMPLE_RATE
+
+
+def create_pcm(minutes: int, path: str) -> None:
+    """
+    Writes *minutes* of noise with a break of silence every ten
+    minutes or so, like the intermissions and ads of a game
+    """
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-3000, 3000, minutes * 60 * SAMPLE_RATE)
+    samples = samples.astype("<i2")
+
+    start = rng.integers(300, 600) * SAMPLE_RATE
+    while start < len(samples):
+        length = rng.integers(5, 150) * SAMPLE_RATE
+        # a millisecond off the second, as real breaks are
+        start += rng.integers(0, 1000) * SAMPLE_RATE // 1000
+        samples[start : start + length] = 0
+        start += length + rng.integers(300, 900) * SAMPLE_RATE
+
+    with open(path, "wb") as f:
+        f.write(samples.tobytes())
+
+
+def run_numpy(path: str) -> Tuple[float, List[str]]:
+    begin = perf_counter()
+    with open(path, "rb") as f:
+        silences = list(detect_silence_in_pcm(f, SAMPLE_RATE))
+    return perf_counter() - begin, list(_create_marks_from_silences(silences))
+
+
+def run_ffmpeg(path: str) -> Optional[Tuple[float, List[str]]]:
+    if shutil.which("ffmpeg") is None:
+        return None
+    begin = perf_counter()
+    result = subprocess.run(
+        f"ffmpeg -nostats -f s16le -ar {SAMPLE_RATE} -ac 1 -i {path} "
+        "-af silencedetect=n=-50dB:d=10 -f null -",
+        shell=True,
+        capture_output=True,
+        check=True,
+    )
+    elapsed = perf_counter() - begin
+    lines = result.stderr.splitlines(keepends=True)
+    return elapsed, list(_create_marks_from_analyzed_output(iter(lines)))
+
+
+def main() -> None:
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 180
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "audio.pcm")
+        create_pcm(minutes, path)
+        print(f"{minutes} minutes of {SAMPLE_RATE} Hz mono audio")
+
+        numpy_time, numpy_marks = run_numpy(path)
+        print(f"numpy:  {numpy_time:.2f}s, {len(numpy_marks)} marks")
+
+        ffmpeg = run_ffmpeg(path)
+        if ffmpeg is None:
+            print("ffmpeg: not installed")
+            return
+        ffmpeg_time, ffmpeg_marks = ffmpeg
+        print(f"ffmpeg: {ffmpeg_time:.2f}s, {len(ffmpeg_marks)} marks")
+        print(
+            "marks are identical"
+            if numpy_marks == ffmpeg_marks
+            else f"marks differ:\n{numpy_marks}\n{ffmpeg_marks}"
+        )
+
+
+if __name__ == "__main__":
+    main()
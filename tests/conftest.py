@@ -8,7 +8,12 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from nhltv_lib.arguments import Config, set_config
+from nhltv_lib.cache import clear_memory_cache, reset_cache_stats
+from nhltv_lib.common import _create_dumps_folder
+from nhltv_lib.game_tracking import _tracked_games
 from nhltv_lib.models import Base
+from nhltv_lib.requests_wrapper import reset_endpoint_guards
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -25,20 +30,7 @@ def mock_db_session(monkeypatch):
 
 @pytest.fixture
 def parsed_args():
-    return namedtuple(
-        "Arguments",
-        [
-            "team",
-            "username",
-            "password",
-            "download_folder",
-            "checkinterval",
-            "retentiondays",
-            "days_back_to_search",
-            "shorten_video",
-            "debug_dumps_enabled",
-        ],
-    )
+    return namedtuple("Arguments", Config.__slots__)
 
 
 @pytest.fixture
@@ -53,6 +45,18 @@ def parsed_args_list():
         "2",  # 6 days back to search
         False,  # 7 shorten video
         False,  # 8 debug dumps
+        "4",  # 9 download workers
+        "2",  # 10 concurrent downloads
+        None,  # 11 concurrent skip silence
+        None,  # 12 concurrent obfuscate
+        None,  # 13 concurrent moves
+        None,  # 14 skip silence mode
+        "3",  # 15 max processes
+        None,  # 16 silence detector
+        False,  # 17 fused postprocessing
+        None,  # 18 retries
+        None,  # 19 retry deadline
+        None,  # 20 db profile
     ]
 
 
@@ -108,6 +112,34 @@ def mocked_parse_args(mocker, parsed_arguments):
     )
 
 
+@pytest.fixture(scope="function", autouse=True)
+def reset_rate_limits_and_circuits():
+    reset_endpoint_guards()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_cache_state():
+    clear_memory_cache()
+    reset_cache_stats()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_tracked_games():
+    _tracked_games.clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_config():
+    """
+    The config is parsed once per process, every test gets its own
+    """
+    set_config(None)
+    _create_dumps_folder.cache_clear()
+    yield
+    set_config(None)
+    _create_dumps_folder.cache_clear()
+
+
 @pytest.fixture(scope="function", autouse=True)
 def mock_os_path_exists(mocker):
     return mocker.patch("os.path.exists", return_value=True)
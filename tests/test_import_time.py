@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+# modules that take long to import and are only needed by some runs,
+# they must be imported where they are used, not when the CLI starts
+LAZY_MODULES = ("streamlink", "alembic", "Crypto", "numpy")
+
+# how long importing the CLI may take, far more than it needs so that
+# only a heavy new import at startup fails the test on a slow machine
+IMPORT_TIME_BUDGET = 2.0
+
+
+def _import_main():
+    """
+    Imports the CLI in a fresh interpreter with -X importtime and
+    returns the cumulative import time in seconds of every module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import nhltv_lib.main"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    imported = _import_main()
+    assert [i for i in imported if i.split(".")[0] in LAZY_MODULES] == []
+
+
+def test_import_time_budget():
+    assert _import_main()["nhltv_lib.main"] < IMPORT_TIME_BUDGET
@@ -1,5 +1,9 @@
 import pytest
 
+# imported before Popen is mocked, pycryptodome looks up
+# its native libraries with a subprocess when first imported
+import Crypto.Cipher.AES  # noqa: F401 pylint: disable=unused-import
+
 
 @pytest.fixture(scope="function", autouse=True)
 def mocked_subprocess(mocker):
@@ -1,6 +1,6 @@
 import os
 import pytest
-from nhltv_lib.arguments import parse_args
+from nhltv_lib.arguments import Config, get_arguments, parse_args, set_config
 
 
 def test_parse_args(arguments_list):
@@ -19,3 +19,32 @@ def test_parse_args_requires_required_props(arguments_list):
         parse_args([i for i in arguments_list if "password" not in i])
     with pytest.raises(SystemExit):
         parse_args([i for i in arguments_list if "team" not in i])
+
+
+def test_config_has_every_argument(arguments_list):
+    assert set(Config.__slots__) == set(vars(parse_args(arguments_list)))
+
+
+def test_config_is_read_only(arguments_list):
+    config = Config(parse_args(arguments_list))
+    assert config.username == "username"
+    with pytest.raises(AttributeError):
+        config.username = "foo"
+    with pytest.raises(AttributeError):
+        config.foo = "bar"
+
+
+def test_get_arguments_parses_once(mocked_parse_args):
+    assert get_arguments() is get_arguments()
+    mocked_parse_args.assert_called_once()
+
+
+def test_set_config(mocked_parse_args, arguments_list):
+    config = Config(parse_args(arguments_list))
+    set_config(config)
+    assert get_arguments() is config
+    mocked_parse_args.assert_not_called()
+
+    set_config(None)
+    assert get_arguments() is not config
+    mocked_parse_args.assert_called_once()
@@ -1,5 +1,5 @@
 import json
-from pathlib import Path
+import os
 import pytest
 from datetime import datetime, timedelta
 
@@ -8,12 +8,24 @@ from nhltv_lib.cache import (
     cache_json,
     load_cache_json,
     delete_cache,
+    clear_memory_cache,
+    get_cache_key,
+    get_cache_stats,
+    _sweep_cache,
 )
 from unittest.mock import MagicMock
 
 
 @pytest.fixture
-def prepare_cache(mocker):
+def cache_directory(tmp_path, mocker):
+    directory = tmp_path / "cache"
+    mocker.patch("nhltv_lib.cache.CACHE_DIRECTORY", str(directory))
+    mocker.patch("nhltv_lib.cache._last_sweep", None)
+    return directory
+
+
+@pytest.fixture
+def prepare_cache(mocker, cache_directory):
     # Ensure the cache directory is created
     ensure_cache_directory()
     initial_time = datetime(2020, 1, 1, 12, 0, 0)
@@ -25,7 +37,7 @@ def prepare_cache(mocker):
     return dt
 
 
-def test_cache_json_and_load_cache_json(prepare_cache):
+def test_cache_json_and_load_cache_json(prepare_cache, cache_directory):
     dt = prepare_cache
     name = "test_cache"
     parameters = {"key": "value"}
@@ -34,7 +46,9 @@ def test_cache_json_and_load_cache_json(prepare_cache):
 
     # Cache the JSON
     cache_json(name, parameters, expires_in, content)
-    cache_file_path = Path("cache") / f"{name}.json"
+    cache_file_path = (
+        cache_directory / f"{get_cache_key(name, parameters)}.json"
+    )
 
     # Check if the file was created
     assert (
@@ -56,11 +70,13 @@ def test_cache_json_and_load_cache_json(prepare_cache):
     assert expired_content is None, "Should return None for expired cache"
 
 
-def test_delete_cache(prepare_cache):
+def test_delete_cache(prepare_cache, cache_directory):
     # Test deletion of the cache
     name = "test_cache"
     cache_json(name, {"key": "value"}, 300, {"data": "test_data"})
-    cache_file_path = Path("cache") / f"{name}.json"
+    cache_file_path = (
+        cache_directory / f"{get_cache_key(name, {'key': 'value'})}.json"
+    )
     assert cache_file_path.exists(), "Cache file should exist before deleting"
 
     delete_cache(name)
@@ -69,10 +85,166 @@ def test_delete_cache(prepare_cache):
     ), "Cache file should not exist after delete_cache call"
 
 
-def test_ensure_cache_directory():
+def test_ensure_cache_directory(cache_directory):
     # Ensure the cache directory is created
     ensure_cache_directory()
-    cache_dir = Path("cache")
+    cache_dir = cache_directory
     assert (
         cache_dir.exists()
     ), "Cache directory should exist after ensure_cache_directory call"
+
+
+def test_load_cache_json_reads_file_once(prepare_cache, mocker):
+    cache_json("test_cache", {"key": "value"}, 300, {"data": "test_data"})
+    clear_memory_cache()
+    json_load = mocker.spy(json, "load")
+
+    assert load_cache_json("test_cache", {"key": "value"}) == {
+        "data": "test_data"
+    }
+    assert load_cache_json("test_cache", {"key": "value"}) == {
+        "data": "test_data"
+    }
+    assert json_load.call_count == 1
+
+
+def test_cache_json_writes_through_to_memory(prepare_cache, mocker):
+    cache_json("test_cache", {"key": "value"}, 300, {"data": "test_data"})
+    json_load = mocker.spy(json, "load")
+
+    assert load_cache_json("test_cache", {"key": "value"}) == {
+        "data": "test_data"
+    }
+    assert load_cache_json("test_cache", {"key": "value"}) is not None
+    json_load.assert_not_called()
+
+
+def test_delete_cache_forgets_memory_entry(prepare_cache):
+    cache_json("test_cache", {"key": "value"}, 300, {"data": "test_data"})
+    delete_cache("test_cache")
+    assert load_cache_json("test_cache", {"key": "value"}) is None
+
+
+def test_memory_cache_evicts_least_recently_used(prepare_cache, mocker):
+    mocker.patch("nhltv_lib.cache.MAX_MEMORY_ENTRIES", 2)
+    cache_json("test_cache_a", {}, 300, {"data": "a"})
+    cache_json("test_cache_b", {}, 300, {"data": "b"})
+    load_cache_json("test_cache_a", {})
+    cache_json("test_cache_c", {}, 300, {"data": "c"})
+    json_load = mocker.spy(json, "load")
+
+    load_cache_json("test_cache_a", {})
+    load_cache_json("test_cache_c", {})
+    json_load.assert_not_called()
+
+    assert load_cache_json("test_cache_b", {}) == {"data": "b"}
+    json_load.assert_called_once()
+
+
+def test_cache_keeps_an_entry_per_parameters(prepare_cache, mocker):
+    cache_json("test_cache", {"key": "a"}, 300, {"data": "a"})
+    cache_json("test_cache", {"key": "b"}, 300, {"data": "b"})
+    clear_memory_cache()
+
+    assert load_cache_json("test_cache", {"key": "a"}) == {"data": "a"}
+    assert load_cache_json("test_cache", {"key": "b"}) == {"data": "b"}
+    assert load_cache_json("test_cache", {"key": "c"}) is None
+    assert get_cache_stats() == {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 0,
+        "expired": 0,
+    }
+
+
+def test_delete_cache_deletes_every_entry_of_name(
+    prepare_cache, cache_directory
+):
+    cache_json("test_cache", {"key": "a"}, 300, {"data": "a"})
+    cache_json("test_cache", {"key": "b"}, 300, {"data": "b"})
+    cache_json("test_cache_other", {}, 300, {"data": "c"})
+
+    delete_cache("test_cache")
+
+    assert load_cache_json("test_cache", {"key": "a"}) is None
+    assert load_cache_json("test_cache", {"key": "b"}) is None
+    assert [i.name for i in cache_directory.iterdir()] == [
+        f"{get_cache_key('test_cache_other', {})}.json"
+    ]
+
+
+def test_cache_json_leaves_no_temporary_files(prepare_cache, cache_directory):
+    cache_json("test_cache", {}, 300, {"data": "a"})
+    cache_json("test_cache", {}, 300, {"data": "b"})
+
+    assert len(list(cache_directory.iterdir())) == 1
+    clear_memory_cache()
+    assert load_cache_json("test_cache", {}) == {"data": "b"}
+
+
+def test_cache_json_keeps_old_entry_if_write_fails(prepare_cache, mocker):
+    cache_json("test_cache", {}, 300, {"data": "a"})
+    clear_memory_cache()
+
+    with pytest.raises(TypeError):
+        cache_json("test_cache", {}, 300, {"data": object()})
+
+    assert load_cache_json("test_cache", {}) == {"data": "a"}
+
+
+def test_load_cache_json_ignores_corrupt_file(prepare_cache, cache_directory):
+    path = cache_directory / f"{get_cache_key('test_cache', {})}.json"
+    path.write_text('{"parameters": {}, "exp')
+
+    assert load_cache_json("test_cache", {}) is None
+    assert not path.exists()
+
+
+def test_cache_json_evicts_least_recently_used(
+    prepare_cache, cache_directory, mocker
+):
+    mocker.patch("nhltv_lib.cache.MAX_CACHE_ENTRIES", 2)
+    for i, name in enumerate(("test_cache_a", "test_cache_b")):
+        cache_json(name, {}, 300, {"data": name})
+        path = cache_directory / f"{get_cache_key(name, {})}.json"
+        os.utime(path, (1000 + i, 1000 + i))
+
+    cache_json("test_cache_c", {}, 300, {"data": "c"})
+
+    assert load_cache_json("test_cache_a", {}) is None
+    assert load_cache_json("test_cache_b", {}) == {"data": "test_cache_b"}
+    assert get_cache_stats()["evictions"] == 1
+
+
+def test_cache_json_evicts_entry_read_from_memory_last(
+    prepare_cache, cache_directory, mocker
+):
+    mocker.patch("nhltv_lib.cache.MAX_CACHE_ENTRIES", 2)
+    for i, name in enumerate(("test_cache_a", "test_cache_b")):
+        cache_json(name, {}, 300, {"data": name})
+        path = cache_directory / f"{get_cache_key(name, {})}.json"
+        os.utime(path, (1000 + i, 1000 + i))
+    json_load = mocker.spy(json, "load")
+
+    # the oldest file on disk, but the entry that was used last
+    assert load_cache_json("test_cache_a", {}) == {"data": "test_cache_a"}
+    json_load.assert_not_called()
+    cache_json("test_cache_c", {}, 300, {"data": "c"})
+
+    assert load_cache_json("test_cache_a", {}) == {"data": "test_cache_a"}
+    assert load_cache_json("test_cache_b", {}) is None
+
+
+def test_sweep_cache_removes_expired_entries(prepare_cache, cache_directory):
+    dt = prepare_cache
+    cache_json("test_cache_short", {}, 60, {"data": "a"})
+    cache_json("test_cache_long", {}, 600, {"data": "b"})
+    (cache_directory / ".test_cache.1234.tmp").write_text("")
+
+    dt.now.return_value = datetime(2020, 1, 1, 12, 5, 0)
+    _sweep_cache()
+
+    assert sorted(i.name for i in cache_directory.iterdir()) == [
+        f"{get_cache_key('test_cache_long', {})}.json"
+    ]
+    assert get_cache_stats()["expired"] == 1
@@ -5,12 +5,15 @@ from nhltv_lib.common import (
     touch,
     read_lines_from_file,
     move_file_to_download_folder,
+    get_partial_download_file_name,
     dump_json_if_debug_enabled,
     dump_pickle_if_debug_enabled,
     debug_dump_json,
     debug_dump_pickle,
     tprint,
     debug_dumps_enabled,
+    dump_bytes_if_debug_enabled,
+    flush_debug_dumps,
 )
 
 
@@ -76,6 +79,14 @@ def test_move_file_to_download_folder(mocker, fake_download):
     )
 
 
+def test_get_partial_download_file_name(mocker, fake_download):
+    mocker.patch("nhltv_lib.common.get_download_folder", return_value="./foo")
+    assert (
+        get_partial_download_file_name(fake_download)
+        == f"./foo/.{fake_download.game_info}.partial.mkv"
+    )
+
+
 def test_debug_dumps_enabled(
     mocker, mock_isdir, parsed_args, parsed_args_list
 ):
@@ -87,7 +98,9 @@ def test_debug_dumps_enabled(
     )
     mkdir = mocker.patch("nhltv_lib.common.os.mkdir")
     debug_dumps_enabled()
+    debug_dumps_enabled()
     mkdir.assert_called_once_with("dumps")
+    mock_isdir.assert_called_once()
 
 
 @pytest.fixture
@@ -105,11 +118,47 @@ def mock_print(mocker):
 def test_dump_json_if_debug(mocker, mock_debug_dumps_enabled):
     mj = mocker.patch("nhltv_lib.common.debug_dump_json")
     dump_json_if_debug_enabled({"foo": "bar"})
+    flush_debug_dumps()
     mj.assert_called_once_with(
         {"foo": "bar"}, caller="test_dump_json_if_debug"
     )
 
 
+def test_dump_json_if_debug_leaves_content_be(
+    mocker, mock_debug_dumps_enabled, mock_datetime, mock_open
+):
+    dumped = mocker.patch("json.dump")
+    content = {"foo": "bar", "session_key": "secret"}
+    dump_json_if_debug_enabled(content)
+    content["foo"] = "baz"
+    flush_debug_dumps()
+    assert content == {"foo": "baz", "session_key": "secret"}
+    assert dumped.call_args[0][0] == {"foo": "bar", "session_key": "REDACTED"}
+
+
+def test_dump_json_if_debug_survives_failed_write(
+    mocker, mock_debug_dumps_enabled
+):
+    mj = mocker.patch(
+        "nhltv_lib.common.debug_dump_json", side_effect=[OSError, None]
+    )
+    mocker.patch("nhltv_lib.common.tprint")
+    dump_json_if_debug_enabled({"foo": "bar"})
+    dump_json_if_debug_enabled({"foo": "bar"})
+    flush_debug_dumps()
+    assert mj.call_count == 2
+
+
+def test_dump_if_not_debug_skips_caller_lookup(
+    mocker, mock_debug_dumps_enabled
+):
+    mock_debug_dumps_enabled.return_value = False
+    getframe = mocker.patch("nhltv_lib.common.sys._getframe")
+    dump_json_if_debug_enabled({"foo": "bar"})
+    dump_bytes_if_debug_enabled(b"foo")
+    getframe.assert_not_called()
+
+
 def test_dump_json_if_not_debug(mocker, mock_debug_dumps_enabled):
     mj = mocker.patch("nhltv_lib.common.debug_dump_json")
     mock_debug_dumps_enabled.return_value = False
@@ -127,6 +176,7 @@ def test_dump_pickle_if_not_debug(mocker, mock_debug_dumps_enabled):
 def test_dump_pickle_if_debug(mocker, mock_debug_dumps_enabled):
     mj = mocker.patch("nhltv_lib.common.debug_dump_pickle")
     dump_pickle_if_debug_enabled({"foo": "bar"})
+    flush_debug_dumps()
     mj.assert_called_once_with(
         {"foo": "bar"}, caller="test_dump_pickle_if_debug"
     )
@@ -0,0 +1,106 @@
+import os
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+import nhltv_lib
+from nhltv_lib.arguments import parse_args
+from nhltv_lib.db_session import (
+    HEAD_REVISION,
+    SQLITE_PROFILES,
+    create_db_engine,
+    get_db_revision,
+    setup_db,
+)
+from nhltv_lib.models import DbGame
+
+
+@pytest.mark.parametrize(
+    "profile, journal_mode, synchronous, mmap_size",
+    [("wal", "wal", 1, 64 * 1024 * 1024), ("rollback", "delete", 2, 0)],
+)
+def test_create_db_engine_sets_pragmas(
+    tmp_path, profile, journal_mode, synchronous, mmap_size
+):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/db", profile)
+
+    with engine.connect() as connection:
+
+        def pragma(name):
+            return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+        assert pragma("journal_mode") == journal_mode
+        assert pragma("synchronous") == synchronous
+        assert pragma("busy_timeout") == 5000
+        assert pragma("mmap_size") == mmap_size
+        assert pragma("cache_size") == -16 * 1024
+
+    engine.dispose()
+
+
+def test_create_db_engine_unknown_profile():
+    with pytest.raises(KeyError):
+        create_db_engine("sqlite://", "foo")
+
+
+@pytest.mark.parametrize("profile", SQLITE_PROFILES)
+def test_every_profile_can_be_chosen(arguments_list, profile):
+    arguments = parse_args(arguments_list + ["--db-profile", profile])
+    assert arguments.db_profile == profile
+
+
+def test_games_are_indexed():
+    assert {tuple(i.columns.keys()) for i in DbGame.__table__.indexes} == {
+        ("status",),
+        ("next_attempt",),
+        ("time",),
+    }
+
+
+def test_head_revision_is_alembic_head():
+    scripts = ScriptDirectory(
+        os.path.join(os.path.dirname(nhltv_lib.__file__), "alembic")
+    )
+    assert scripts.get_current_head() == HEAD_REVISION
+
+
+def test_get_db_revision(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/db", "wal")
+    assert get_db_revision(engine) is None
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32))")
+        )
+        connection.execute(text("INSERT INTO alembic_version VALUES ('abc')"))
+    assert get_db_revision(engine) == "abc"
+    engine.dispose()
+
+
+@pytest.fixture
+def mock_migrate_db(mocker, tmp_path):
+    mocker.patch(
+        "nhltv_lib.db_session.get_download_folder", return_value=str(tmp_path)
+    )
+    return mocker.patch("nhltv_lib.db_session._migrate_db")
+
+
+def test_setup_db_migrates(mock_migrate_db, tmp_path):
+    dbsession = setup_db()
+
+    mock_migrate_db.assert_called_once_with(
+        f"sqlite:///{tmp_path}/nhltv_database"
+    )
+    assert inspect(dbsession.kw["bind"]).has_table("games")
+
+
+def test_setup_db_skips_migration_at_head(mock_migrate_db, mocker):
+    mocker.patch(
+        "nhltv_lib.db_session.get_db_revision", return_value=HEAD_REVISION
+    )
+    create_all = mocker.patch("nhltv_lib.db_session.Base.metadata.create_all")
+
+    setup_db()
+
+    mock_migrate_db.assert_not_called()
+    create_all.assert_not_called()
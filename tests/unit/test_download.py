@@ -1,10 +1,14 @@
 from datetime import datetime
 import pytest
 from nhltv_lib.download import (
+    _can_resume_download,
+    finish_download,
     _verify_nhltv_request_status_succeeded,
     _extract_session_key,
     _get_raw_file_name,
     _create_download_folder,
+    _on_segment_data,
+    download_game,
 )
 from nhltv_lib.exceptions import (
     BlackoutRestriction,
@@ -58,3 +62,89 @@ def test_create_dl_folder(mocker, mock_os_path_exists):
     mock_mkdirs = mocker.patch("os.makedirs")
     _create_download_folder(1)
     mock_mkdirs.assert_called_once_with("1")
+
+
+def test_can_resume_download(mocker):
+    isfile = mocker.patch("os.path.isfile", return_value=True)
+    assert _can_resume_download(1)
+    isfile.assert_any_call("1/download_journal.txt")
+    isfile.assert_any_call("1_raw.mkv")
+
+
+def test_can_not_resume_download_wo_journal(mocker):
+    mocker.patch("os.path.isfile", side_effect=[False, True])
+    assert not _can_resume_download(1)
+
+
+@pytest.fixture(scope="function")
+def mock_game_download(mocker, fake_download):
+    mocker.patch(
+        "nhltv_lib.download._get_download_from_stream",
+        return_value=fake_download,
+    )
+    mocker.patch("nhltv_lib.download._can_resume_download", return_value=True)
+    mocker.patch("nhltv_lib.download._create_download_folder")
+    mocker.patch("nhltv_lib.download.get_extra_headers", return_value={})
+    mocker.patch("nhltv_lib.download.tprint")
+    mocker.patch(
+        "nhltv_lib.download.get_silence_detector", return_value="ffmpeg"
+    )
+    detector = mocker.patch("nhltv_lib.download.StreamingSilenceDetector")
+    return detector.return_value
+
+
+def test_download_game_saves_marks(mocker, mock_game_download):
+    mocker.patch("nhltv_lib.download.download_hls_stream")
+    save_marks = mocker.patch("nhltv_lib.download.save_marks")
+    mock_game_download.close.return_value = ["0", "end"]
+
+    download = download_game(mocker.Mock())
+
+    save_marks.assert_called_once_with(download.game_id, ["0", "end"])
+    mock_game_download.abort.assert_not_called()
+
+
+def test_download_game_aborts_detector_on_error(mocker, mock_game_download):
+    mocker.patch("nhltv_lib.download.download_hls_stream", side_effect=OSError)
+    save_marks = mocker.patch("nhltv_lib.download.save_marks")
+
+    with pytest.raises(OSError):
+        download_game(mocker.Mock())
+
+    mock_game_download.abort.assert_called_once()
+    mock_game_download.close.assert_not_called()
+    save_marks.assert_not_called()
+
+
+def test_on_segment_data_from_start(mocker):
+    remove = mocker.patch("nhltv_lib.download.remove_silence_analysis")
+    detector = mocker.Mock()
+    _on_segment_data(1, detector, b"video", 0)
+    remove.assert_called_once_with(1)
+    detector.feed.assert_called_once_with(b"video", 0)
+
+
+def test_on_segment_data_resumed(mocker):
+    remove = mocker.patch("nhltv_lib.download.remove_silence_analysis")
+    _on_segment_data(1, None, b"video", 5)
+    remove.assert_not_called()
+
+
+def test_finish_download(mocker, fake_download, mock_game_tracking):
+    mock_move = mocker.patch("nhltv_lib.download.move_file_to_download_folder")
+    mock_clean = mocker.patch("nhltv_lib.download.clean_up_download")
+
+    finish_download(fake_download)
+
+    mock_move.assert_called_once_with(fake_download)
+    mock_clean.assert_called_once_with(fake_download.game_id)
+    game = mock_game_tracking.track.return_value
+    mock_game_tracking.track.assert_called_once_with(fake_download.game_id)
+    assert game.update_status.call_args_list == [
+        mocker.call(GameStatus.moving),
+        mocker.call(GameStatus.completed),
+    ]
+    game.download_finished.assert_called_once_with()
+    mock_game_tracking.release_tracked_game.assert_called_once_with(
+        fake_download.game_id
+    )
@@ -4,8 +4,10 @@ from nhltv_lib.ffmpeg import (
     concat_video,
     cut_video,
     get_video_length,
-    split_video_into_cuts,
+    get_split_video_into_cuts_command,
     detect_silence,
+    start_detecting_silence_in_stdin,
+    decode_audio_to_pcm,
     show_video_streams,
 )
 
@@ -18,11 +20,6 @@ def mock_call_subp_and_raise(mocker):
     )
 
 
-@pytest.fixture(scope="function", autouse=True)
-def mock_call_subp(mocker):
-    return mocker.patch("nhltv_lib.ffmpeg.call_subprocess")
-
-
 @pytest.fixture(scope="function", autouse=True)
 def mock_call_subp_iter(mocker):
     return mocker.patch(
@@ -71,20 +68,18 @@ def test_get_video_length(mock_call_subp_and_raise):
     mock_call_subp_and_raise.assert_called_once_with(command)
 
 
-def test_split_video_into_cuts(mock_call_subp):
-    split_video_into_cuts("foo", 3, 0, 1)
+def test_get_split_video_into_cuts_command():
     command = "ffmpeg -y -nostats -i foo -ss 0 "
     command += "-c:v copy -c:a copy 3/cut1.mp4"
 
-    mock_call_subp.assert_called_once_with(command)
+    assert get_split_video_into_cuts_command("foo", 3, 0, 1) == command
 
 
-def test_split_video_into_cuts_w_end(mock_call_subp):
-    split_video_into_cuts("foo", 3, 0, 1, 400)
+def test_get_split_video_into_cuts_command_w_end():
     command = "ffmpeg -y -nostats -i foo -ss 0 -t 400 "
     command += "-c:v copy -c:a copy 3/cut1.mp4"
 
-    mock_call_subp.assert_called_once_with(command)
+    assert get_split_video_into_cuts_command("foo", 3, 0, 1, 400) == command
 
 
 def test_detect_silence(mocker, mock_call_subp_iter):
@@ -93,10 +88,41 @@ def test_detect_silence(mocker, mock_call_subp_iter):
     out = detect_silence("file")
 
     command = (
-        "ffmpeg -y -nostats -i file -af silencedetect=n=-50dB:d=10 "
-        "-c:v copy -c:a libmp3lame -f mp4 /dev/null"
+        "ffmpeg -nostats -i file -map 0:a:0 -af silencedetect=n=-50dB:d=10 "
+        "-f null - 2>&1"
     )
     mock_call_subp_iter.assert_called_once_with(command)
 
     for a, b in itertools.zip_longest(out, iter(mockiter, b"")):
         assert a == b
+
+
+def test_detect_silence_downsampled(mock_call_subp_iter):
+    detect_silence("file", 16000)
+
+    command = (
+        "ffmpeg -nostats -i file -map 0:a:0 "
+        "-af aformat=channel_layouts=mono:sample_rates=16000,"
+        "silencedetect=n=-50dB:d=10 -f null - 2>&1"
+    )
+    mock_call_subp_iter.assert_called_once_with(command)
+
+
+def test_start_detecting_silence_in_stdin(mocker):
+    mo = mocker.patch("nhltv_lib.ffmpeg.call_subprocess_with_stdin")
+
+    start_detecting_silence_in_stdin()
+
+    mo.assert_called_once_with(
+        "ffmpeg -nostats -i pipe:0 -map 0:a:0 -af silencedetect=n=-50dB:d=10 "
+        "-f null - 2>&1"
+    )
+
+
+def test_decode_audio_to_pcm(mock_call_subp_and_raise):
+    decode_audio_to_pcm("file", "1/audio.pcm", 16000)
+
+    mock_call_subp_and_raise.assert_called_once_with(
+        "ffmpeg -y -nostats -loglevel error -i file -map 0:a:0 "
+        "-ac 1 -ar 16000 -f s16le 1/audio.pcm"
+    )
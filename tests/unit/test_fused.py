@@ -0,0 +1,133 @@
+import pytest
+from nhltv_lib.fused import (
+    _get_length_without_silence,
+    finish_fused_download,
+    fused_postprocess,
+)
+from nhltv_lib.exceptions import ExternalProgramError
+from nhltv_lib.models import GameStatus
+from nhltv_lib.obfuscate import BLACK_CLIP
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_game_tracking(mocker):
+    return mocker.patch("nhltv_lib.fused.game_tracking")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_download_folder(mocker):
+    mocker.patch("nhltv_lib.fused.get_download_folder", return_value="./foo")
+    mocker.patch("nhltv_lib.common.get_download_folder", return_value="./foo")
+    mocker.patch("nhltv_lib.fused.Path.mkdir")
+
+
+@pytest.fixture(scope="function")
+def mock_marks(mocker):
+    return mocker.patch(
+        "nhltv_lib.fused.get_marks",
+        return_value=iter(["0", "100", "3700", "end"]),
+    )
+
+
+def test_fused_postprocess(mocker, fake_download, mock_marks):
+    mocker.patch("nhltv_lib.fused.get_video_length", return_value=7300)
+    mocker.patch("nhltv_lib.fused.get_black_padding", return_value=(2, 7200))
+    write_lines = mocker.patch("nhltv_lib.fused.write_lines_to_file")
+    concat = mocker.patch("nhltv_lib.fused.concat_video")
+    remove = mocker.patch("os.remove")
+
+    fused_postprocess(fake_download)
+
+    game_id = fake_download.game_id
+    assert write_lines.call_args[0][0] == [
+        f"file\t../{game_id}_raw.mkv\n",
+        "inpoint 0\n",
+        "outpoint 100\n",
+        f"file\t../{game_id}_raw.mkv\n",
+        "inpoint 3700\n",
+        f"file\t{BLACK_CLIP}\n",
+        f"file\t{BLACK_CLIP}\n",
+    ]
+    concat.assert_called_once_with(
+        f"{game_id}/fused_concat_list.txt",
+        f"./foo/.{fake_download.game_info}.partial.mkv",
+        "-t 7200",
+    )
+    remove.assert_called_once_with(f"{game_id}_raw.mkv")
+
+
+def test_fused_postprocess_status(
+    mocker, fake_download, mock_marks, mock_game_tracking
+):
+    mocker.patch("nhltv_lib.fused.get_video_length", return_value=7300)
+    mocker.patch("nhltv_lib.fused.get_black_padding", return_value=(2, 7200))
+    mocker.patch("nhltv_lib.fused.write_lines_to_file")
+    mocker.patch("nhltv_lib.fused.concat_video")
+    mocker.patch("os.remove")
+
+    fused_postprocess(fake_download)
+
+    game = mock_game_tracking.track.return_value
+    assert [i[0][0] for i in game.update_status.call_args_list] == [
+        GameStatus.skip_silence,
+        GameStatus.obfuscating,
+    ]
+    assert game.flush.call_count == 2
+
+
+def test_fused_postprocess_removes_partial_file(
+    mocker, fake_download, mock_marks
+):
+    mocker.patch("nhltv_lib.fused.get_video_length", return_value=7300)
+    mocker.patch("nhltv_lib.fused.get_black_padding", return_value=(2, 7200))
+    mocker.patch("nhltv_lib.fused.write_lines_to_file")
+    mocker.patch(
+        "nhltv_lib.fused.concat_video", side_effect=ExternalProgramError
+    )
+    mocker.patch("os.path.isfile", return_value=True)
+    remove = mocker.patch("os.remove")
+
+    with pytest.raises(ExternalProgramError):
+        fused_postprocess(fake_download)
+
+    remove.assert_called_once_with(
+        f"./foo/.{fake_download.game_info}.partial.mkv"
+    )
+
+
+def test_finish_fused_download(mocker, fake_download, mock_game_tracking):
+    replace = mocker.patch("os.replace")
+    clean_up = mocker.patch("nhltv_lib.fused.clean_up_download")
+
+    finish_fused_download(fake_download)
+
+    replace.assert_called_once_with(
+        f"./foo/.{fake_download.game_info}.partial.mkv",
+        f"./foo/{fake_download.game_info}.mkv",
+    )
+    game = mock_game_tracking.track.return_value
+    assert [i[0][0] for i in game.update_status.call_args_list] == [
+        GameStatus.moving,
+        GameStatus.completed,
+    ]
+    game.download_finished.assert_called_once()
+    mock_game_tracking.release_tracked_game.assert_called_once_with(
+        fake_download.game_id
+    )
+    clean_up.assert_called_once_with(fake_download.game_id)
+
+
+def test_get_length_without_silence(mocker):
+    get_len = mocker.patch(
+        "nhltv_lib.fused.get_video_length", return_value=7300
+    )
+    assert _get_length_without_silence(1, ["0", "100", "3700", "end"]) == 3700
+    get_len.assert_called_once_with("1_raw.mkv")
+
+
+def test_get_length_without_silence_ends_in_silence(mocker):
+    get_len = mocker.patch("nhltv_lib.fused.get_video_length")
+    assert _get_length_without_silence(1, ["0", "100.5", "3700", "7000"]) == (
+        3400
+    )
+    get_len.assert_not_called()
@@ -13,7 +13,15 @@ from nhltv_lib.game import (
     filter_games,
     filter_games_that_have_not_started,
     get_team_ids,
+    fetch_games,
+    fetch_schedule_pages,
+    fetch_schedule_window,
+    is_schedule_final,
+    get_schedule_windows,
+    merge_games,
+    add_games_to_tracking,
 )
+from nhltv_lib.models import DbGame, GameStatus
 
 
 @pytest.fixture
@@ -30,6 +38,40 @@ def test_filter_games(mocker, games_data):
     assert list(filter_games(games_data))[0] == games_data["data"][5]
 
 
+def test_filter_games_looks_up_tracking_once(
+    mocker, games_data, mock_db_session
+):
+    game = games_data["data"][5]
+    games_data = {"data": [dict(game, id=game["id"] + i) for i in range(4)]}
+    first = list(filter_games(games_data))
+    mock_db_session.add(DbGame(id=first[0]["id"], status=GameStatus.completed))
+    mock_db_session.add(
+        DbGame(
+            id=first[1]["id"],
+            status=GameStatus.blackout,
+            next_attempt=datetime.now() + timedelta(hours=1),
+        )
+    )
+    mock_db_session.commit()
+    query = mocker.spy(mock_db_session, "query")
+
+    assert list(filter_games(games_data)) == first[2:]
+    query.assert_called_once()
+
+
+def test_add_games_to_tracking(mocker, games_data, mock_db_session):
+    games = tuple(filter_games(games_data))
+    commit = mocker.spy(mock_db_session, "commit")
+
+    tracked = add_games_to_tracking(games)
+
+    commit.assert_called_once()
+    assert [i.id for i in tracked] == [i["id"] for i in games]
+    assert tracked[0].status == GameStatus.waiting
+    assert tracked[0].home_team == games[0]["homeCompetitor"]["name"]
+    assert mock_db_session.query(DbGame).count() == len(games)
+
+
 def test_filter_games_not_started(mocker):
     time_now = datetime.now(UTC)
     game2 = {"startTime": (time_now - timedelta(hours=30)).isoformat()}
@@ -167,3 +209,145 @@ def test_create_game_objects(mocker):
 # def test_is_home_game(mocker, mock_get_team_id):
 # assert is_home_game(dict(teams=dict(home=dict(team=dict(id=18)))))
 # assert not is_home_game(dict(teams=dict(home=dict(team=dict(id=19)))))
+
+
+def _schedule_response(mocker, data, next_url=None):
+    rsp = mocker.Mock()
+    rsp.status_code = 200
+    rsp.json.return_value = {"data": data, "links": {"next": next_url}}
+    return rsp
+
+
+@pytest.fixture
+def mock_schedule_cache(mocker):
+    mocker.patch("nhltv_lib.game.load_cache_json", return_value=None)
+    return mocker.patch("nhltv_lib.game.cache_json")
+
+
+def test_get_schedule_windows():
+    assert get_schedule_windows("2024-01-30", "2024-02-02") == [
+        ("2024-01-30", "2024-01-31"),
+        ("2024-01-31", "2024-02-01"),
+        ("2024-02-01", "2024-02-02"),
+    ]
+    assert get_schedule_windows("2024-01-30", "2024-01-30") == [
+        ("2024-01-30", "2024-01-30")
+    ]
+
+
+def test_fetch_schedule_pages_follows_next(mocker):
+    mocker.patch("nhltv_lib.game.tprint")
+    get = mocker.patch(
+        "nhltv_lib.game.requests.get",
+        side_effect=[
+            _schedule_response(
+                mocker, [{"id": 1}], "https://nhl/v2/events?page=2"
+            ),
+            _schedule_response(mocker, [{"id": 2}]),
+        ],
+    )
+
+    games = fetch_schedule_pages("https://nhl/v2/events?date_time_from=a")
+
+    assert games == [{"id": 1}, {"id": 2}]
+    assert get.call_args_list[1][0][0] == (
+        "https://nhl/v2/events?date_time_from=a&page=2"
+    )
+
+
+def test_merge_games():
+    assert merge_games([[{"id": 1}, {"id": 2}], [{"id": 2}, {"id": 3}]]) == [
+        {"id": 1},
+        {"id": 2},
+        {"id": 3},
+    ]
+
+
+def test_fetch_games_per_day(mocker, mock_schedule_cache):
+    mocker.patch("nhltv_lib.game.tprint")
+
+    def fake_get(url, **kwargs):
+        day = int(url.split("date_time_from=2024-01-")[1][:2])
+        # a game late on the first day also shows up on the second
+        return _schedule_response(mocker, [{"id": day}, {"id": 100}])
+
+    get = mocker.patch("nhltv_lib.game.requests.get", side_effect=fake_get)
+    mocker.patch("nhltv_lib.game.is_schedule_final", return_value=False)
+
+    games = fetch_games("2024-01-29", "2024-02-01")
+
+    assert games == {"data": [{"id": 29}, {"id": 100}, {"id": 30}, {"id": 31}]}
+    assert get.call_count == 3
+    mock_schedule_cache.assert_not_called()
+
+
+def test_fetch_schedule_window_caches_final_day(mocker, mock_schedule_cache):
+    mocker.patch("nhltv_lib.game.tprint")
+    mocker.patch(
+        "nhltv_lib.game.requests.get",
+        return_value=_schedule_response(mocker, [{"id": 1}]),
+    )
+    mocker.patch("nhltv_lib.game.is_schedule_final", return_value=True)
+
+    assert fetch_schedule_window("2024-01-29", "2024-01-30") == [{"id": 1}]
+
+    assert mock_schedule_cache.call_args[0][0] == "schedule_2024-01-29"
+    assert mock_schedule_cache.call_args[1]["content"] == {"data": [{"id": 1}]}
+
+
+def test_is_schedule_final_empty_day():
+    assert not is_schedule_final("2024-01-30", [])
+
+
+def test_fetch_schedule_window_does_not_cache_empty_day(
+    mocker, mock_schedule_cache
+):
+    mocker.patch("nhltv_lib.game.tprint")
+    mocker.patch(
+        "nhltv_lib.game.requests.get",
+        return_value=_schedule_response(mocker, []),
+    )
+
+    assert fetch_schedule_window("2024-01-29", "2024-01-30") == []
+    mock_schedule_cache.assert_not_called()
+
+
+def test_fetch_schedule_window_cached(mocker):
+    load = mocker.patch(
+        "nhltv_lib.game.load_cache_json", return_value={"data": [{"id": 1}]}
+    )
+    get = mocker.patch("nhltv_lib.game.requests.get")
+
+    assert fetch_schedule_window("2024-01-29", "2024-01-30") == [{"id": 1}]
+    get.assert_not_called()
+    assert load.call_args[0][0] == "schedule_2024-01-29"
+
+
+def _scheduled_game(*delivered):
+    return {
+        "content": [
+            {
+                "contentType": {"name": "Full Game"},
+                "status": {"isDelivered": i},
+            }
+            for i in delivered
+        ]
+        + [
+            {
+                "contentType": {"name": "Highlights"},
+                "status": {"isDelivered": False},
+            }
+        ]
+    }
+
+
+def test_is_schedule_final(games_data):
+    assert is_schedule_final("2024-04-21", games_data["data"][:6])
+    assert is_schedule_final("2024-01-30", [_scheduled_game(True, True)])
+    assert not is_schedule_final(
+        "2024-01-30", [_scheduled_game(True), _scheduled_game(True, False)]
+    )
+    assert not is_schedule_final("2024-01-30", [_scheduled_game()])
+
+    tomorrow = (datetime.now() + timedelta(days=1)).date().isoformat()
+    assert not is_schedule_final(tomorrow, [_scheduled_game(True)])
@@ -1,20 +1,19 @@
 from datetime import datetime, timedelta
 import pytest
+from sqlalchemy.orm import Session
 from nhltv_lib.game_tracking import (
     start_tracking_game,
     _get_game_from_db,
-    set_game_info,
-    update_progress,
-    update_game_status,
-    clear_progress,
     get_download_attempts,
-    set_download_attempts,
-    increment_download_attempts,
-    download_started,
-    download_finished,
-    game_not_downloaded,
-    ready_for_next_attempt,
+    is_not_downloaded,
+    is_ready_for_next_attempt,
     set_blackout,
+    get_tracked_games,
+    start_tracking_games,
+    track,
+    flush_tracked_game,
+    release_tracked_game,
+    drop_tracked_game,
 )
 from nhltv_lib.models import DbGame, GameStatus
 
@@ -41,97 +40,205 @@ def test_start_tracking_game(mock_db_session):
     assert mock_db_session.query(DbGame).first().away_team == "bar"
 
 
-def test_set_game_info(mock_db_session, mock_game):
-    set_game_info(mock_game.id, "foobar")
-    assert mock_game.game_info == "foobar"
+def test_get_download_attempts(mock_db_session, mock_game):
+    mock_game.download_attempts = 80
+    assert get_download_attempts(mock_game.id) == 80
 
 
-def test_update_game_status(mock_db_session, mock_game):
-    update_game_status(mock_game.id, GameStatus.decoding)
-    assert mock_game.status == GameStatus.decoding
+@pytest.fixture(scope="function")
+def mock_datetime(mocker):
+    da = datetime.now()
+    mocktime = mocker.patch("nhltv_lib.game_tracking.datetime")
+    mocktime.now.return_value = da
+    return da
 
 
-def test_update_progress(mock_db_session, mock_game):
-    update_progress(mock_game.id, 80, 100)
-    assert mock_game.current_operation_progress == 80
+def test_is_not_downloaded(mock_game):
+    mock_game.status = GameStatus.completed
+    assert not is_not_downloaded(mock_game)
 
-    update_progress(mock_game.id, 6, 10)
-    assert mock_game.current_operation_progress == 60
 
+def test_is_not_downloaded_yes(mock_game):
+    mock_game.status = GameStatus.downloading
+    assert is_not_downloaded(mock_game)
+    assert is_not_downloaded(None)
 
-def test_clear_progress(mock_db_session, mock_game):
-    mock_game.progress = 80
-    clear_progress(mock_game.id)
-    assert mock_game.current_operation_progress is None
 
+def test_set_blackout(mock_db_session, mock_game, mock_datetime):
+    set_blackout(mock_game.id)
+    assert mock_game.status == GameStatus.blackout
+    assert mock_game.next_attempt == mock_datetime + timedelta(hours=4)
 
-def test_get_download_attempts(mock_db_session, mock_game):
-    mock_game.download_attempts = 80
-    assert get_download_attempts(mock_game.id) == 80
 
+def test_set_blackout_commits(mock_db_session, mock_game, mock_datetime):
+    set_blackout(mock_game.id)
+    mock_db_session.rollback()
+    assert mock_game.next_attempt == mock_datetime + timedelta(hours=4)
 
-def test_set_download_attempts(mock_db_session, mock_game):
-    mock_game.download_attempts = 80
-    set_download_attempts(mock_game.id, 1)
-    assert mock_game.download_attempts == 1
 
+def test_set_blackout_goes_through_tracked_game(mock_db_session, mock_game):
+    game = track(mock_game.id)
+    game.update_status(GameStatus.downloading)
+    set_blackout(mock_game.id)
 
-def test_increment_download_attempts(mock_db_session, mock_game):
-    mock_game.download_attempts = 80
-    increment_download_attempts(mock_game.id)
-    assert mock_game.download_attempts == 81
+    assert mock_game.status == GameStatus.blackout
+    # the game is done with, a later change to it is not held back
+    assert track(mock_game.id) is not game
 
 
-def test_increment_download_attempts_uninitialized(mock_db_session, mock_game):
-    mock_game.download_attempts = None
-    increment_download_attempts(mock_game.id)
-    assert mock_game.download_attempts == 1
+def test_is_ready_for_next_attempt(mock_game):
+    mock_game.next_attempt = datetime.now() - timedelta(hours=4)
+    assert is_ready_for_next_attempt(mock_game)
 
 
-@pytest.fixture(scope="function")
-def mock_datetime(mocker):
-    da = datetime.now()
-    mocktime = mocker.patch("nhltv_lib.game_tracking.datetime")
-    mocktime.now.return_value = da
-    return da
+def test_is_ready_for_next_attempt_empty(mock_game):
+    mock_game.next_attempt = None
+    assert is_ready_for_next_attempt(mock_game)
+    assert is_ready_for_next_attempt(None)
+
+
+def test_is_ready_for_next_attempt_not(mock_game):
+    mock_game.next_attempt = datetime.now() + timedelta(hours=4)
+    assert not is_ready_for_next_attempt(mock_game)
 
 
-def test_dl_started(mock_db_session, mock_game, mock_datetime):
-    download_started(mock_game.id)
+def test_get_tracked_games(mock_db_session, mock_game, mocker):
+    mock_db_session.add(DbGame(id=81, status=GameStatus.waiting))
+    mock_db_session.commit()
+    mocker.patch("nhltv_lib.game_tracking.BULK_QUERY_SIZE", 2)
+    query = mocker.spy(mock_db_session, "query")
+
+    assert get_tracked_games([80, 81, 82, 80]) == {
+        80: mock_game,
+        81: mock_db_session.get(DbGame, 81),
+    }
+    assert query.call_count == 2
+
+
+def test_get_tracked_games_reads_changes_from_other_sessions(
+    mock_db_session, mock_game
+):
+    assert mock_game.status == GameStatus.completed
+    other_session = Session(bind=mock_db_session.get_bind())
+    other_session.query(DbGame).filter(DbGame.id == 80).update(
+        {"status": GameStatus.waiting}
+    )
+    other_session.commit()
+
+    assert get_tracked_games([80])[80].status == GameStatus.waiting
+
+
+def test_start_tracking_games(mock_db_session, mock_game, mocker):
+    commit = mocker.spy(mock_db_session, "commit")
+
+    games = start_tracking_games(
+        [
+            DbGame(id=80, status=GameStatus.waiting),
+            DbGame(id=1, status=GameStatus.waiting, home_team="foo"),
+            DbGame(id=1, status=GameStatus.waiting, home_team="bar"),
+        ]
+    )
+
+    commit.assert_called_once()
+    assert games[0] is mock_game
+    assert games[0].status == GameStatus.completed
+    assert games[1] is games[2]
+    assert mock_db_session.query(DbGame).count() == 2
+    assert mock_db_session.get(DbGame, 1).home_team == "foo"
+
+
+def test_start_tracking_games_all_tracked(mock_db_session, mock_game, mocker):
+    commit = mocker.spy(mock_db_session, "commit")
+    assert start_tracking_games(
+        [DbGame(id=80, status=GameStatus.waiting)]
+    ) == [mock_game]
+    commit.assert_not_called()
+
+
+def test_tracked_game_writes_changes_in_one_commit(
+    mock_db_session, mock_game, mock_datetime, mocker
+):
+    commit = mocker.spy(mock_db_session, "commit")
+    game = track(mock_game.id)
+
+    game.update_status(GameStatus.downloading)
+    game.download_started()
+    game.set_game_info("foobar")
+    game.update_progress(1, 2)
+    commit.assert_not_called()
+
+    game.flush()
+    commit.assert_called_once()
+    mock_db_session.expire_all()
+    assert mock_game.status == GameStatus.downloading
     assert mock_game.download_start == mock_datetime
+    assert mock_game.game_info == "foobar"
+    assert mock_game.current_operation_progress == 50
 
+    game.flush()
+    commit.assert_called_once()
 
-def test_dl_finished(mock_db_session, mock_game, mock_datetime):
-    download_finished(mock_game.id)
-    assert mock_game.download_end == mock_datetime
 
+def test_tracked_game_flushes_after_interval(
+    mock_db_session, mock_game, mocker
+):
+    clock = mocker.patch("nhltv_lib.game_tracking.monotonic", return_value=0)
+    commit = mocker.spy(mock_db_session, "commit")
+    game = track(mock_game.id)
 
-def test_game_not_downloaded(mock_db_session, mock_game):
-    mock_game.status = GameStatus.completed
-    assert not game_not_downloaded(mock_game.id)
+    game.update_progress(1, 10)
+    clock.return_value = 29
+    game.update_progress(2, 10)
+    commit.assert_not_called()
 
+    clock.return_value = 30
+    game.update_progress(3, 10)
+    commit.assert_called_once()
+    assert mock_game.current_operation_progress == 30
 
-def test_game_not_downloaded_yes(mock_db_session, mock_game):
-    mock_game.status = GameStatus.downloading
-    assert game_not_downloaded(mock_game.id)
 
+def test_tracked_game_increments_download_attempts(mock_db_session, mock_game):
+    mock_game.download_attempts = 2
+    mock_db_session.commit()
+    game = track(mock_game.id)
 
-def test_set_blackout(mock_db_session, mock_game, mock_datetime):
-    set_blackout(mock_game.id)
-    assert mock_game.status == GameStatus.blackout
-    assert mock_game.next_attempt == mock_datetime + timedelta(hours=4)
+    game.increment_download_attempts()
+    game.increment_download_attempts()
+    game.flush()
 
+    assert mock_game.download_attempts == 4
 
-def test_ready_for_next_attempt(mock_db_session, mock_game):
-    mock_game.next_attempt = datetime.now() - timedelta(hours=4)
-    assert ready_for_next_attempt(mock_game.id)
 
+def test_tracked_game_not_in_database(mock_db_session, mocker):
+    tprint = mocker.patch("nhltv_lib.game_tracking.tprint")
+    game = track(1)
+    game.increment_download_attempts()
+    game.flush()
+    tprint.assert_called_once_with("Game 1 not found in database")
 
-def test_ready_for_next_attempt_empty(mock_db_session, mock_game):
-    mock_game.next_attempt = None
-    assert ready_for_next_attempt(mock_game.id)
 
+def test_track_returns_same_game_until_released(mock_db_session, mock_game):
+    game = track(mock_game.id)
+    assert track(mock_game.id) is game
 
-def test_ready_for_next_attempt_not(mock_db_session, mock_game):
-    mock_game.next_attempt = datetime.now() + timedelta(hours=4)
-    assert not ready_for_next_attempt(mock_game.id)
+    game.update_status(GameStatus.moving)
+    release_tracked_game(mock_game.id)
+
+    assert mock_game.status == GameStatus.moving
+    assert track(mock_game.id) is not game
+
+
+def test_flush_tracked_game(mock_db_session, mock_game):
+    track(mock_game.id).update_status(GameStatus.moving)
+    flush_tracked_game(mock_game.id)
+    flush_tracked_game(2)
+    assert mock_game.status == GameStatus.moving
+
+
+def test_drop_tracked_game(mock_db_session, mock_game):
+    game = track(mock_game.id)
+    game.update_status(GameStatus.moving)
+    drop_tracked_game(mock_game.id)
+
+    assert track(mock_game.id) is not game
+    assert mock_game.status == GameStatus.completed
@@ -0,0 +1,256 @@
+import io
+import time
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+from streamlink.stream.hls.m3u8 import parse_m3u8
+
+from nhltv_lib.exceptions import DownloadError
+from nhltv_lib.hls import (
+    _decrypt_segment,
+    _fetch_keys,
+    _limit_segments_to_duration,
+    _record_segment,
+    download_hls_stream,
+    download_segments,
+    resolve_media_playlist,
+)
+
+MASTER_PLAYLIST = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=1000,RESOLUTION=640x360
+low/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=5000,RESOLUTION=1280x720
+high/index.m3u8
+"""
+
+MEDIA_PLAYLIST = """#EXTM3U
+#EXT-X-MEDIA-SEQUENCE:5
+#EXTINF:10.0,
+s5.ts
+#EXTINF:10.0,
+s6.ts
+#EXTINF:10.0,
+s7.ts
+#EXTINF:10.0,
+s8.ts
+#EXT-X-ENDLIST
+"""
+
+ENCRYPTED_PLAYLIST = """#EXTM3U
+#EXT-X-MEDIA-SEQUENCE:1
+#EXT-X-KEY:METHOD=AES-128,URI="key.bin"
+#EXTINF:10.0,
+s1.ts
+#EXT-X-ENDLIST
+"""
+
+KEY = b"0123456789abcdef"
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_sleep(mocker):
+    return mocker.patch("nhltv_lib.requests_wrapper.sleep")
+
+
+def _response(mocker, status_code=200, text="", content=b""):
+    rsp = mocker.Mock()
+    rsp.status_code = status_code
+    rsp.text = text
+    rsp.content = content
+    return rsp
+
+
+def test_resolve_media_playlist_picks_highest_bandwidth(mocker):
+    session = mocker.Mock()
+    session.get.side_effect = [
+        _response(mocker, text=MASTER_PLAYLIST),
+        _response(mocker, text=MEDIA_PLAYLIST),
+    ]
+    playlist = resolve_media_playlist(session, "http://nhl/master.m3u8")
+
+    assert session.get.call_args_list[1][0][0] == (
+        "http://nhl/high/index.m3u8"
+    )
+    assert [i.num for i in playlist.segments] == [5, 6, 7, 8]
+
+
+def test_resolve_media_playlist_media(mocker):
+    session = mocker.Mock()
+    session.get.return_value = _response(mocker, text=MEDIA_PLAYLIST)
+    playlist = resolve_media_playlist(session, "http://nhl/index.m3u8")
+    session.get.assert_called_once()
+    assert len(playlist.segments) == 4
+
+
+def test_limit_segments_to_duration():
+    segments = parse_m3u8(MEDIA_PLAYLIST, "http://nhl/").segments
+    assert _limit_segments_to_duration(segments, None) == segments
+    assert [i.num for i in _limit_segments_to_duration(segments, 15)] == [
+        5,
+        6,
+    ]
+
+
+def test_download_segments_writes_in_order(mocker):
+    segments = parse_m3u8(MEDIA_PLAYLIST, "http://nhl/").segments
+
+    def fake_get(url, **kwargs):
+        # finish the first segments last to exercise the reorder buffer
+        name = url.split("/")[-1]
+        time.sleep(0.04 - int(name[1]) * 0.005)
+        return _response(mocker, content=name.encode())
+
+    session = mocker.Mock()
+    session.get.side_effect = fake_get
+    out = io.BytesIO()
+
+    download_segments(session, segments, {}, out, 4)
+
+    assert out.getvalue() == b"s5.tss6.tss7.tss8.ts"
+
+
+def test_download_segments_raises_on_failure(mocker):
+    segments = parse_m3u8(MEDIA_PLAYLIST, "http://nhl/").segments
+    session = mocker.Mock()
+    session.get.return_value = _response(mocker, status_code=404)
+
+    with pytest.raises(DownloadError):
+        download_segments(session, segments, {}, io.BytesIO(), 2)
+
+
+def test_fetch_keys_once(mocker):
+    segments = parse_m3u8(ENCRYPTED_PLAYLIST, "http://nhl/").segments
+    session = mocker.Mock()
+    session.get.return_value = _response(mocker, content=KEY)
+    assert _fetch_keys(session, segments + segments) == {
+        "http://nhl/key.bin": KEY
+    }
+    session.get.assert_called_once()
+
+
+def test_decrypt_segment_uses_sequence_as_iv():
+    iv = (1).to_bytes(16, "big")
+    encrypted = AES.new(KEY, AES.MODE_CBC, iv).encrypt(pad(b"video", 16))
+    assert _decrypt_segment(encrypted, KEY, None, 1) == b"video"
+
+
+def test_download_encrypted_segments(mocker):
+    segments = parse_m3u8(ENCRYPTED_PLAYLIST, "http://nhl/").segments
+    iv = (1).to_bytes(16, "big")
+    encrypted = AES.new(KEY, AES.MODE_CBC, iv).encrypt(pad(b"video", 16))
+    session = mocker.Mock()
+    session.get.return_value = _response(mocker, content=encrypted)
+    out = io.BytesIO()
+
+    download_segments(session, segments, {"http://nhl/key.bin": KEY}, out, 1)
+
+    assert out.getvalue() == b"video"
+
+
+@pytest.fixture
+def mock_media_session(mocker):
+    session = mocker.Mock()
+
+    def fake_get(url, **kwargs):
+        if url.endswith(".m3u8"):
+            return _response(mocker, text=MEDIA_PLAYLIST)
+        return _response(mocker, content=url.split("/")[-1].encode())
+
+    session.get.side_effect = fake_get
+    mocker.patch("nhltv_lib.hls.create_session", return_value=session)
+    return session
+
+
+def test_download_hls_stream_writes_journal(tmp_path, mock_media_session):
+    out = tmp_path / "1_raw.mkv"
+    journal = tmp_path / "journal.txt"
+
+    download_hls_stream(
+        "http://nhl/index.m3u8", str(out), {}, 2, journal_file=str(journal)
+    )
+
+    assert out.read_bytes() == b"s5.tss6.tss7.tss8.ts"
+    assert journal.read_text() == ("segments 5-8\n5 5\n6 10\n7 15\n8 20\n")
+
+
+def test_download_hls_stream_resumes(tmp_path, mock_media_session):
+    out = tmp_path / "1_raw.mkv"
+    journal = tmp_path / "journal.txt"
+    # segment 7 was partially written when the previous attempt died
+    out.write_bytes(b"s5.tss6.tss7")
+    journal.write_text("segments 5-8\n5 5\n6 10\n7 1")
+    seen = []
+
+    download_hls_stream(
+        "http://nhl/index.m3u8",
+        str(out),
+        {},
+        2,
+        journal_file=str(journal),
+        on_segment_data=lambda data, offset: seen.append(offset),
+    )
+
+    assert out.read_bytes() == b"s5.tss6.tss7.tss8.ts"
+    assert seen == [10, 15]
+    fetched = [i[0][0] for i in mock_media_session.get.call_args_list]
+    assert "http://nhl/s5.ts" not in fetched
+    assert "http://nhl/s7.ts" in fetched
+
+
+def test_download_hls_stream_restarts_on_other_playlist(
+    tmp_path, mock_media_session
+):
+    out = tmp_path / "1_raw.mkv"
+    journal = tmp_path / "journal.txt"
+    out.write_bytes(b"garbage")
+    journal.write_text("segments 1-3\n1 7\n")
+    seen = []
+
+    download_hls_stream(
+        "http://nhl/index.m3u8",
+        str(out),
+        {},
+        2,
+        journal_file=str(journal),
+        on_segment_data=lambda data, offset: seen.append(offset),
+    )
+
+    assert out.read_bytes() == b"s5.tss6.tss7.tss8.ts"
+    assert seen[0] == 0
+
+
+def test_download_hls_stream_passes_on_segment_data(
+    tmp_path, mock_media_session
+):
+    seen = []
+
+    download_hls_stream(
+        "http://nhl/index.m3u8",
+        str(tmp_path / "1_raw.mkv"),
+        {},
+        2,
+        on_segment_data=lambda data, offset: seen.append((data, offset)),
+    )
+
+    assert seen == [
+        (b"s5.ts", 0),
+        (b"s6.ts", 5),
+        (b"s7.ts", 10),
+        (b"s8.ts", 15),
+    ]
+
+
+def test_record_segment_syncs_file_before_journal(tmp_path, mocker):
+    calls = []
+    mocker.patch(
+        "nhltv_lib.hls.os.fsync", side_effect=lambda fd: calls.append("sync")
+    )
+    journal = mocker.Mock()
+    journal.write.side_effect = lambda line: calls.append(line)
+    segment = parse_m3u8(MEDIA_PLAYLIST, "http://nhl/").segments[0]
+
+    with open(tmp_path / "1_raw.mkv", "wb") as file_out:
+        file_out.write(b"s5.ts")
+        _record_segment(journal, file_out, segment)
+
+    assert calls == ["sync", "5 5\n"]
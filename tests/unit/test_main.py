@@ -2,8 +2,8 @@ import pytest
 from nhltv_lib.main import (
     verify_dependencies,
     get_and_download_games,
-    download,
     loop,
+    log_circuit_states,
 )
 
 
@@ -28,25 +28,8 @@ def mock_get_games(mocker):
 
 
 @pytest.fixture(scope="function", autouse=True)
-def mock_download_game(mocker, fake_download):
-    return mocker.patch(
-        "nhltv_lib.main.download_game", return_value=fake_download
-    )
-
-
-@pytest.fixture(scope="function", autouse=True)
-def mock_skip_silence(mocker):
-    return mocker.patch("nhltv_lib.main.skip_silence")
-
-
-@pytest.fixture(scope="function", autouse=True)
-def mock_obfuscate(mocker):
-    return mocker.patch("nhltv_lib.main.obfuscate")
-
-
-@pytest.fixture(scope="function", autouse=True)
-def mock_clean_up_download(mocker):
-    return mocker.patch("nhltv_lib.main.clean_up_download")
+def mock_run_pipeline(mocker):
+    return mocker.patch("nhltv_lib.main.run_pipeline")
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -114,7 +97,45 @@ def test_loop_login_required_sub_30(mock_get_auth_cookie_expires, mock_login):
     mock_login.assert_called_once()
 
 
+def test_loop_logs_circuit_states(mocker):
+    log = mocker.patch("nhltv_lib.main.log_circuit_states")
+    loop()
+    log.assert_called_once_with()
+
+
+def test_log_circuit_states(mocker):
+    mocker.patch(
+        "nhltv_lib.main.get_circuit_states",
+        return_value={"login": "closed", "events": "open"},
+    )
+    tprint = mocker.patch("nhltv_lib.main.tprint")
+
+    log_circuit_states()
+
+    tprint.assert_any_call(
+        "Circuits: login closed, events open", debug_only=True
+    )
+    tprint.assert_called_with("Requests are paused to events (open)")
+
+
+def test_log_circuit_states_all_closed(mocker):
+    tprint = mocker.patch("nhltv_lib.main.tprint")
+    log_circuit_states()
+    tprint.assert_called_once()
+
+
 def test_verify_deps(mocker):
     mock_verify_deps = mocker.patch("nhltv_lib.main.verify_cmd_exists_in_path")
     verify_dependencies()
     mock_verify_deps.assert_called()
+
+
+def test_get_and_download_games(mocker, mock_get_games, mock_run_pipeline):
+    mock_get_streams = mocker.patch(
+        "nhltv_lib.main.get_streams_to_download", return_value=[1, 2]
+    )
+
+    get_and_download_games()
+
+    mock_get_streams.assert_called_once_with(mock_get_games.return_value)
+    mock_run_pipeline.assert_called_once_with([1, 2])
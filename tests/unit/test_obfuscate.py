@@ -1,9 +1,11 @@
-import os
 import pytest
 from nhltv_lib.obfuscate import (
+    BLACK_CLIP,
     _create_obfuscation_concat_content,
+    _get_black_clip_length,
+    _get_black_clips_needed,
     _get_desired_length_after_obfuscation,
-    cut_to_closest_hour,
+    get_black_padding,
     obfuscate,
 )
 
@@ -13,31 +15,23 @@ def mock_game_tracking(mocker):
     return mocker.patch("nhltv_lib.obfuscate.game_tracking")
 
 
-def test_cut_to_closest_hour(mocker):
-    mocker.patch("nhltv_lib.obfuscate.get_video_length", return_value=12080)
-
-    mock_remove = mocker.patch("os.remove")
-    mock_cut_vid = mocker.patch("nhltv_lib.obfuscate.cut_video")
-
-    cut_to_closest_hour(1)
-
-    mock_cut_vid.assert_called_once_with(
-        "1_obfuscated.mkv", "1_ready.mkv", 10800
-    )
-    mock_remove.assert_called_once_with("1_obfuscated.mkv")
+@pytest.fixture(scope="function", autouse=True)
+def clear_black_clip_length():
+    _get_black_clip_length.cache_clear()
+    yield
+    _get_black_clip_length.cache_clear()
 
 
 def test_obfuscate(mocker, fake_download):
-    mocker.patch("nhltv_lib.obfuscate.cut_to_closest_hour")
+    mocker.patch(
+        "nhltv_lib.obfuscate.get_video_length", side_effect=[6280, 60]
+    )
     mocker.patch(
         "nhltv_lib.obfuscate._create_obfuscation_concat_content",
         return_value=["foo\n", "bar\n"],
     )
 
     mock_writelines = mocker.patch("nhltv_lib.obfuscate.write_lines_to_file")
-    mock_move = mocker.patch(
-        "nhltv_lib.obfuscate.move_file_to_download_folder"
-    )
     mock_remove = mocker.patch("os.remove")
     mock_concat_vid = mocker.patch("nhltv_lib.obfuscate.concat_video")
 
@@ -49,22 +43,61 @@ def test_obfuscate(mocker, fake_download):
     )
     mock_concat_vid.assert_called_once_with(
         f"{fake_download.game_id}/obfuscate_concat_list.txt",
-        f"{fake_download.game_id}_obfuscated.mkv",
+        f"{fake_download.game_id}_ready.mkv",
+        "-t 10800",
     )
     mock_remove.assert_called_once_with(f"{fake_download.game_id}_silent.mkv")
-    mock_move.assert_called_once_with(fake_download)
 
 
-def test_obfuscation_content(mocker):
-    mocker.patch("os.path.dirname", return_value="./bar")
-    black = os.path.join("./bar", "extras/black.mkv")
+def test_obfuscate_pads_only_whats_needed(mocker, fake_download):
+    mocker.patch(
+        "nhltv_lib.obfuscate.get_video_length", side_effect=[6280, 60]
+    )
+    create_content = mocker.patch(
+        "nhltv_lib.obfuscate._create_obfuscation_concat_content",
+        return_value=[],
+    )
+    mocker.patch("nhltv_lib.obfuscate.write_lines_to_file")
+    mocker.patch("os.remove")
+    mocker.patch("nhltv_lib.obfuscate.concat_video")
+
+    obfuscate(fake_download)
+
+    # 6280 + 100 * 60 rounds down to 10800, which takes 76 clips to reach
+    create_content.assert_called_once_with(
+        f"{fake_download.game_id}_silent.mkv", 76
+    )
+
+
+def test_get_black_clip_length_probes_once(mocker):
+    get_len = mocker.patch(
+        "nhltv_lib.obfuscate.get_video_length", return_value=60
+    )
+    assert _get_black_clip_length() == 60
+    assert _get_black_clip_length() == 60
+    get_len.assert_called_once_with(BLACK_CLIP)
+
+
+def test_get_black_padding(mocker):
+    mocker.patch("nhltv_lib.obfuscate.get_video_length", return_value=60)
+    assert get_black_padding(6300) == (75, 10800)
+
+
+def test_get_black_clips_needed():
+    assert _get_black_clips_needed(6300, 60, 10800) == 75
+    assert _get_black_clips_needed(6301, 60, 10800) == 75
+    assert _get_black_clips_needed(6299, 60, 10800) == 76
+    assert _get_black_clips_needed(10800, 60, 10800) == 0
+    assert _get_black_clips_needed(3000, 60, 10800) == 100
+
 
+def test_obfuscation_content():
     expected = []
     expected.append("file\t" + "../FOO" + "\n")
-    for _ in range(100):
-        expected.append("file\t" + black + "\n")
+    for _ in range(3):
+        expected.append("file\t" + BLACK_CLIP + "\n")
 
-    assert _create_obfuscation_concat_content("FOO") == expected
+    assert _create_obfuscation_concat_content("FOO", 3) == expected
 
 
 def test_get_desire_length_after_obfuscation():
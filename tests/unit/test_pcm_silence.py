@@ -0,0 +1,79 @@
+import io
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from nhltv_lib.pcm_silence import (  # noqa: E402
+    _get_silent_windows,
+    detect_silence_in_pcm,
+)
+from nhltv_lib.skip_silence import (  # noqa: E402
+    _create_marks_from_analyzed_output,
+    _create_marks_from_silences,
+)
+
+SAMPLE_RATE = 1000
+
+
+def _pcm(*parts):
+    """
+    Builds mono s16le PCM from (seconds, amplitude) parts
+    """
+    samples = [
+        np.full(int(seconds * SAMPLE_RATE), amplitude, dtype="<i2")
+        for seconds, amplitude in parts
+    ]
+    return io.BytesIO(np.concatenate(samples).tobytes())
+
+
+def test_detect_silence_in_pcm():
+    pcm = _pcm((30, 1000), (12, 0), (5, 1000), (3, 0), (20, 1000))
+    assert list(detect_silence_in_pcm(pcm, SAMPLE_RATE)) == [(30.0, 42.0)]
+
+
+def test_detect_silence_in_pcm_until_end():
+    pcm = _pcm((5, 1000), (15.5, 0))
+    assert list(detect_silence_in_pcm(pcm, SAMPLE_RATE)) == [(5.0, 20.5)]
+
+
+def test_detect_silence_in_pcm_below_threshold_is_silent():
+    # -50dB is an amplitude of about 103
+    pcm = _pcm((5, 1000), (11, 50), (5, 1000))
+    assert list(detect_silence_in_pcm(pcm, SAMPLE_RATE)) == [(5.0, 16.0)]
+
+
+def test_detect_silence_in_pcm_across_blocks(mocker):
+    mocker.patch("nhltv_lib.pcm_silence.BLOCK_SECONDS", 1)
+    pcm = _pcm((2.5, 1000), (10.5, 0), (2, 1000))
+    assert list(detect_silence_in_pcm(pcm, SAMPLE_RATE)) == [(2.5, 13.0)]
+
+
+def test_detect_silence_in_pcm_duration():
+    pcm = _pcm((1, 1000), (3, 0), (1, 1000))
+    assert list(detect_silence_in_pcm(pcm, SAMPLE_RATE, duration=2)) == [
+        (1.0, 4.0)
+    ]
+    pcm.seek(0)
+    assert list(detect_silence_in_pcm(pcm, SAMPLE_RATE)) == []
+
+
+def test_get_silent_windows_partial_window():
+    samples = np.array([0, 0, 500, 500, 0], dtype="<i2")
+    silent = _get_silent_windows(samples, 2, 100)
+    assert silent.tolist() == [True, False, True]
+
+
+def test_detect_silence_in_pcm_matches_ffmpeg(fake_silencedetect_output):
+    expected = list(
+        _create_marks_from_analyzed_output(fake_silencedetect_output)
+    )
+    bounds = [round(float(i) * SAMPLE_RATE) for i in expected[1:-1]]
+
+    # sound everywhere but the silences ffmpeg found, and a minute after
+    samples = np.full(bounds[-1] + 60 * SAMPLE_RATE, 1000, dtype="<i2")
+    for start, end in zip(bounds[::2], bounds[1::2]):
+        samples[start:end] = 0
+    pcm = io.BytesIO(samples.tobytes())
+
+    silences = list(detect_silence_in_pcm(pcm, SAMPLE_RATE))
+    assert list(_create_marks_from_silences(silences)) == expected
@@ -0,0 +1,211 @@
+import threading
+import time
+import pytest
+from nhltv_lib.exceptions import (
+    AuthenticationFailed,
+    BlackoutRestriction,
+    ExternalProgramError,
+)
+from nhltv_lib.models import GameStatus
+from nhltv_lib.pipeline import (
+    _pass_through,
+    download,
+    get_stages,
+    run_pipeline,
+)
+from nhltv_lib.types import NHLStream, Stage
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_game_tracking(mocker):
+    return mocker.patch("nhltv_lib.pipeline.game_tracking")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_db(mocker):
+    return mocker.patch("nhltv_lib.pipeline.db")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_login(mocker):
+    return mocker.patch("nhltv_lib.pipeline.login_and_save_cookie")
+
+
+@pytest.fixture(scope="function")
+def mock_download_game(mocker, fake_download):
+    return mocker.patch(
+        "nhltv_lib.pipeline.download_game", return_value=fake_download
+    )
+
+
+def test_get_stages():
+    assert [(i.name, i.workers) for i in get_stages()] == [
+        ("download", 2),
+        ("skip_silence", 1),
+        ("obfuscate", 1),
+        ("move", 1),
+    ]
+
+
+def test_get_stages_fused(mocker):
+    mocker.patch(
+        "nhltv_lib.pipeline.get_fused_postprocessing", return_value=True
+    )
+    assert [(i.name, i.workers) for i in get_stages()] == [
+        ("download", 2),
+        ("postprocess", 1),
+        ("move", 1),
+    ]
+
+
+def test_run_pipeline_passes_every_game_through_every_stage(mocker):
+    seen = []
+    lock = threading.Lock()
+
+    def record(name):
+        def stage_function(item):
+            with lock:
+                seen.append((name, item))
+            return item
+
+        return stage_function
+
+    mocker.patch(
+        "nhltv_lib.pipeline.get_stages",
+        return_value=[
+            Stage("first", record("first"), 2),
+            Stage("second", record("second"), 1),
+        ],
+    )
+
+    run_pipeline([1, 2, 3])
+
+    assert sorted(i for name, i in seen if name == "first") == [1, 2, 3]
+    assert sorted(i for name, i in seen if name == "second") == [1, 2, 3]
+
+
+def test_run_pipeline_overlaps_stages(mocker):
+    second_started = threading.Event()
+    overlapped = []
+
+    def first(item):
+        if item == 2:
+            # game 2 downloads while game 1 is in the second stage
+            overlapped.append(second_started.wait(timeout=5))
+        return item
+
+    def second(item):
+        second_started.set()
+        time.sleep(0.01)
+        return item
+
+    mocker.patch(
+        "nhltv_lib.pipeline.get_stages",
+        return_value=[Stage("first", first, 1), Stage("second", second, 1)],
+    )
+
+    run_pipeline([1, 2])
+
+    assert overlapped == [True]
+
+
+def test_run_pipeline_drops_none_and_raises_first_error(mocker):
+    done = []
+    streams = [NHLStream(i, {}, {}) for i in range(1, 4)]
+
+    def first(item):
+        if item.game_id == 1:
+            raise ExternalProgramError("boom")
+        if item.game_id == 2:
+            return None
+        return item
+
+    mocker.patch(
+        "nhltv_lib.pipeline.get_stages",
+        return_value=[
+            Stage("first", first, 1),
+            Stage("second", done.append, 1),
+        ],
+    )
+
+    with pytest.raises(ExternalProgramError):
+        run_pipeline(streams)
+
+    assert done == [streams[2]]
+
+
+def test_run_pipeline_drops_tracked_game_on_error(mocker, mock_game_tracking):
+    mocker.patch(
+        "nhltv_lib.pipeline.get_stages",
+        return_value=[
+            Stage("first", mocker.Mock(side_effect=ExternalProgramError), 1)
+        ],
+    )
+
+    with pytest.raises(ExternalProgramError):
+        run_pipeline([NHLStream(1, {}, {})])
+
+    mock_game_tracking.drop_tracked_game.assert_called_once_with(1)
+
+
+def test_run_pipeline_removes_session_of_every_worker(mocker, mock_db):
+    mocker.patch(
+        "nhltv_lib.pipeline.get_stages",
+        return_value=[
+            Stage("first", mocker.Mock(side_effect=ExternalProgramError), 2),
+            Stage("second", mocker.Mock(), 1),
+        ],
+    )
+
+    with pytest.raises(ExternalProgramError):
+        run_pipeline([NHLStream(1, {}, {})])
+
+    assert mock_db.session.remove.call_count == 3
+
+
+def test_pass_through_flushes_tracked_game(
+    mocker, fake_download, mock_game_tracking
+):
+    stage_function = _pass_through(
+        mocker.Mock(side_effect=ExternalProgramError)
+    )
+
+    with pytest.raises(ExternalProgramError):
+        stage_function(fake_download)
+
+    mock_game_tracking.flush_tracked_game.assert_called_once_with(
+        fake_download.game_id
+    )
+
+
+def test_download(mock_download_game, fake_download):
+    stream = NHLStream(1, {}, {})
+    assert download(stream) == fake_download
+    mock_download_game.assert_called_once_with(stream)
+
+
+def test_download_retries_auth_once(
+    mock_download_game, mock_login, fake_download
+):
+    mock_download_game.side_effect = [AuthenticationFailed, fake_download]
+    assert download(NHLStream(1, {}, {})) == fake_download
+    mock_login.assert_called_once()
+
+
+def test_download_auth_failure(
+    mock_download_game, mock_login, mock_game_tracking
+):
+    mock_download_game.side_effect = AuthenticationFailed
+    with pytest.raises(AuthenticationFailed):
+        download(NHLStream(1, {}, {}))
+    mock_game_tracking.track.assert_called_once_with(1)
+    mock_game_tracking.track.return_value.update_status.assert_called_once_with(
+        GameStatus.auth_failure
+    )
+    mock_game_tracking.flush_tracked_game.assert_called_with(1)
+
+
+def test_download_blackout(mock_download_game, mock_game_tracking):
+    mock_download_game.side_effect = BlackoutRestriction
+    assert download(NHLStream(1, {}, {})) is None
+    mock_game_tracking.set_blackout.assert_called_once_with(1)
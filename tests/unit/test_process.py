@@ -1,10 +1,14 @@
 import subprocess
+import time
 import pytest
 from nhltv_lib.process import (
     call_subprocess,
     call_subprocess_and_report_rc,
     verify_cmd_exists_in_path,
     call_subprocess_and_raise_on_error,
+    call_subprocess_with_stdin,
+    run_subprocess,
+    run_subprocesses,
 )
 from nhltv_lib.exceptions import (
     CommandMissing,
@@ -33,3 +37,61 @@ def test_verify_cmd_exists_in_path_raises_commandmissing(mocker):
         match="test is missing, please install it",
     ):
         verify_cmd_exists_in_path("test")
+
+
+def test_run_subprocess(mocked_subprocess):
+    proc = mocked_subprocess.return_value
+    proc.communicate.return_value = (b"out", b"err")
+    proc.returncode = 0
+
+    result = run_subprocess("ffmpeg foo")
+
+    assert result.command == "ffmpeg foo"
+    assert result.returncode == 0
+    assert result.stdout == b"out"
+    assert result.stderr == b"err"
+    assert result.duration >= 0
+
+
+def test_run_subprocess_timeout(mocked_subprocess):
+    proc = mocked_subprocess.return_value
+    proc.communicate.side_effect = [
+        subprocess.TimeoutExpired("ffmpeg", 1),
+        (b"", b"killed"),
+    ]
+    proc.returncode = -9
+
+    result = run_subprocess("ffmpeg foo", timeout=1)
+
+    proc.kill.assert_called_once()
+    assert result.returncode == -9
+
+
+def test_run_subprocesses_bounded(mocker):
+    running = []
+    peak = []
+
+    def fake_run(command, timeout):
+        running.append(command)
+        peak.append(len(running))
+        time.sleep(0.01)
+        running.remove(command)
+        return command
+
+    mocker.patch("nhltv_lib.process.run_subprocess", side_effect=fake_run)
+
+    commands = [f"cmd {i}" for i in range(10)]
+    assert run_subprocesses(commands) == commands
+    assert max(peak) <= 3
+
+
+def test_call_subprocess_with_stdin(mocked_subprocess):
+    call_subprocess_with_stdin("ffmpeg -i pipe:0")
+    mocked_subprocess.assert_called_once_with(
+        "ffmpeg -i pipe:0",
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        shell=True,
+        text=False,
+    )
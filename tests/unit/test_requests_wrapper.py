@@ -1,10 +1,34 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 import pytest
-from nhltv_lib.requests_wrapper import get, post
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from nhltv_lib.constants import HEADERS
+from nhltv_lib.requests_wrapper import (
+    DEFAULT_TIMEOUT,
+    create_session,
+    get,
+    CircuitBreaker,
+    TokenBucket,
+    get_backoff_delay,
+    get_circuit_states,
+    get_endpoint_family,
+    get_retry_after,
+    get_session,
+    post,
+    retry_function,
+    _circuit_breakers,
+    _guard_endpoint,
+    reset_endpoint_guards,
+)
+from nhltv_lib.exceptions import CircuitOpen
+from nhltv_lib.types import RetryPolicy
+
+POLICY = RetryPolicy(3, 1, 30, 120, frozenset({429, 503}))
 
 
 @pytest.fixture(scope="function")
 def mock_requests(mocker):
-    return mocker.patch("nhltv_lib.requests_wrapper.requests")
+    return mocker.patch("nhltv_lib.requests_wrapper.get_session").return_value
 
 
 @pytest.fixture(scope="function")
@@ -12,67 +36,320 @@ def mock_sleep(mocker):
     return mocker.patch("nhltv_lib.requests_wrapper.sleep")
 
 
+@pytest.fixture(scope="function")
+def mock_uniform(mocker):
+    return mocker.patch(
+        "nhltv_lib.requests_wrapper.uniform", side_effect=lambda a, b: b
+    )
+
+
+def _response(mocker, status_code, retry_after=None):
+    rsp = mocker.Mock()
+    rsp.status_code = status_code
+    rsp.headers = {} if retry_after is None else {"Retry-After": retry_after}
+    return rsp
+
+
 def test_req_wrap_get(mocker, mock_requests):
     get(1)
-    mock_requests.get.assert_called_once_with(1)
+    mock_requests.get.assert_called_once_with(1, timeout=DEFAULT_TIMEOUT)
 
 
 def test_req_wrap_get_kw(mocker, mock_requests):
     get(test=1)
-    mock_requests.get.assert_called_once_with(test=1)
+    mock_requests.get.assert_called_once_with(test=1, timeout=DEFAULT_TIMEOUT)
 
 
 def test_req_wrap_get_both(mocker, mock_requests):
     get(1, test=2)
-    mock_requests.get.assert_called_once_with(1, test=2)
+    mock_requests.get.assert_called_once_with(
+        1, test=2, timeout=DEFAULT_TIMEOUT
+    )
 
 
-def test_req_wrap_get_exception(mocker, mock_requests, mock_sleep):
-    mock_requests.get.side_effect = [ValueError, 1]
+def test_req_wrap_get_exception(
+    mocker, mock_requests, mock_sleep, mock_uniform
+):
+    mock_requests.get.side_effect = [RequestsConnectionError, 1]
     assert get() == 1
-    mock_sleep.assert_called_once_with(5)
+    mock_sleep.assert_called_once_with(1)
 
 
 def test_req_wrap_get_exception_exhaust(mocker, mock_requests, mock_sleep):
     mock_requests.get.side_effect = [
-        ValueError,
-        ValueError,
-        ValueError,
-        ValueError,
-        ValueError,
+        RequestsConnectionError,
+        RequestsConnectionError,
+        RequestsConnectionError,
+        RequestsConnectionError,
+        RequestsConnectionError,
     ]
-    with pytest.raises(ValueError):
+    with pytest.raises(RequestsConnectionError):
         get()
 
 
 def test_req_wrap_post(mocker, mock_requests, mock_sleep):
     post(1)
-    mock_requests.post.assert_called_once_with(1)
+    mock_requests.post.assert_called_once_with(1, timeout=DEFAULT_TIMEOUT)
 
 
 def test_req_wrap_post_kw(mocker, mock_requests):
     post(test=1)
-    mock_requests.post.assert_called_once_with(test=1)
+    mock_requests.post.assert_called_once_with(test=1, timeout=DEFAULT_TIMEOUT)
 
 
 def test_req_wrap_post_both(mocker, mock_requests):
     post(1, test=2)
-    mock_requests.post.assert_called_once_with(1, test=2)
+    mock_requests.post.assert_called_once_with(
+        1, test=2, timeout=DEFAULT_TIMEOUT
+    )
 
 
-def test_req_wrap_post_exception(mocker, mock_requests, mock_sleep):
-    mock_requests.post.side_effect = [ValueError, 1]
+def test_req_wrap_post_exception(
+    mocker, mock_requests, mock_sleep, mock_uniform
+):
+    mock_requests.post.side_effect = [RequestsConnectionError, 1]
     assert post() == 1
-    mock_sleep.assert_called_once_with(5)
+    mock_sleep.assert_called_once_with(1)
 
 
 def test_req_wrap_post_exception_exhaust(mocker, mock_requests, mock_sleep):
     mock_requests.post.side_effect = [
-        ValueError,
-        ValueError,
-        ValueError,
-        ValueError,
-        ValueError,
+        RequestsConnectionError,
+        RequestsConnectionError,
+        RequestsConnectionError,
+        RequestsConnectionError,
+        RequestsConnectionError,
     ]
-    with pytest.raises(ValueError):
+    with pytest.raises(RequestsConnectionError):
         post()
+
+
+def test_req_wrap_get_own_timeout(mocker, mock_requests):
+    get(1, timeout=3)
+    mock_requests.get.assert_called_once_with(1, timeout=3)
+
+
+def test_get_session_is_shared():
+    assert get_session() is get_session()
+    assert get_session().headers["User-agent"] == HEADERS["User-agent"]
+
+
+def test_create_session():
+    session = create_session({"Authorization": "foo"}, 4)
+    assert session.headers["Authorization"] == "foo"
+    assert session.get_adapter("https://nhl")._pool_maxsize == 4
+
+
+def test_create_session_keeps_cookies():
+    # the CDN may need its cookies on the following segment requests
+    session = create_session({}, 1)
+    assert session.cookies.get_policy().allowed_domains() is None
+
+
+def test_get_session_does_not_keep_cookies():
+    assert get_session().cookies.get_policy().allowed_domains() == ()
+
+
+def test_retry_function_backs_off(mocker, mock_sleep, mock_uniform):
+    function = mocker.Mock(side_effect=[OSError, OSError, 1])
+    assert retry_function(function, retry_policy=POLICY) == 1
+    assert [i[0][0] for i in mock_sleep.call_args_list] == [1, 2]
+
+
+def test_retry_function_does_not_retry_bugs(mocker, mock_sleep):
+    function = mocker.Mock(side_effect=[ValueError, 1])
+    with pytest.raises(ValueError):
+        retry_function(function, retry_policy=POLICY)
+    mock_sleep.assert_not_called()
+
+
+def test_retry_function_retries_status(mocker, mock_sleep, mock_uniform):
+    ok = _response(mocker, 200)
+    function = mocker.Mock(side_effect=[_response(mocker, 503), ok])
+    assert retry_function(function, retry_policy=POLICY) is ok
+    mock_sleep.assert_called_once_with(1)
+
+
+def test_retry_function_does_not_retry_client_error(mocker, mock_sleep):
+    not_found = _response(mocker, 404)
+    function = mocker.Mock(return_value=not_found)
+    assert retry_function(function, retry_policy=POLICY) is not_found
+    function.assert_called_once()
+
+
+def test_retry_function_returns_last_response(mocker, mock_sleep):
+    function = mocker.Mock(return_value=_response(mocker, 429))
+    assert retry_function(function, retry_policy=POLICY).status_code == 429
+    assert function.call_count == 3
+
+
+def test_retry_function_honours_retry_after(mocker, mock_sleep):
+    ok = _response(mocker, 200)
+    function = mocker.Mock(side_effect=[_response(mocker, 429, "7"), ok])
+    assert retry_function(function, retry_policy=POLICY) is ok
+    mock_sleep.assert_called_once_with(7)
+
+
+def test_retry_function_deadline(mocker, mock_sleep):
+    function = mocker.Mock(return_value=_response(mocker, 429, "300"))
+    assert retry_function(function, retry_policy=POLICY).status_code == 429
+    function.assert_called_once()
+    mock_sleep.assert_not_called()
+
+
+def test_retry_function_default_policy(
+    mocker, mock_sleep, mocked_parse_args, parsed_args, parsed_args_list
+):
+    parsed_args_list[18] = "5"
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    function = mocker.Mock(side_effect=OSError)
+    with pytest.raises(OSError):
+        retry_function(function)
+    assert function.call_count == 5
+
+
+def test_get_backoff_delay(mock_uniform):
+    assert get_backoff_delay(POLICY, 1) == 1
+    assert get_backoff_delay(POLICY, 4) == 8
+    assert get_backoff_delay(POLICY, 10) == 30
+
+
+def test_get_backoff_delay_jitter():
+    assert all(0 <= get_backoff_delay(POLICY, 3) <= 4 for _ in range(50))
+
+
+def test_get_retry_after(mocker):
+    assert get_retry_after(_response(mocker, 429, "120")) == 120
+    assert get_retry_after(_response(mocker, 429)) is None
+    assert get_retry_after(_response(mocker, 429, "soon")) is None
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=60)
+    delay = get_retry_after(_response(mocker, 429, format_datetime(later)))
+    assert 55 < delay <= 60
+
+    earlier = datetime.now(timezone.utc) - timedelta(seconds=60)
+    assert (
+        get_retry_after(_response(mocker, 429, format_datetime(earlier))) == 0
+    )
+
+
+@pytest.fixture(scope="function")
+def mock_monotonic(mocker):
+    clock = mocker.patch("nhltv_lib.requests_wrapper.monotonic")
+    clock.return_value = 1000.0
+    return clock
+
+
+def test_get_endpoint_family():
+    api = "https://nhltv.nhl.com/api"
+    assert get_endpoint_family(api + "/v3/sso/nhl/login") == "login"
+    assert get_endpoint_family(api + "/v2/events?foo=bar") == "events"
+    assert get_endpoint_family(api + "/v3/contents/1/player-settings") == (
+        "player-settings"
+    )
+    assert get_endpoint_family(api + "/v3/contents/1/check-access") == (
+        "check-access"
+    )
+    assert get_endpoint_family(api + "/v3/sso/nhl/teams") == "other"
+    assert get_endpoint_family("https://cdn.nhl/stream/access") == "stream"
+
+
+def test_token_bucket_burst(mock_monotonic, mock_sleep):
+    bucket = TokenBucket(2, 3)
+    for _ in range(3):
+        bucket.acquire()
+    mock_sleep.assert_not_called()
+
+    bucket.acquire()
+    mock_sleep.assert_called_once_with(0.5)
+    bucket.acquire()
+    assert mock_sleep.call_args[0][0] == 1.0
+
+
+def test_token_bucket_refills(mock_monotonic, mock_sleep):
+    bucket = TokenBucket(2, 3)
+    for _ in range(3):
+        bucket.acquire()
+    mock_monotonic.return_value += 10
+    for _ in range(3):
+        bucket.acquire()
+    mock_sleep.assert_not_called()
+
+
+def test_circuit_breaker_opens(mocker, mock_monotonic):
+    log = mocker.patch("nhltv_lib.requests_wrapper.tprint")
+    breaker = CircuitBreaker("events", 2, 60)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    log.assert_called_once_with("Circuit for events requests is open")
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_circuit_breaker_success_resets_failures(mocker):
+    breaker = CircuitBreaker("events", 2, 60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_half_open(mocker, mock_monotonic):
+    mocker.patch("nhltv_lib.requests_wrapper.tprint")
+    breaker = CircuitBreaker("events", 1, 60)
+    breaker.record_failure()
+
+    mock_monotonic.return_value += 60
+    breaker.before_call()
+    assert breaker.state == "half-open"
+    # only one call is let through to test the waters
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    mock_monotonic.return_value += 60
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_guard_endpoint_half_open_fails_on_any_exception(
+    mocker, mock_monotonic
+):
+    mocker.patch("nhltv_lib.requests_wrapper.tprint")
+    # started over on the mocked clock
+    reset_endpoint_guards()
+    breaker = _circuit_breakers["events"]
+    for _ in range(5):
+        breaker.record_failure()
+    mock_monotonic.return_value += 60
+    method = mocker.Mock(side_effect=ValueError)
+
+    with pytest.raises(ValueError):
+        _guard_endpoint(method)("https://nhltv.nhl.com/api/v2/events")
+
+    assert breaker.state == "open"
+
+
+def test_failing_endpoint_stops_retry_storm(mocker, mock_requests, mock_sleep):
+    mocker.patch("nhltv_lib.requests_wrapper.tprint")
+    url = "https://nhltv.nhl.com/api/v2/events"
+    mock_requests.get.return_value = _response(mocker, 503)
+
+    assert get(url).status_code == 503
+    # the circuit opens on the fifth failure, during the retries
+    with pytest.raises(CircuitOpen):
+        get(url)
+    assert get_circuit_states()["events"] == "open"
+    assert mock_requests.get.call_count == 5
+
+    with pytest.raises(CircuitOpen):
+        get(url)
+    assert mock_requests.get.call_count == 5
+    # other endpoints are not affected
+    assert get("https://nhltv.nhl.com/api/v3/sso/nhl/teams").status_code == 503
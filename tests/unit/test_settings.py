@@ -1,5 +1,15 @@
 import os
-from nhltv_lib.settings import get_download_folder, get_retentiondays
+from nhltv_lib.settings import (
+    get_download_folder,
+    get_download_workers,
+    get_fused_postprocessing,
+    get_max_processes,
+    get_retentiondays,
+    get_retry_policy,
+    get_silence_detector,
+    get_db_profile,
+    get_skip_silence_mode,
+)
 
 
 def test_get_download_folder():
@@ -17,3 +27,83 @@ def test_get_retentiondays_none(
     parsed_args_list[5] = None
     mocked_parse_args.return_value = parsed_args(*parsed_args_list)
     assert get_retentiondays() is None
+
+
+def test_get_download_workers():
+    assert get_download_workers() == 4
+
+
+def test_get_download_workers_default(
+    mocker, mocked_parse_args, parsed_args, parsed_args_list
+):
+    parsed_args_list[9] = None
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    assert get_download_workers() == 8
+
+
+def test_get_skip_silence_mode_default():
+    assert get_skip_silence_mode() == "cuts"
+
+
+def test_get_silence_detector_default():
+    assert get_silence_detector() == "ffmpeg"
+
+
+def test_get_silence_detector(
+    mocked_parse_args, parsed_args, parsed_args_list
+):
+    parsed_args_list[16] = "numpy"
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    assert get_silence_detector() == "numpy"
+
+
+def test_get_fused_postprocessing_default():
+    assert get_fused_postprocessing() is False
+
+
+def test_get_fused_postprocessing(
+    mocked_parse_args, parsed_args, parsed_args_list
+):
+    parsed_args_list[17] = True
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    assert get_fused_postprocessing() is True
+
+
+def test_get_max_processes():
+    assert get_max_processes() == 3
+
+
+def test_get_max_processes_default(
+    mocker, mocked_parse_args, parsed_args, parsed_args_list
+):
+    parsed_args_list[15] = None
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    mocker.patch("os.cpu_count", return_value=12)
+    assert get_max_processes() == 12
+
+
+def test_get_retry_policy_default():
+    policy = get_retry_policy()
+    assert policy.attempts == 3
+    assert policy.deadline == 120
+    assert 503 in policy.retry_statuses
+    assert 404 not in policy.retry_statuses
+
+
+def test_get_retry_policy(mocked_parse_args, parsed_args, parsed_args_list):
+    parsed_args_list[18] = "0"
+    parsed_args_list[19] = "30.5"
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    policy = get_retry_policy()
+    assert policy.attempts == 1
+    assert policy.deadline == 30.5
+
+
+def test_get_db_profile_default():
+    assert get_db_profile() == "rollback"
+
+
+def test_get_db_profile(mocked_parse_args, parsed_args, parsed_args_list):
+    parsed_args_list[20] = "wal"
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    assert get_db_profile() == "wal"
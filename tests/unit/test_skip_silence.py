@@ -1,14 +1,25 @@
+import io
+import pytest
 from nhltv_lib.skip_silence import (
     skip_silence,
     _create_marks_from_analyzed_output,
+    _create_marks_from_silences,
     _create_segments,
     _start_analyzing_for_silence,
     _merge_cuts_to_silent_video,
     _remove_raw_file,
     _create_concat_list,
     _clean_up_cuts,
+    create_single_pass_concat_list,
+    get_marks,
+    get_non_silent_intervals,
+    StreamingSilenceDetector,
+    remove_silence_analysis,
+    save_marks,
 )
+from nhltv_lib.exceptions import ExternalProgramError
 from nhltv_lib.models import GameStatus
+from nhltv_lib.types import SubprocessResult
 
 
 def test_skip_silence(mocker, fake_download, fake_silencedetect_output):
@@ -17,9 +28,7 @@ def test_skip_silence(mocker, fake_download, fake_silencedetect_output):
     if it ends up causing issues let's just get rid of it
     """
 
-    ugs = mocker.patch(
-        "nhltv_lib.skip_silence.game_tracking.update_game_status"
-    )
+    track = mocker.patch("nhltv_lib.skip_silence.game_tracking.track")
     analyze = mocker.patch(
         "nhltv_lib.skip_silence._start_analyzing_for_silence",
         return_value=fake_silencedetect_output,
@@ -35,7 +44,11 @@ def test_skip_silence(mocker, fake_download, fake_silencedetect_output):
 
     skip_silence(fake_download)
 
-    ugs.assert_called_once_with(fake_download.game_id, GameStatus.skip_silence)
+    track.assert_called_once_with(fake_download.game_id)
+    track.return_value.update_status.assert_called_once_with(
+        GameStatus.skip_silence
+    )
+    track.return_value.flush.assert_called_once_with()
     analyze.assert_called_once_with(fake_download.game_id)
     raw_rem.assert_called_once_with(fake_download.game_id)
     write_lines.assert_called_once_with(
@@ -97,21 +110,39 @@ def test_create_marks(fake_silencedetect_output):
 
 def test_create_segments(mocker):
     marks = (i for i in ["0", "258.047", "409.219", "end"])
-    call = mocker.call
-    m = mocker.patch("nhltv_lib.skip_silence.split_video_into_cuts")
-    m.return_value.wait.return_value = 0
-    _create_segments(1, marks)
-    calls = [
-        call("1_raw.mkv", 1, "0", 1, 258.047),
-        call("1_raw.mkv", 1, "409.219", 2),
-    ]
-    m.assert_has_calls(calls)
+    m = mocker.patch(
+        "nhltv_lib.skip_silence.run_subprocesses",
+        return_value=[SubprocessResult("", 0, b"", b"", 1.0)],
+    )
+    assert _create_segments(1, marks) == 2
+    m.assert_called_once_with(
+        [
+            "ffmpeg -y -nostats -i 1_raw.mkv -ss 0 -t 258.047 "
+            "-c:v copy -c:a copy 1/cut1.mp4",
+            "ffmpeg -y -nostats -i 1_raw.mkv -ss 409.219 "
+            "-c:v copy -c:a copy 1/cut2.mp4",
+        ]
+    )
+
+
+def test_create_segments_raises_on_failure(mocker):
+    marks = (i for i in ["0", "258.047", "409.219", "end"])
+    mocker.patch(
+        "nhltv_lib.skip_silence.run_subprocesses",
+        return_value=[
+            SubprocessResult("", 0, b"", b"", 1.0),
+            SubprocessResult("ffmpeg cut2", 1, b"", b"error\n", 1.0),
+        ],
+    )
+    with pytest.raises(ExternalProgramError) as e:
+        _create_segments(1, marks)
+    assert str(e.value) == "Segment creation failed\nffmpeg cut2: error"
 
 
 def test_start_analyzing_for_silence(mocker):
     mo = mocker.patch("nhltv_lib.skip_silence.detect_silence")
     _start_analyzing_for_silence(30)
-    mo.assert_called_once_with("30_raw.mkv")
+    mo.assert_called_once_with("30_raw.mkv", 16000)
 
 
 def test_remove_raw_file(mocker):
@@ -156,3 +187,218 @@ def test_merge_cuts_to_silent(mocker):
     mo = mocker.patch("nhltv_lib.skip_silence.concat_video")
     _merge_cuts_to_silent_video(30)
     mo.assert_called_once_with("30/concat_list.txt", "30_silent.mkv")
+
+
+def test_skip_silence_single_pass(
+    mocker, fake_download, fake_silencedetect_output
+):
+    mocker.patch(
+        "nhltv_lib.skip_silence.get_skip_silence_mode",
+        return_value="single-pass",
+    )
+    mocker.patch("nhltv_lib.skip_silence.game_tracking")
+    mocker.patch(
+        "nhltv_lib.skip_silence._start_analyzing_for_silence",
+        return_value=fake_silencedetect_output,
+    )
+    segments = mocker.patch("nhltv_lib.skip_silence._create_segments")
+    write_lines = mocker.patch("nhltv_lib.skip_silence.write_lines_to_file")
+    merge = mocker.patch("nhltv_lib.skip_silence._merge_cuts_to_silent_video")
+    raw_rem = mocker.patch("nhltv_lib.skip_silence._remove_raw_file")
+
+    skip_silence(fake_download)
+
+    game_id = fake_download.game_id
+    segments.assert_not_called()
+    concat_list = write_lines.call_args[0][0]
+    assert concat_list[:3] == [
+        f"file\t../{game_id}_raw.mkv\n",
+        "inpoint 0\n",
+        "outpoint 258.047\n",
+    ]
+    assert write_lines.call_args[0][1] == f"{game_id}/concat_list.txt"
+    merge.assert_called_once_with(game_id)
+    raw_rem.assert_called_once_with(game_id)
+
+
+def test_get_non_silent_intervals():
+    marks = iter(["0", "258.047", "409.219", "end"])
+    assert list(get_non_silent_intervals(marks)) == [
+        ("0", "258.047"),
+        ("409.219", None),
+    ]
+
+
+def test_get_non_silent_intervals_odd_marks_run_to_end():
+    marks = iter(["0", "258.047", "409.219"])
+    assert list(get_non_silent_intervals(marks)) == [
+        ("0", "258.047"),
+        ("409.219", None),
+    ]
+
+
+def test_create_single_pass_concat_list():
+    marks = (i for i in ["0", "258.047", "409.219", "end"])
+    assert create_single_pass_concat_list(1, marks) == [
+        "file\t../1_raw.mkv\n",
+        "inpoint 0\n",
+        "outpoint 258.047\n",
+        "file\t../1_raw.mkv\n",
+        "inpoint 409.219\n",
+    ]
+
+
+def test_create_single_pass_concat_list_ends_in_silence():
+    marks = (i for i in ["0", "258.047", "409.219", "500.1"])
+    assert create_single_pass_concat_list(1, marks) == [
+        "file\t../1_raw.mkv\n",
+        "inpoint 0\n",
+        "outpoint 258.047\n",
+        "file\t../1_raw.mkv\n",
+        "inpoint 409.219\n",
+        "outpoint 500.1\n",
+    ]
+
+
+def test_get_marks_from_download(mocker):
+    mocker.patch("os.path.isfile", return_value=True)
+    mocker.patch(
+        "nhltv_lib.skip_silence.read_lines_from_file",
+        return_value=["0\n", "258.047\n", "end\n"],
+    )
+    analyze = mocker.patch(
+        "nhltv_lib.skip_silence._start_analyzing_for_silence"
+    )
+    assert list(get_marks(1)) == ["0", "258.047", "end"]
+    analyze.assert_not_called()
+
+
+def test_get_marks_analyzes_raw_file(mocker, fake_silencedetect_output):
+    mocker.patch("os.path.isfile", return_value=False)
+    mocker.patch(
+        "nhltv_lib.skip_silence._start_analyzing_for_silence",
+        return_value=fake_silencedetect_output,
+    )
+    assert list(get_marks(1))[:2] == ["0", "258.047"]
+
+
+def test_get_marks_with_numpy_detector(
+    mocker,
+    monkeypatch,
+    tmp_path,
+    mocked_parse_args,
+    parsed_args,
+    parsed_args_list,
+):
+    np = pytest.importorskip("numpy")
+    parsed_args_list[16] = "numpy"
+    mocked_parse_args.return_value = parsed_args(*parsed_args_list)
+    mocker.patch("nhltv_lib.skip_silence.tprint")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "1").mkdir()
+
+    def fake_decode(input_file, output_file, sample_rate):
+        assert input_file == "1_raw.mkv"
+        sound = np.full(sample_rate * 30, 1000, dtype="<i2")
+        silence = np.zeros(sample_rate * 12, dtype="<i2")
+        with open(output_file, "wb") as f:
+            f.write(np.concatenate([sound, silence, sound]).tobytes())
+
+    decode = mocker.patch(
+        "nhltv_lib.skip_silence.decode_audio_to_pcm", side_effect=fake_decode
+    )
+
+    assert list(get_marks(1)) == ["0", "30", "42", "end"]
+    # the decoded audio is kept for the next analysis
+    assert list(get_marks(1)) == ["0", "30", "42", "end"]
+    decode.assert_called_once()
+
+
+def test_create_marks_from_silences():
+    marks = _create_marks_from_silences([(258.047, 409.219), (1000.5, 1012)])
+    assert list(marks) == ["0", "258.047", "409.219", "1000.5", "1012", "end"]
+
+
+def test_create_marks_from_silences_none():
+    assert list(_create_marks_from_silences([])) == ["0", "end"]
+
+
+@pytest.fixture
+def mock_detector_process(mocker, fake_silencedetect_output):
+    proc = mocker.Mock()
+    proc.stdout = io.BytesIO(b"".join(fake_silencedetect_output))
+    proc.stdin = io.BytesIO()
+    proc.wait.return_value = 0
+    mocker.patch(
+        "nhltv_lib.skip_silence.start_detecting_silence_in_stdin",
+        return_value=proc,
+    )
+    return proc
+
+
+def test_streaming_silence_detector(mock_detector_process):
+    detector = StreamingSilenceDetector()
+    detector.feed(b"video", 0)
+    assert mock_detector_process.stdin.getvalue() == b"video"
+    marks = detector.close()
+
+    assert marks[:2] == ["0", "258.047"]
+    assert marks[-1] == "end"
+
+
+def test_streaming_silence_detector_failed(mocker, mock_detector_process):
+    mocker.patch("nhltv_lib.skip_silence.tprint")
+    mock_detector_process.stdin = mocker.Mock()
+    mock_detector_process.stdin.write.side_effect = BrokenPipeError
+
+    detector = StreamingSilenceDetector()
+    detector.feed(b"video", 0)
+    detector.feed(b"video", 5)
+
+    assert detector.close() is None
+    assert detector.failed
+    mock_detector_process.stdin.write.assert_called_once()
+
+
+def test_streaming_silence_detector_abort(mock_detector_process):
+    detector = StreamingSilenceDetector()
+    detector.feed(b"video", 0)
+    detector.abort()
+
+    mock_detector_process.kill.assert_called_once()
+    assert mock_detector_process.stdin.closed
+    assert detector.failed
+
+
+def test_streaming_silence_detector_abort_not_started(mocker):
+    start = mocker.patch(
+        "nhltv_lib.skip_silence.start_detecting_silence_in_stdin"
+    )
+    StreamingSilenceDetector().abort()
+    start.assert_not_called()
+
+
+def test_streaming_silence_detector_resumed_download(mocker):
+    start = mocker.patch(
+        "nhltv_lib.skip_silence.start_detecting_silence_in_stdin"
+    )
+
+    detector = StreamingSilenceDetector()
+    detector.feed(b"video", 5)
+
+    assert detector.close() is None
+    start.assert_not_called()
+
+
+def test_save_marks(mocker):
+    write_lines = mocker.patch("nhltv_lib.skip_silence.write_lines_to_file")
+    save_marks(1, ["0", "end"])
+    write_lines.assert_called_once_with(
+        ["0\n", "end\n"], "1/silence_marks.txt"
+    )
+
+
+def test_remove_silence_analysis(mocker, mock_os_remove):
+    mocker.patch("os.path.isfile", side_effect=[True, False])
+    remove_silence_analysis(1)
+    mock_os_remove.assert_called_once_with("1/silence_marks.txt")
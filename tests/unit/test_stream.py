@@ -1,16 +1,29 @@
+import pytest
 from nhltv_lib.stream import (
     get_shorten_video,
     stream_matches_home_away,
-    create_stream_object,
-    is_ready_to_download,
     get_best_stream,
-    create_stream_objects,
     get_streams_to_download,
     NHLStream,
 )
 from nhltv_lib.game import Game
 
 
+def _stream(stream_id, name):
+    return {"id": stream_id, "clientContentMetadata": [{"name": name}]}
+
+
+@pytest.fixture(scope="function")
+def mock_get_stream_settings(mocker):
+    return mocker.patch(
+        "nhltv_lib.stream.get_stream_settings",
+        side_effect=lambda stream: {
+            "id": stream["id"],
+            "isDelivered": stream["id"] != 3,
+        },
+    )
+
+
 def test_stream_matches_home_away():
     assert stream_matches_home_away(Game(123, "1 vs 2", True, []), "HOME")
     assert not stream_matches_home_away(Game(123, "1 vs 2", False, []), "HOME")
@@ -18,11 +31,42 @@ def test_stream_matches_home_away():
     assert stream_matches_home_away(Game(123, "1 vs 2", False, []), "AWAY")
 
 
-def test_get_streams_to_download(mocker):
-    mocker.patch("nhltv_lib.stream.filter")
-    mocker.patch(
-        "nhltv_lib.stream.create_stream_objects",
-        return_value=[NHLStream(0, 0, 0)],
+def test_get_best_stream():
+    streams = [_stream(1, "AWAY"), _stream(2, "HOME"), _stream(3, "HOME")]
+    assert get_best_stream(Game(1, "", True, streams)) == _stream(2, "HOME")
+    assert get_best_stream(Game(1, "", False, streams)) == _stream(1, "AWAY")
+    assert get_best_stream(Game(1, "", False, [])) == {}
+
+
+def test_get_streams_to_download(mock_get_stream_settings):
+    games = (
+        Game(10, "", True, [_stream(1, "AWAY"), _stream(2, "HOME")]),
+        Game(11, "", False, [_stream(4, "AWAY")]),
     )
 
-    assert get_streams_to_download(Game(1, "", 2, 3)) == [NHLStream(0, 0, 0)]
+    assert get_streams_to_download(games) == [
+        NHLStream(10, _stream(2, "HOME"), {"id": 2, "isDelivered": True}),
+        NHLStream(11, _stream(4, "AWAY"), {"id": 4, "isDelivered": True}),
+    ]
+    # only the best stream of each game is looked up, and only once
+    assert sorted(
+        i[0][0]["id"] for i in mock_get_stream_settings.call_args_list
+    ) == [2, 4]
+
+
+def test_get_streams_to_download_skips_undelivered(
+    mocker, mock_get_stream_settings
+):
+    mocker.patch("nhltv_lib.stream.tprint")
+    games = (
+        Game(10, "", True, [_stream(3, "HOME")]),
+        Game(11, "", False, []),
+        Game(12, "", False, [_stream(4, "AWAY")]),
+    )
+
+    assert [i.game_id for i in get_streams_to_download(games)] == [12]
+
+
+def test_get_streams_to_download_none(mock_get_stream_settings):
+    assert get_streams_to_download(()) == []
+    mock_get_stream_settings.assert_not_called()